@@ -5,9 +5,10 @@ from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth.models import User
-from django.utils import timezone
-from datetime import timedelta
+from django.http import HttpResponse
 import json
+from study_core import activity, dashboard, profiling
+from study_core.instrumentation import registry
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
@@ -16,40 +17,7 @@ def admin_analytics(request):
     Get analytics data for admin dashboard
     """
     try:
-        # Get all users (excluding staff/admin users for learner count)
-        total_users = User.objects.count()
-        active_learners = User.objects.filter(is_staff=False).count()
-        
-        # Calculate recent activity (last 7 days)
-        one_week_ago = timezone.now() - timedelta(days=7)
-        recent_users = User.objects.filter(date_joined__gte=one_week_ago).count()
-        
-        # You would replace this with your actual StudySession model data
-        # For now, we'll use some placeholder data
-        total_study_sessions = 0
-        avg_study_duration = "0 mins"
-        
-        # Try to get data from localStorage simulation
-        # In a real app, you'd have a StudySession model
-        try:
-            # This is a simulation - in reality you'd query your database models
-            # For now, we'll return some calculated data
-            pass
-        except:
-            # Fallback data
-            pass
-        
-        return Response({
-            'totalSessions': total_study_sessions,
-            'activeLearners': active_learners,
-            'popularTopic': "Mathematics: Calculus",  # You'd calculate this from actual data
-            'avgStudyDuration': avg_study_duration,
-            'completionRate': "68%",
-            'totalTopics': 42,  # You'd get this from your Topic model
-            'totalCourses': 15,
-            'totalUsers': total_users,
-            'recentUsers': recent_users
-        })
+        return Response(dashboard.analytics())
         
     except Exception as e:
         return Response(
@@ -64,32 +32,12 @@ def recent_activities(request):
     Get recent activities for admin dashboard
     """
     try:
-        # Get recent user registrations
-        recent_users = User.objects.filter(is_staff=False).order_by('-date_joined')[:5]
-        
-        activities = []
-        
-        for user in recent_users:
-            activities.append({
-                'type': 'user_registered',
-                'message': f'New user registered: {user.username}',
-                'timestamp': user.date_joined.isoformat(),
-                'user': user.username
-            })
-        
-        # Add some system activities
-        activities.append({
-            'type': 'system',
-            'message': 'System maintenance completed',
-            'timestamp': timezone.now().isoformat(),
-            'user': 'System'
-        })
-        
-        # Sort by timestamp (newest first)
-        activities.sort(key=lambda x: x['timestamp'], reverse=True)
-        
-        # Return only the 5 most recent
-        return Response(activities[:5])
+        # Newest events from the activity log: one indexed LIMIT query
+        # (?limit=N, ?type=user_registered,user_logged_in to filter)
+        limit = request.query_params.get('limit')
+        event_types = [t for t in request.query_params.get('type', '').split(',') if t]
+        events = activity.recent(int(limit) if limit and limit.isdigit() else None, event_types)
+        return Response([activity.serialize(event) for event in events])
         
     except Exception as e:
         return Response(
@@ -117,4 +65,61 @@ def user_management_data(request):
         return Response(
             {'error': f'Error fetching user data: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+        )
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics(request):
+    """
+    Latency histograms and counters in Prometheus text format
+    """
+    return HttpResponse(
+        registry.render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def profiles(request):
+    """
+    Stored request profiles, newest first
+    """
+    return Response(profiling.list_profiles())
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def profile_detail(request, profile_id):
+    """
+    One profile as collapsed stacks (flamegraph.pl / speedscope input)
+    """
+    profile = profiling.get_profile(profile_id)
+    if profile is None:
+        return Response({'error': 'Profile not found or expired'}, status=status.HTTP_404_NOT_FOUND)
+    return HttpResponse(profile['collapsed'], content_type='text/plain; charset=utf-8')
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminUser])
+def slow_queries(request):
+    """
+    Slow-query log of this worker process, newest first; DELETE clears it
+    """
+    if request.method == 'DELETE':
+        profiling.clear_slow_queries()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    entries = profiling.slow_queries()
+    return Response({
+        'threshold_ms': profiling.profiling_settings()['SLOW_QUERY_MS'],
+        'count': len(entries),
+        'queries': entries,
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def admin_dashboard(request):
+    """
+    Every admin dashboard panel in one response; ?panels=analytics,topics
+    picks some, ?refresh=1 skips the per-panel cache
+    """
+    names = [name for name in request.query_params.get('panels', '').split(',') if name]
+    refresh = request.query_params.get('refresh') in ('1', 'true')
+    return Response(dashboard.load(names or None, refresh=refresh))
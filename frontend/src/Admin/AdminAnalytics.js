@@ -3,8 +3,9 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import api from '../api';
 
-function AdminAnalytics() {
-    const [analyticsData, setAnalyticsData] = useState({
+// initialAnalytics / initialActivities come from the dashboard's combined request
+function AdminAnalytics({ initialAnalytics, initialActivities }) {
+    const [analyticsData, setAnalyticsData] = useState(initialAnalytics || {
         totalSessions: 0,
         activeLearners: 0,
         popularTopic: "Loading...",
@@ -15,8 +16,8 @@ function AdminAnalytics() {
         totalUsers: 0,
         recentUsers: 0
     });
-    const [recentActivities, setRecentActivities] = useState([]);
-    const [loading, setLoading] = useState(true);
+    const [recentActivities, setRecentActivities] = useState(initialActivities || []);
+    const [loading, setLoading] = useState(!(initialAnalytics && initialActivities));
     const [error, setError] = useState(null);
 
     const fetchAnalyticsData = useCallback(async () => {
@@ -47,9 +48,10 @@ function AdminAnalytics() {
     }, []);
 
     useEffect(() => {
+        if (initialAnalytics && initialActivities) return;
         fetchAnalyticsData();
         fetchRecentActivities();
-    }, [fetchAnalyticsData, fetchRecentActivities]);
+    }, [fetchAnalyticsData, fetchRecentActivities, initialAnalytics, initialActivities]);
 
     const loadAnalyticsFromLocalStorage = () => {
         // Fallback to localStorage data
@@ -4,9 +4,10 @@ import React, { useState, useEffect } from 'react';
 import api from '../api';
 import CourseForm from './CourseForm';
 
-function AdminCourseList() {
-    const [courses, setCourses] = useState([]);
-    const [loading, setLoading] = useState(true);
+// initialCourses comes from the dashboard's combined request
+function AdminCourseList({ initialCourses }) {
+    const [courses, setCourses] = useState(initialCourses || []);
+    const [loading, setLoading] = useState(!initialCourses);
     const [error, setError] = useState(null);
     const [showForm, setShowForm] = useState(false);
     const [editingCourse, setEditingCourse] = useState(null);
@@ -24,7 +25,7 @@ function AdminCourseList() {
     };
 
     useEffect(() => {
-        fetchCourses();
+        if (!initialCourses) fetchCourses();
     }, []);
 
     const handleAddNew = () => {
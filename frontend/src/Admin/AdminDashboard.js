@@ -1,5 +1,6 @@
 // AdminDashboard.js - FIXED IMPORT PATH
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
+import api from '../api';
 import AdminTopicList from './AdminTopicList';
 import AdminCourseList from './AdminCourseList';
 import AdminUserList from './AdminUserList';
@@ -13,37 +14,76 @@ import TopicManager from '../components/TopicManager'; // If it's in components
 // OR
 // import TopicManager from './TopicManager'; // If you've copied it to Admin folder
 
+// Dashboard panels each view starts from. They're dropped when the view is
+// left, so coming back to it fetches fresh data.
+const VIEW_PANELS = {
+    analytics: ['analytics', 'activities'],
+    topics: ['topics'],
+    courses: ['courses'],
+    users: ['users'],
+};
+
 const AdminDashboard = () => {
     const [currentView, setCurrentView] = useState('analytics'); 
     const [refreshTopics, setRefreshTopics] = useState(false);
+    // Every panel from one request on load (null until it answers)
+    const [panels, setPanels] = useState(null);
+
+    useEffect(() => {
+        api.get('/admin/dashboard/')
+            .then(response => setPanels(response.data.panels))
+            .catch(err => {
+                console.error('Error fetching dashboard:', err);
+                setPanels({});  // each view fetches its own data instead
+            });
+    }, []);
+
+    const dropPanels = (names) => {
+        setPanels(current => {
+            const next = { ...current };
+            names.forEach(name => delete next[name]);
+            return next;
+        });
+    };
+
+    const showView = (view) => {
+        dropPanels(VIEW_PANELS[currentView] || []);
+        setCurrentView(view);
+    };
 
     const renderContent = () => {
+        if (panels === null) {
+            return <div style={loadingStyle}>Loading dashboard...</div>;
+        }
         switch (currentView) {
             case 'analytics':
-                return <AdminAnalytics />;
+                return <AdminAnalytics initialAnalytics={panels.analytics} initialActivities={panels.activities} />;
             case 'topics':
                 return (
                     <div>
                         <div style={topicManagerSectionStyle}>
                             <h3 style={sectionTitleStyle}>Add New Topic</h3>
                             <TopicManager 
-                                onTopicAdded={() => setRefreshTopics(!refreshTopics)}
+                                onTopicAdded={() => {
+                                    dropPanels(['topics']);
+                                    setRefreshTopics(!refreshTopics);
+                                }}
                                 isAdmin={true}
                             />
                         </div>
                         <div style={topicListSectionStyle}>
-                            <AdminTopicList key={refreshTopics} />
+                            <AdminTopicList key={refreshTopics} initialTopics={panels.topics} />
                         </div>
                     </div>
                 );
             case 'courses':
-                return <AdminCourseList />;
+                return <AdminCourseList initialCourses={panels.courses} />;
             case 'users':
-                return <AdminUserList />;
+                return <AdminUserList initialUsers={panels.users} />;
             case 'ai-config':
                 return <AIConfigPanel />;
             default:
-                return <AdminAnalytics />;
+                return <AdminAnalytics initialAnalytics={panels.analytics} initialActivities={panels.activities} />;
         }
     };
 
@@ -66,19 +106,19 @@ const AdminDashboard = () => {
                     </button>
                 </div>
                 <div style={navLinksStyle}>
-                    <button onClick={() => setCurrentView('analytics')} style={navLinkButtonStyle(currentView === 'analytics')}>
+                    <button onClick={() => showView('analytics')} style={navLinkButtonStyle(currentView === 'analytics')}>
                         Analytics
                     </button>
-                    <button onClick={() => setCurrentView('topics')} style={navLinkButtonStyle(currentView === 'topics')}>
+                    <button onClick={() => showView('topics')} style={navLinkButtonStyle(currentView === 'topics')}>
                         Manage Topics
                     </button>
-                    <button onClick={() => setCurrentView('courses')} style={navLinkButtonStyle(currentView === 'courses')}>
+                    <button onClick={() => showView('courses')} style={navLinkButtonStyle(currentView === 'courses')}>
                         Manage Courses
                     </button>
-                    <button onClick={() => setCurrentView('users')} style={navLinkButtonStyle(currentView === 'users')}>
+                    <button onClick={() => showView('users')} style={navLinkButtonStyle(currentView === 'users')}>
                         User Management
                     </button>
-                    <button onClick={() => setCurrentView('ai-config')} style={navLinkButtonStyle(currentView === 'ai-config')}>
+                    <button onClick={() => showView('ai-config')} style={navLinkButtonStyle(currentView === 'ai-config')}>
                         AI Configuration
                     </button>
                 </div>
@@ -91,6 +131,13 @@ const AdminDashboard = () => {
     );
 };
 
+const loadingStyle = {
+    textAlign: 'center',
+    padding: '40px',
+    fontSize: '1.1em',
+    color: '#7f8c8d'
+};
+
 const adminDashboardStyle = { 
     display: 'flex', 
     minHeight: '100vh', 
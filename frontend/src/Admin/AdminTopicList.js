@@ -3,9 +3,10 @@ import React, { useState, useEffect } from 'react';
 import api from '../api';
 import TopicForm from './TopicForm';
 
-function AdminTopicList() {
-    const [topics, setTopics] = useState([]);
-    const [loading, setLoading] = useState(true);
+// initialTopics comes from the dashboard's combined request
+function AdminTopicList({ initialTopics }) {
+    const [topics, setTopics] = useState(initialTopics || []);
+    const [loading, setLoading] = useState(!initialTopics);
     const [error, setError] = useState(null);
     const [showForm, setShowForm] = useState(false);
     const [editingTopic, setEditingTopic] = useState(null);
@@ -23,7 +24,7 @@ function AdminTopicList() {
     };
 
     useEffect(() => {
-        fetchTopics();
+        if (!initialTopics) fetchTopics();
     }, []);
 
     const handleAddNew = () => {
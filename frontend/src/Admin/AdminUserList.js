@@ -3,9 +3,10 @@
 import React, { useState, useEffect } from 'react';
 import api from '../api'; 
 
-function AdminUserList() {
-    const [users, setUsers] = useState([]);
-    const [loading, setLoading] = useState(true);
+// initialUsers comes from the dashboard's combined request
+function AdminUserList({ initialUsers }) {
+    const [users, setUsers] = useState(initialUsers || []);
+    const [loading, setLoading] = useState(!initialUsers);
     const [error, setError] = useState(null);
 
     const fetchUsers = async () => {
@@ -21,7 +22,7 @@ function AdminUserList() {
     };
 
     useEffect(() => {
-        fetchUsers();
+        if (!initialUsers) fetchUsers();
     }, []);
 
     const handleStatusUpdate = async (userId, fieldName, currentValue) => {
@@ -6,6 +6,7 @@ import LandingPage from './components/LandingPage';
 import Login from './components/Login';
 import Register from './components/Register';
 import PremiumTopics from './components/PremiumTopics';
+import api from './api';
 
 console.log('Frontend Environment Variables:', {
   API_URL: process.env.REACT_APP_API_URL,
@@ -44,6 +45,11 @@ const useAuth = () => {
     const isAdmin = userRole === 'admin';
 
     const logout = () => {
+        // Revoke the token server-side; local cleanup doesn't wait for it
+        if (localStorage.getItem('token')) {
+            api.post('/auth/logout/').catch(() => {});
+        }
+
         const userId = localStorage.getItem('currentUserId') || 'anonymous';
         
         const userKeys = [
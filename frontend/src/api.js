@@ -68,4 +68,50 @@ api.interceptors.response.use(
     }
 );
 
-export default api;
\ No newline at end of file
+export default api;
+
+// Idempotency-Key for generation POSTs. A double-click or a retry after a
+// timeout reuses the key of the identical request still pending (or failed),
+// so the server runs the paid generation once and replays the result.
+const IDEMPOTENCY_WINDOW_MS = 10 * 60 * 1000;
+const pendingKeys = new Map();
+
+const newIdempotencyKey = () => (
+    window.crypto?.randomUUID
+        ? window.crypto.randomUUID()
+        : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`
+);
+
+export const postIdempotent = async (url, data, config = {}, fingerprint = data) => {
+    const id = `${url}:${JSON.stringify(fingerprint)}`;
+    let entry = pendingKeys.get(id);
+    if (!entry || Date.now() - entry.createdAt > IDEMPOTENCY_WINDOW_MS) {
+        entry = { key: newIdempotencyKey(), createdAt: Date.now() };
+        pendingKeys.set(id, entry);
+    }
+    try {
+        const response = await api.post(url, data, {
+            ...config,
+            headers: { ...config.headers, 'Idempotency-Key': entry.key },
+        });
+        pendingKeys.delete(id);
+        return response;
+    } catch (error) {
+        const code = error.response?.status;
+        // Keep the key for retries of timeouts, overloads and server errors only
+        if (code && code < 500 && code !== 409 && code !== 429) {
+            pendingKeys.delete(id);
+        }
+        throw error;
+    }
+};
+
+
+// ws(s):// URL on the backend host, e.g. websocketUrl('/ws/tutor/')
+export const websocketUrl = (path) => {
+    const base = new URL(API_URL, window.location.href);
+    base.protocol = base.protocol === 'https:' ? 'wss:' : 'ws:';
+    base.pathname = path;
+    base.search = '';
+    return base.toString();
+};
@@ -0,0 +1,55 @@
+// src/catalogSync.js
+// Keeps a local copy of topics and courses and refreshes it with
+// GET /sync/?since=<cursor>, so repeat visits only download what changed.
+import api from './api';
+
+const storageKey = () => {
+    try {
+        const user = JSON.parse(localStorage.getItem('user') || 'null');
+        return `catalogSync_${user?.id || user?.username || 'anonymous'}`;
+    } catch {
+        return 'catalogSync_anonymous';
+    }
+};
+
+const loadState = () => {
+    try {
+        const state = JSON.parse(localStorage.getItem(storageKey()) || 'null');
+        if (state && state.cursor && state.topics && state.courses) return state;
+    } catch {
+        // Corrupt cache: fall through to a full sync
+    }
+    return { cursor: null, topics: {}, courses: {} };
+};
+
+const applyChanges = (rowsById, changes, reset) => {
+    const next = reset ? {} : { ...rowsById };
+    changes.deleted.forEach((id) => { delete next[id]; });
+    changes.updated.forEach((row) => { next[row.id] = row; });
+    return next;
+};
+
+const byName = (a, b) => a.name.localeCompare(b.name);
+
+export const syncCatalog = async () => {
+    const state = loadState();
+    const params = state.cursor ? { since: state.cursor } : {};
+    const { data } = await api.get('/sync/', { params });
+
+    const next = {
+        cursor: data.cursor,
+        topics: applyChanges(state.topics, data.topics, data.reset),
+        courses: applyChanges(state.courses, data.courses, data.reset),
+    };
+    try {
+        localStorage.setItem(storageKey(), JSON.stringify(next));
+    } catch (e) {
+        console.warn('Could not persist catalog cache:', e);
+    }
+    return {
+        topics: Object.values(next.topics).sort(byName),
+        courses: Object.values(next.courses).sort(byName),
+    };
+};
+
+export const clearCatalogCache = () => localStorage.removeItem(storageKey());
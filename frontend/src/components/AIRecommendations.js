@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import api from '../api';
+import { postIdempotent } from '../api';
 import './Dashboard.css';
 
 const getCurrentUserId = () => {
@@ -141,6 +141,12 @@ const AIRecommendations = () => {
 
     const getAIRecommendations = async (analysis) => {
         try {
+            if (localStorage.getItem('token')) {
+                // Signed in: the server builds the analysis from stored quiz and study progress
+                const response = await postIdempotent('/ai-recommendations/', {});
+                return response.data.recommendations;
+            }
+
             const prompt = `
             Based on this learning analysis, provide personalized study recommendations:
             
@@ -160,7 +166,7 @@ const AIRecommendations = () => {
             Each item should have: title, description, reason, and priority (high/medium/low).
             `;
 
-            const response = await api.post('/ai-recommendations/', {
+            const response = await postIdempotent('/ai-recommendations/', {
                 analysis: analysis,
                 prompt: prompt
             });
@@ -1,6 +1,7 @@
 // AITutor.js - Complete with enhanced text formatting
 import React, { useState, useRef, useEffect } from 'react';
-import api from '../api';
+import { postIdempotent } from '../api';
+import { TutorSocket } from '../tutorSocket';
 import './Dashboard.css'; 
 
 const AITutor = () => {
@@ -11,6 +12,10 @@ const AITutor = () => {
     const [difficulty, setDifficulty] = useState('beginner');
     const [conversationHistory, setConversationHistory] = useState([]);
     const [isUserScrolling, setIsUserScrolling] = useState(false);
+    const [isStreaming, setIsStreaming] = useState(false);
+    const socketRef = useRef(null);
+    // Set once the WebSocket tutor turns out to be unreachable; HTTP is used from then on
+    const socketUnavailableRef = useRef(false);
     const messagesEndRef = useRef(null);
     const chatContainerRef = useRef(null);
 
@@ -68,6 +73,9 @@ const AITutor = () => {
         }
     }, [messages, isUserScrolling]);
 
+    // Closing the socket also stops any answer still being generated
+    useEffect(() => () => socketRef.current?.close(), []);
+
     useEffect(() => {
         const welcomeMessage = {
             id: 1,
@@ -236,30 +244,34 @@ const AITutor = () => {
                 current_question: inputMessage
             };
 
-            const response = await api.post('/ai-tutor/chat/', {
+            const payload = {
                 message: inputMessage,
                 subject: selectedSubject,
                 difficulty: difficulty,
                 context: context
-            });
-
-            const tutorMessage = {
-                id: Date.now() + 1,
-                text: response.data.response,
-                sender: 'tutor',
-                timestamp: new Date().toLocaleTimeString(),
-                subject: selectedSubject
             };
 
-            setMessages(prev => [...prev, tutorMessage]);
+            let answer = await askOverSocket(payload);
+            if (answer === undefined) {
+                const response = await postIdempotent('/ai-tutor/chat/', payload);
+                answer = response.data.response;
+                setMessages(prev => [...prev, {
+                    id: Date.now() + 1,
+                    text: answer,
+                    sender: 'tutor',
+                    timestamp: new Date().toLocaleTimeString(),
+                    subject: selectedSubject
+                }]);
+            }
+            if (!answer) return;
             
             setConversationHistory(prev => [
                 ...prev,
                 { role: 'user', content: inputMessage },
-                { role: 'assistant', content: response.data.response }
+                { role: 'assistant', content: answer }
             ]);
 
-            saveToStudyHistory(inputMessage, response.data.response);
+            saveToStudyHistory(inputMessage, answer);
 
         } catch (error) {
             console.error('Tutor error:', error);
@@ -273,6 +285,47 @@ const AITutor = () => {
             setMessages(prev => [...prev, errorMessage]);
         } finally {
             setIsLoading(false);
+            setIsStreaming(false);
+        }
+    };
+
+    // Streams the answer into a new message. Returns the full answer, the partial
+    // text if it was stopped, or undefined if the WebSocket tutor isn't reachable.
+    const askOverSocket = async (payload) => {
+        if (socketUnavailableRef.current || !localStorage.getItem('token') || !('WebSocket' in window)) {
+            return undefined;
+        }
+        if (!socketRef.current) socketRef.current = new TutorSocket();
+
+        const messageId = Date.now() + 1;
+        let streamed = '';
+        const onChunk = (text) => {
+            const first = streamed === '';
+            streamed += text;
+            if (first) {
+                setIsStreaming(true);
+                setMessages(prev => [...prev, {
+                    id: messageId,
+                    text: streamed,
+                    sender: 'tutor',
+                    timestamp: new Date().toLocaleTimeString(),
+                    subject: selectedSubject
+                }]);
+            } else {
+                setMessages(prev => prev.map(m => (m.id === messageId ? { ...m, text: streamed } : m)));
+            }
+        };
+
+        try {
+            const answer = await socketRef.current.ask(payload, onChunk);
+            return answer === null ? streamed : answer;
+        } catch (error) {
+            if (!error.connected) {
+                console.warn('WebSocket tutor unavailable, using HTTP:', error.message);
+                socketUnavailableRef.current = true;
+                return undefined;
+            }
+            throw error;
         }
     };
 
@@ -406,7 +459,7 @@ const AITutor = () => {
                 {messages.map((message) => (
                     <Message key={message.id} message={message} />
                 ))}
-                {isLoading && (
+                {isLoading && !isStreaming && (
                     <div className="message tutor">
                         <div className="message-content">
                             <div className="typing-indicator">
@@ -436,13 +489,23 @@ const AITutor = () => {
                             }
                         }}
                     />
-                    <button 
-                        type="submit" 
-                        disabled={isLoading || !inputMessage.trim()}
-                        className="send-button"
-                    >
-                        {isLoading ? 'Sending...' : 'Send'}
-                    </button>
+                    {isStreaming ? (
+                        <button 
+                            type="button" 
+                            onClick={() => socketRef.current?.cancel()}
+                            className="send-button"
+                        >
+                            Stop
+                        </button>
+                    ) : (
+                        <button 
+                            type="submit" 
+                            disabled={isLoading || !inputMessage.trim()}
+                            className="send-button"
+                        >
+                            {isLoading ? 'Sending...' : 'Send'}
+                        </button>
+                    )}
                 </div>
                 <small className="input-hint">
                     Press Enter to send • Shift+Enter for new line
@@ -1,5 +1,6 @@
-import React, { useState, useEffect, useCallback } from 'react';
-import api from '../api'; 
+import React, { useState, useEffect, useCallback, useRef } from 'react';
+import api, { postIdempotent } from '../api';
+import { syncCatalog } from '../catalogSync';
 import StudyTools from './StudyTools';
 import StudyTaskCard from './StudyTaskCard'; 
 import ProductivityChart from './ProductivityChart'; 
@@ -155,6 +156,23 @@ function Dashboard({ logout }) {
     const [activeTaskFilter, setActiveTaskFilter] = useState('all');
     const [hasStudyHistory, setHasStudyHistory] = useState(false);
     const [showStudyToolsRedirect, setShowStudyToolsRedirect] = useState(false);
+    const prefetchIdRef = useRef(null);
+
+    // The server pre-generates notes/quiz after a plan; stop that if the learner leaves
+    const cancelPrefetch = useCallback(() => {
+        const prefetchId = prefetchIdRef.current;
+        if (!prefetchId) return;
+        prefetchIdRef.current = null;
+        api.post(`/prefetch/${prefetchId}/cancel/`).catch(() => {});
+    }, []);
+
+    useEffect(() => {
+        window.addEventListener('beforeunload', cancelPrefetch);
+        return () => {
+            window.removeEventListener('beforeunload', cancelPrefetch);
+            cancelPrefetch();
+        };
+    }, [cancelPrefetch]);
 
     const handleLogout = () => {
         logout();
@@ -340,26 +358,15 @@ function Dashboard({ logout }) {
             
             // Load admin topics from API (available to all users)
             try {
-                const response = await api.get('/topics/'); 
-                if (response.data && Array.isArray(response.data)) {
-                    adminTopics = response.data.map(topic => ({
+                // Delta sync: only topics changed since the last visit are downloaded
+                const { topics } = await syncCatalog();
+                adminTopics = topics
+                    .filter(topic => topic.is_active)
+                    .map(topic => ({
                         ...topic,
                         isAdminTopic: true,
                         source: 'System'
                     }));
-                } else if (response.data && response.data.topics && Array.isArray(response.data.topics)) {
-                    adminTopics = response.data.topics.map(topic => ({
-                        ...topic,
-                        isAdminTopic: true,
-                        source: 'System'
-                    }));
-                } else if (response.data && response.data.results && Array.isArray(response.data.results)) {
-                    adminTopics = response.data.results.map(topic => ({
-                        ...topic,
-                        isAdminTopic: true,
-                        source: 'System'
-                    }));
-                }
             } catch (apiError) {
                 console.warn('API fetch failed, using localStorage only:', apiError);
             }
@@ -451,15 +458,19 @@ function Dashboard({ logout }) {
                 duration 
             });
 
-            const response = await api.post('/sessions/', {
+            const response = await postIdempotent('/sessions/', {
                 topic_name: selectedTopic,
                 duration_input: duration,
                 main_subject: topicParts[0],
                 specific_area: specificArea,
                 subtopics: finalSubtopics,
+                // StudyTools asks for notes/quizzes next, with the selected subtopics only
+                prefetch: true,
+                prefetch_subtopics: selectedSubtopics,
                 prompt_type: 'focused_study_plan'
             });
 
+            prefetchIdRef.current = response.data.prefetch_id || null;
             const generatedContentText = response.data.generated_content;
             setGeneratedContent(generatedContentText);
             
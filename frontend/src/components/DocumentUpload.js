@@ -1,6 +1,6 @@
 // DocumentUpload.js
 import React, { useState } from 'react';
-import api from '../api';
+import { postIdempotent } from '../api';
 
 const DocumentUpload = ({ onSummaryGenerated }) => {
     const [selectedFile, setSelectedFile] = useState(null);
@@ -57,11 +57,11 @@ const DocumentUpload = ({ onSummaryGenerated }) => {
 
             console.log('Uploading file:', selectedFile.name);
 
-            const response = await api.post('/upload-summarize/', formData, {
+            const response = await postIdempotent('/upload-summarize/', formData, {
                 headers: {
                     'Content-Type': 'multipart/form-data',
                 },
-            });
+            }, [selectedFile.name, selectedFile.size, selectedFile.lastModified, uploadType]);
 
             const generatedSummary = response.data.summary;
             setSummary(generatedSummary);
@@ -1,6 +1,6 @@
 // StudyTools.js - UPDATED WITH MODERN MARKDOWN RENDERER
 import React, { useState } from 'react';
-import api from '../api';
+import { postIdempotent } from '../api';
 import MarkdownRenderer from './MarkdownRenderer';
 
 const saveToStudyHistory = (filename, content, type) => {
@@ -177,13 +177,13 @@ const StudyTools = ({ topics, selectedTopic, selectedSubtopics = [] }) => {
 
             let response;
             if (type === 'notes') {
-                response = await api.post('/study-tools/', payload);
+                response = await postIdempotent('/study-tools/', payload);
                 const notesContent = response.data.notes;
                 setNotes(notesContent);
                 setQuiz('');
                 saveToStudyHistory(currentTopic, notesContent, 'notes');
             } else if (type === 'quiz') {
-                response = await api.post('/quiz-generate/', payload);
+                response = await postIdempotent('/quiz-generate/', payload);
                 const quizContent = response.data.quiz;
                 setQuiz(quizContent);
                 setNotes('');
@@ -0,0 +1,83 @@
+// src/tutorSocket.js
+// Streaming AI tutor over one WebSocket per chat (see study_core/tutor_ws.py).
+// Authenticates once when the socket opens; each ask() streams chunks to
+// onChunk and resolves with the full answer, or null if it was cancelled.
+import { websocketUrl } from './api';
+
+export class TutorSocketError extends Error {
+    constructor(message, { connected = false, retryAfter = null } = {}) {
+        super(message);
+        this.connected = connected; // false: the socket never became ready (fall back to HTTP)
+        this.retryAfter = retryAfter;
+    }
+}
+
+export class TutorSocket {
+    constructor() {
+        this.ws = null;
+        this.ready = null;
+        this.pending = new Map();
+        this.currentId = null;
+        this.nextId = 1;
+    }
+
+    connect() {
+        if (this.ready) return this.ready;
+        this.ready = new Promise((resolve, reject) => {
+            let connected = false;
+            const ws = new WebSocket(websocketUrl('/ws/tutor/'));
+            this.ws = ws;
+
+            ws.onopen = () => {
+                ws.send(JSON.stringify({ type: 'auth', token: localStorage.getItem('token') }));
+            };
+            ws.onmessage = (event) => {
+                const message = JSON.parse(event.data);
+                if (message.type === 'ready') {
+                    connected = true;
+                    resolve();
+                    return;
+                }
+                const handlers = this.pending.get(message.id);
+                if (!handlers) return;
+                if (message.type === 'chunk') {
+                    handlers.onChunk(message.text);
+                    return;
+                }
+                this.pending.delete(message.id);
+                if (message.type === 'done') handlers.resolve(message.response);
+                else if (message.type === 'cancelled') handlers.resolve(null);
+                else handlers.reject(new TutorSocketError(message.error, { connected: true, retryAfter: message.retry_after }));
+            };
+            ws.onclose = () => {
+                const error = new TutorSocketError('Tutor connection closed', { connected });
+                if (!connected) reject(error);
+                this.pending.forEach((handlers) => handlers.reject(error));
+                this.pending.clear();
+                this.ready = null;
+                this.ws = null;
+            };
+        });
+        return this.ready;
+    }
+
+    async ask(payload, onChunk) {
+        await this.connect();
+        const id = this.nextId++;
+        this.currentId = id;
+        return new Promise((resolve, reject) => {
+            this.pending.set(id, { resolve, reject, onChunk });
+            this.ws.send(JSON.stringify({ type: 'ask', id, ...payload }));
+        });
+    }
+
+    cancel() {
+        if (this.ws && this.pending.has(this.currentId)) {
+            this.ws.send(JSON.stringify({ type: 'cancel', id: this.currentId }));
+        }
+    }
+
+    close() {
+        this.ws?.close();
+    }
+}
@@ -2,6 +2,9 @@
 ASGI config for study_config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP goes to Django; WebSocket connections to /ws/tutor/ go to the
+streaming tutor (study_core/tutor_ws.py). Serve it with an ASGI server,
+e.g. ``gunicorn -k uvicorn_worker.UvicornWorker study_config.asgi:application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +16,22 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'study_config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after setup: tutor_ws needs the app registry
+from study_core import tutor_ws  # noqa: E402
+
+WEBSOCKET_ROUTES = {
+    '/ws/tutor/': tutor_ws.application,
+}
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        handler = WEBSOCKET_ROUTES.get(scope['path'])
+        if handler is None:
+            await receive()  # websocket.connect
+            await send({'type': 'websocket.close', 'code': 4404})
+            return
+        return await handler(scope, receive, send)
+    return await django_application(scope, receive, send)
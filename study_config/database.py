@@ -0,0 +1,85 @@
+"""
+Database configuration for settings.py.
+
+SQLite (local development, DEBUG without DATABASE_URL):
+    Every new connection runs SQLITE_PRAGMAS through Django's init_command.
+    WAL lets readers carry on while a write is in progress. With
+    synchronous=NORMAL a commit doesn't fsync until checkpoint. busy_timeout
+    makes a writer wait for the lock instead of failing straight away.
+    Transactions start IMMEDIATE, taking the write lock at BEGIN. A
+    deferred transaction that reads and then writes can't wait out a
+    concurrent writer (SQLite returns "database is locked" without
+    calling the busy handler), so IMMEDIATE avoids that.
+
+Postgres (DATABASE_URL):
+    Connections come from a psycopg pool in each worker process, instead
+    of one persistent connection per thread kept open for CONN_MAX_AGE.
+    Each worker gets max(DB_POOL_MIN, DB_CONNECTION_BUDGET // WEB_CONCURRENCY)
+    connections. WEB_CONCURRENCY is also what gunicorn reads for its worker
+    count, so all the workers together stay within the budget the database
+    plan allows. Without psycopg_pool installed this falls back to persistent
+    connections.
+"""
+import os
+
+import dj_database_url
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # ms; replaced by sqlite_database(busy_timeout=...)
+    'cache_size': -16000,  # KiB (negative = size, not pages)
+}
+
+
+def sqlite_database(name, busy_timeout=5000, tuned=True):
+    """Django DATABASES entry for SQLite file `name`; tuned=False gives Django's defaults."""
+    database = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': name}
+    if tuned:
+        pragmas = {**SQLITE_PRAGMAS, 'busy_timeout': busy_timeout}
+        database['OPTIONS'] = {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in pragmas.items()),
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': busy_timeout / 1000,
+        }
+    return database
+
+
+def pool_size(budget, workers, minimum):
+    """Connections per worker process so that `workers` of them fit in `budget`."""
+    return max(minimum, budget // max(workers, 1))
+
+
+def postgres_database(url, budget=20, workers=None, pool_min=2, pool_timeout=10, conn_max_age=600):
+    """Django DATABASES entry for `url` with a per-worker psycopg connection pool."""
+    workers = workers or int(os.environ.get('WEB_CONCURRENCY', 1))
+    try:
+        from psycopg_pool import ConnectionPool
+    except ImportError:
+        print("psycopg_pool is not installed; using persistent connections instead of a pool")
+        return dj_database_url.parse(url, conn_max_age=conn_max_age, conn_health_checks=True)
+
+    # Pooled connections must not also be persistent
+    database = dj_database_url.parse(url, conn_max_age=0)
+    size = pool_size(budget, workers, pool_min)
+    database.setdefault('OPTIONS', {})['pool'] = {
+        'min_size': min(pool_min, size),
+        'max_size': size,
+        'timeout': pool_timeout,  # seconds a request waits for a free connection
+        'max_idle': 300,
+        'check': ConnectionPool.check_connection,  # drop connections the server closed
+    }
+    return database
+
+
+def url_database(url, **pool_options):
+    """DATABASES entry for a DATABASE_URL: tuned SQLite, pooled Postgres, anything else as parsed."""
+    if not url:
+        return {}
+    database = dj_database_url.parse(url)
+    if database['ENGINE'] == 'django.db.backends.sqlite3':
+        return sqlite_database(database['NAME'], pool_options.get('busy_timeout', 5000))
+    if database['ENGINE'] == 'django.db.backends.postgresql':
+        pool_options.pop('busy_timeout', None)
+        return postgres_database(url, **pool_options)
+    return dj_database_url.parse(url, conn_max_age=600, conn_health_checks=True)
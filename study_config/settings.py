@@ -2,9 +2,11 @@
 Django settings for study_config project.
 """
 import os
+import sys
 from pathlib import Path
-from decouple import config
-import dj_database_url
+from decouple import Csv, config
+from study_config.database import sqlite_database, url_database
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -38,12 +40,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'study_core.middleware.TimingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware', 
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware', 
+    'study_core.db_routing.ReplicaRoutingMiddleware',
+    'study_core.middleware.ProfilingMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -68,23 +73,53 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'study_config.wsgi.application'
 
-# Database Configuration
+# Database Configuration (see study_config/database.py): SQLite gets WAL and a busy
+# timeout; Postgres gets a per-worker connection pool sized so that WEB_CONCURRENCY
+# workers share DB_CONNECTION_BUDGET connections.
+SQLITE_BUSY_TIMEOUT = config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int)  # ms
+
 if DEBUG and not os.environ.get('DATABASE_URL'):
     DATABASES = {
-        'default': {
-            'ENGINE': 'django.db.backends.sqlite3',
-            'NAME': BASE_DIR / 'db.sqlite3',
-        }
+        'default': sqlite_database(BASE_DIR / 'db.sqlite3', SQLITE_BUSY_TIMEOUT),
     }
 else:
     DATABASES = {
-        'default': dj_database_url.config(
-            default=config('DATABASE_URL', default=os.environ.get('DATABASE_URL')),
-            conn_max_age=600,
-            conn_health_checks=True,
+        'default': url_database(
+            config('DATABASE_URL', default=os.environ.get('DATABASE_URL')),
+            busy_timeout=SQLITE_BUSY_TIMEOUT,
+            budget=config('DB_CONNECTION_BUDGET', default=20, cast=int),
+            pool_min=config('DB_POOL_MIN', default=2, cast=int),
+            pool_timeout=config('DB_POOL_TIMEOUT', default=10, cast=int),
         )
     }
 
+# Read replicas (see study_core/db_routing.py): comma-separated URLs, added as
+# replica1, replica2, ... Read-only views and viewset list/retrieve read from them;
+# a client's reads stay on the primary for STICKY_SECONDS after it writes.
+# Locally: DATABASE_URL=sqlite:///primary.sqlite3 DATABASE_REPLICA_URLS=sqlite:///replica.sqlite3
+REPLICA_ROUTING = {
+    'REPLICAS': [],
+    'STICKY_SECONDS': config('REPLICA_STICKY_SECONDS', default=10, cast=int),
+}
+for number, url in enumerate(config('DATABASE_REPLICA_URLS', default='', cast=Csv()), start=1):
+    alias = f'replica{number}'
+    DATABASES[alias] = url_database(
+        url,
+        busy_timeout=SQLITE_BUSY_TIMEOUT,
+        budget=config('DB_CONNECTION_BUDGET', default=20, cast=int),
+        pool_min=config('DB_POOL_MIN', default=2, cast=int),
+        pool_timeout=config('DB_POOL_TIMEOUT', default=10, cast=int),
+    )
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    REPLICA_ROUTING['REPLICAS'].append(alias)
+
+# `manage.py test` gets one more SQLite database that is not a mirror, so the
+# routing tests can tell which database served a query (see ReplicaRoutingTests)
+if sys.argv[1:2] == ['test']:
+    DATABASES['replica_test'] = sqlite_database(BASE_DIR / 'replica_test.sqlite3', SQLITE_BUSY_TIMEOUT)
+
+DATABASE_ROUTERS = ['study_core.db_routing.ReplicaRouter']
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -142,14 +177,176 @@ CSRF_TRUSTED_ORIGINS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed', 'Retry-After', 'X-AI-Cache']
 
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
+    # orjson: same output as the stock JSON renderer/parser, several times faster
+    'DEFAULT_RENDERER_CLASSES': (
+        'study_core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'study_core.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+}
+
+# Caches. LocMem is per process: with several workers each one keeps its own
+# entries, so anything that must hold across workers (prefetch budgets, AI cache
+# refresh locks, replica sticky marks, idempotency keys) needs these aliases on a
+# shared backend.
+# Each kind of state has its own alias and size so one can't cull another.
+CACHES = {
+    # Token auth, replica sticky marks, dashboard panels, profiles
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'study-assistant',
+        'OPTIONS': {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=10000, cast=int)},
+    },
+    # Generated notes / quizzes / plans (see study_core/ai_cache.py)
+    'ai': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'study-assistant-ai',
+        'OPTIONS': {'MAX_ENTRIES': config('AI_CACHE_MAX_ENTRIES', default=2000, cast=int)},
+    },
+    # Prefetch budgets and job state (see study_core/prefetch.py)
+    'prefetch': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'study-assistant-prefetch',
+        'OPTIONS': {'MAX_ENTRIES': config('AI_PREFETCH_CACHE_MAX_ENTRIES', default=5000, cast=int)},
+    },
+    # Idempotency-Key markers and stored responses (see study_core/idempotency.py).
+    # Per process as configured; only a shared backend deduplicates retries across workers.
+    'idempotency': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'study-assistant-idempotency',
+        'OPTIONS': {'MAX_ENTRIES': config('IDEMPOTENCY_CACHE_MAX_ENTRIES', default=5000, cast=int)},
+    },
+}
+
+# AI generation cache: served fresh until SOFT_TTL, served stale while one
+# background refresh runs until HARD_TTL, regenerated inline after that
+AI_CACHE = {
+    'ENABLED': config('AI_CACHE_ENABLED', default=True, cast=bool),
+    'SOFT_TTL': config('AI_CACHE_SOFT_TTL', default=6 * 60 * 60, cast=int),
+    'HARD_TTL': config('AI_CACHE_HARD_TTL', default=24 * 60 * 60, cast=int),
+    'REFRESH_WORKERS': config('AI_CACHE_REFRESH_WORKERS', default=2, cast=int),
+}
+
+# Speculative notes/quiz generation after a study plan (see study_core/prefetch.py).
+# Off by default: each prefetch is a paid Gemini call. When on, a plan request
+# still only prefetches if it sends "prefetch": true.
+AI_PREFETCH = {
+    'ENABLED': config('AI_PREFETCH_ENABLED', default=False, cast=bool),
+    'BUDGET_PER_USER': config('AI_PREFETCH_BUDGET_PER_USER', default=10, cast=int),
+    'BUDGET_WINDOW': config('AI_PREFETCH_BUDGET_WINDOW', default=60 * 60, cast=int),
 }
 
+# Concurrent Gemini generations per process, queued by priority class (see study_core/admission.py).
+# Keep MAX_CONCURRENT plus the queue lengths below the server's worker threads.
+ADMISSION = {
+    'ENABLED': config('ADMISSION_ENABLED', default=True, cast=bool),
+    'MAX_CONCURRENT': config('ADMISSION_MAX_CONCURRENT', default=4, cast=int),
+    'RESERVED_INTERACTIVE': config('ADMISSION_RESERVED_INTERACTIVE', default=1, cast=int),
+    'GLOBAL_MAX_CONCURRENT': config('ADMISSION_GLOBAL_MAX_CONCURRENT', default=0, cast=int),
+}
+
+# Idempotency-Key on POST generation endpoints (see study_core/idempotency.py)
+IDEMPOTENCY = {
+    'ENABLED': config('IDEMPOTENCY_ENABLED', default=True, cast=bool),
+    'RETENTION': config('IDEMPOTENCY_RETENTION', default=24 * 60 * 60, cast=int),
+}
+
+# Uploaded images are downscaled and re-encoded before being sent to Gemini (see study_core/images.py)
+IMAGE_UPLOADS = {
+    'MAX_SIDE': config('IMAGE_UPLOAD_MAX_SIDE', default=1600, cast=int),
+    'FORMAT': config('IMAGE_UPLOAD_FORMAT', default='JPEG'),
+    'QUALITY': config('IMAGE_UPLOAD_QUALITY', default=80, cast=int),
+}
+
+# WebSocket tutor at /ws/tutor/ (see study_core/tutor_ws.py; needs an ASGI server)
+TUTOR_WS = {
+    'IDLE_TIMEOUT': config('TUTOR_WS_IDLE_TIMEOUT', default=15 * 60, cast=int),
+}
+
+# Token budgets for prompts (see study_core/prompt_budget.py). PROVIDER_COUNT adds a
+# Gemini count_tokens call per prompt to correct the local estimate.
+PROMPT_BUDGET = {
+    'PROVIDER_COUNT': config('PROMPT_BUDGET_PROVIDER_COUNT', default=False, cast=bool),
+    'BUDGETS': {
+        'tutor': {'total': config('PROMPT_BUDGET_TUTOR', default=4000, cast=int)},
+        'summary': {'total': config('PROMPT_BUDGET_SUMMARY', default=12000, cast=int)},
+    },
+}
+
+# Local recommendations (see study_core/recommender.py). With PHRASE_WITH_LLM on, Gemini
+# rewords the locally ranked results; otherwise /api/ai-recommendations/ makes no AI call
+# for signed-in users unless the client asks for it.
+RECOMMENDER = {
+    'MODEL_TTL': config('RECOMMENDER_MODEL_TTL', default=15 * 60, cast=int),
+    'PHRASE_WITH_LLM': config('RECOMMENDER_PHRASE_WITH_LLM', default=False, cast=bool),
+}
+
+# Spaced-repetition reviews (see study_core/reviews.py). After changing these, run
+# `manage.py reschedule_reviews` (nightly cron) to move existing intervals and due dates.
+REVIEWS = {
+    'INTERVAL_MODIFIER': config('REVIEWS_INTERVAL_MODIFIER', default=1.0, cast=float),
+    'MAX_INTERVAL_DAYS': config('REVIEWS_MAX_INTERVAL_DAYS', default=365, cast=int),
+    'FIRST_INTERVAL_DAYS': config('REVIEWS_FIRST_INTERVAL_DAYS', default=1.0, cast=float),
+    'SECOND_INTERVAL_DAYS': config('REVIEWS_SECOND_INTERVAL_DAYS', default=6.0, cast=float),
+    'MIN_EASE': config('REVIEWS_MIN_EASE', default=1.3, cast=float),
+}
+
+# Staff profiling and the slow-query log (see study_core/profiling.py)
+PROFILING = {
+    'SLOW_QUERY_MS': config('SLOW_QUERY_MS', default=100, cast=int),
+    'SLOW_QUERY_LOG_SIZE': config('SLOW_QUERY_LOG_SIZE', default=200, cast=int),
+    'EXPLAIN': config('SLOW_QUERY_EXPLAIN', default=True, cast=bool),
+}
+
+# Activity log (see study_core/activity.py); `manage.py prune_activity` daily
+ACTIVITY = {
+    'FLUSH_INTERVAL': config('ACTIVITY_FLUSH_INTERVAL', default=2.0, cast=float),
+    'RETENTION_DAYS': config('ACTIVITY_RETENTION_DAYS', default=90, cast=int),
+}
+
+# /api/admin/dashboard/ (see study_core/dashboard.py): per-panel cache TTLs in seconds
+ADMIN_DASHBOARD = {
+    'WORKERS': config('ADMIN_DASHBOARD_WORKERS', default=4, cast=int),
+    'PANEL_TTLS': {
+        'analytics': config('ADMIN_DASHBOARD_ANALYTICS_TTL', default=60, cast=int),
+        'activities': config('ADMIN_DASHBOARD_ACTIVITIES_TTL', default=10, cast=int),
+    },
+}
+
+# Delta sync (/api/sync/): deletions are remembered this long; older cursors get a full resync
+SYNC_TOMBSTONE_RETENTION_DAYS = config('SYNC_TOMBSTONE_RETENTION_DAYS', default=30, cast=int)
+
+# Seconds a token -> user lookup is served from cache
+AUTH_TOKEN_CACHE_TTL = config('AUTH_TOKEN_CACHE_TTL', default=60, cast=int)
+# Check cached tokens against the database on every hit. Unset: only while the
+# default cache is per-process (LocMem), where logouts in other workers can't reach it
+# AUTH_TOKEN_CACHE_VERIFY = True
+
 # AI Key
-GEMINI_API_KEY = config('GEMINI_API_KEY', default=os.environ.get('GEMINI_API_KEY', ''))
\ No newline at end of file
+GEMINI_API_KEY = config('GEMINI_API_KEY', default=os.environ.get('GEMINI_API_KEY', ''))
+
+# HTTP transport for the Gemini client (see study_core/http_pool.py).
+# Timeouts bound a single attempt; retries/backoff live in generate_with_retry.
+GEMINI_HTTP = {
+    'MAX_CONNECTIONS': config('GEMINI_HTTP_MAX_CONNECTIONS', default=20, cast=int),
+    'MAX_KEEPALIVE_CONNECTIONS': config('GEMINI_HTTP_MAX_KEEPALIVE', default=10, cast=int),
+    'KEEPALIVE_EXPIRY': config('GEMINI_HTTP_KEEPALIVE_EXPIRY', default=60.0, cast=float),
+    'CONNECT_TIMEOUT': config('GEMINI_HTTP_CONNECT_TIMEOUT', default=5.0, cast=float),
+    'READ_TIMEOUT': config('GEMINI_HTTP_READ_TIMEOUT', default=60.0, cast=float),
+    'WRITE_TIMEOUT': config('GEMINI_HTTP_WRITE_TIMEOUT', default=10.0, cast=float),
+    'POOL_TIMEOUT': config('GEMINI_HTTP_POOL_TIMEOUT', default=5.0, cast=float),
+    'HTTP2': config('GEMINI_HTTP2', default=True, cast=bool),
+}
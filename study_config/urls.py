@@ -5,7 +5,10 @@ from django.urls import path, include
 from django.views.generic.base import RedirectView 
 from django.conf import settings
 from django.conf.urls.static import static
-from admin.views import admin_analytics, recent_activities, user_management_data  
+from admin.views import (
+    admin_analytics, admin_dashboard, recent_activities, user_management_data, metrics, profiles, profile_detail,
+    slow_queries,
+)
 
 urlpatterns = [
     
@@ -18,9 +21,14 @@ urlpatterns = [
     path('api/', include('study_core.urls')), 
     
     
+    path('api/admin/dashboard/', admin_dashboard, name='admin-dashboard'),
     path('api/admin/analytics/', admin_analytics, name='admin-analytics'),
     path('api/admin/recent-activities/', recent_activities, name='recent-activities'),
     path('api/admin/users/', user_management_data, name='user-management'),
+    path('api/admin/metrics/', metrics, name='admin-metrics'),
+    path('api/admin/profiles/', profiles, name='admin-profiles'),
+    path('api/admin/profiles/<str:profile_id>/', profile_detail, name='admin-profile-detail'),
+    path('api/admin/slow-queries/', slow_queries, name='admin-slow-queries'),
     
     
     path('', RedirectView.as_view(url='api/', permanent=True)), 
@@ -0,0 +1,192 @@
+# study_core/activity.py
+"""
+Activity event log: record() from request code, recent() for feeds.
+
+record() doesn't write to the database. It queues an ActivityEvent in
+this process and returns. A background thread (one per process, started
+on first use) writes the queue with one bulk_create per FLUSH_INTERVAL
+seconds, or sooner once BATCH_SIZE events are waiting. Events recorded
+inside a transaction are only queued once it commits, so a rolled-back
+create doesn't show up in the feed. The queue is bounded (MAX_BUFFER);
+if the database is unavailable for long enough to fill it, the oldest
+events are dropped and counted. The queue is flushed at exit. With
+BUFFERED off (tests, scripts), record() writes immediately.
+
+recent() is a single LIMIT query on the created_at index (or the
+(event_type, created_at) index when filtered by type). It flushes this
+process's queue first. Events still queued in other workers show up
+within FLUSH_INTERVAL.
+
+Old events are deleted in batches by `manage.py prune_activity`, run
+daily. Neither SQLite nor the migrations here manage table partitions.
+"""
+import atexit
+import os
+import threading
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .instrumentation import registry
+from .models import ActivityEvent
+
+DEFAULTS = {
+    'BUFFERED': True,
+    'BATCH_SIZE': 100,  # events per INSERT; also wakes the writer early
+    'FLUSH_INTERVAL': 2.0,  # seconds between background writes
+    'MAX_BUFFER': 10000,  # queued events kept while the database is unavailable
+    'RETENTION_DAYS': 90,
+    'PRUNE_BATCH': 5000,  # rows per DELETE in prune()
+    'FEED_LIMIT': 5,
+    'MAX_FEED_LIMIT': 100,
+}
+
+_buffer = deque()
+_lock = threading.Lock()
+_flush_lock = threading.Lock()  # one bulk_create at a time, so events keep their order
+_wake = threading.Event()
+_writers = {}  # pid -> writer thread (re-created after fork)
+
+registry.describe('study_activity_events_total', 'Activity events, by outcome (queued, written, dropped).')
+registry.describe('study_activity_queue_length', 'Activity events waiting to be written in this process.')
+registry.register_gauge('study_activity_queue_length', lambda: len(_buffer))
+
+
+def activity_settings():
+    return {**DEFAULTS, **getattr(settings, 'ACTIVITY', {})}
+
+
+# --- WRITING ---
+
+def record(event_type, user=None, message='', **data):
+    """Queue an activity event. `user` is who did it (None or anonymous for the system)."""
+    if user is not None and not user.is_authenticated:
+        user = None
+    event = ActivityEvent(
+        event_type=event_type,
+        user_id=user.pk if user is not None else None,
+        username=user.get_username()[:150] if user is not None else '',
+        message=str(message)[:255],
+        data=data,
+        created_at=timezone.now(),
+    )
+    transaction.on_commit(lambda: _enqueue(event))
+
+
+def _enqueue(event):
+    options = activity_settings()
+    if not options['BUFFERED']:
+        ActivityEvent.objects.bulk_create([event])
+        registry.increment('study_activity_events_total', {'outcome': 'written'})
+        return
+    with _lock:
+        _buffer.append(event)
+        dropped = 0
+        while len(_buffer) > options['MAX_BUFFER']:
+            _buffer.popleft()
+            dropped += 1
+        pending = len(_buffer)
+    registry.increment('study_activity_events_total', {'outcome': 'queued'})
+    if dropped:
+        registry.increment('study_activity_events_total', {'outcome': 'dropped'}, dropped)
+    _ensure_writer()
+    if pending >= options['BATCH_SIZE']:
+        _wake.set()
+
+
+def flush():
+    """Write every queued event now; returns how many were written."""
+    options = activity_settings()
+    with _flush_lock:
+        with _lock:
+            events = list(_buffer)
+            _buffer.clear()
+        if not events:
+            return 0
+        try:
+            ActivityEvent.objects.bulk_create(events, batch_size=options['BATCH_SIZE'])
+        except Exception as e:
+            print(f"Activity log flush failed, keeping {len(events)} events queued: {e}")
+            with _lock:
+                _buffer.extendleft(reversed(events))
+                while len(_buffer) > options['MAX_BUFFER']:
+                    _buffer.popleft()
+            raise
+    registry.increment('study_activity_events_total', {'outcome': 'written'}, len(events))
+    return len(events)
+
+
+def _run_writer():
+    while True:
+        _wake.wait(activity_settings()['FLUSH_INTERVAL'])
+        _wake.clear()
+        try:
+            flush()
+        except Exception:
+            pass  # already logged; retried on the next round
+        finally:
+            # Give the connection back (to the pool, on Postgres) between rounds
+            connections.close_all()
+
+
+def _ensure_writer():
+    pid = os.getpid()
+    if pid in _writers:
+        return
+    with _lock:
+        if pid not in _writers:
+            thread = threading.Thread(target=_run_writer, name='activity-writer', daemon=True)
+            _writers[pid] = thread
+            thread.start()
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        flush()
+    except Exception:
+        pass
+
+
+# --- READING ---
+
+def recent(limit=None, event_types=None):
+    """The newest `limit` events, optionally only of the given types."""
+    options = activity_settings()
+    limit = max(1, min(limit or options['FEED_LIMIT'], options['MAX_FEED_LIMIT']))
+    try:
+        flush()
+    except Exception:
+        pass  # show what is already stored
+    events = ActivityEvent.objects.order_by('-created_at')
+    if event_types:
+        events = events.filter(event_type__in=list(event_types))
+    return list(events[:limit])
+
+
+def serialize(event):
+    """The admin feed's activity shape."""
+    return {
+        'type': event.event_type,
+        'message': event.message,
+        'timestamp': event.created_at.isoformat(),
+        'user': event.username or 'System',
+    }
+
+
+def prune(now=None, batch_size=None):
+    """Delete events older than RETENTION_DAYS in batches; returns how many went."""
+    options = activity_settings()
+    cutoff = (now or timezone.now()) - timedelta(days=options['RETENTION_DAYS'])
+    batch_size = batch_size or options['PRUNE_BATCH']
+    old = ActivityEvent.objects.filter(created_at__lt=cutoff)
+    deleted = 0
+    while True:
+        # Short transactions: a large backlog never locks the table for long
+        pks = list(old.order_by('created_at').values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        deleted += ActivityEvent.objects.filter(pk__in=pks).delete()[0]
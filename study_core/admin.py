@@ -1,10 +1,36 @@
 
 from django.contrib import admin
-from .models import StudyTopic, StudySession
+from .models import ActivityEvent, StudyTopic, StudySession, QuizAttempt, ReviewItem, TopicMastery
 
 class StudyTopicAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('name',)}
     list_display = ('name', 'slug') 
 
 admin.site.register(StudyTopic, StudyTopicAdmin) 
-admin.site.register(StudySession) 
\ No newline at end of file
+admin.site.register(StudySession)
+
+
+class TopicMasteryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'topic_name', 'attempts', 'recent_score', 'best_score', 'study_sessions')
+    search_fields = ('topic_name', 'user__username')
+
+admin.site.register(TopicMastery, TopicMasteryAdmin)
+admin.site.register(QuizAttempt)
+
+
+class ReviewItemAdmin(admin.ModelAdmin):
+    list_display = ('user', 'kind', 'topic_name', 'due_at', 'interval_days', 'ease', 'lapses')
+    list_filter = ('kind',)
+    search_fields = ('topic_name', 'prompt', 'user__username')
+    raw_id_fields = ('user',)
+
+admin.site.register(ReviewItem, ReviewItemAdmin)
+
+
+class ActivityEventAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'event_type', 'username', 'message')
+    list_filter = ('event_type',)
+    search_fields = ('message', 'username')
+    date_hierarchy = 'created_at'
+
+admin.site.register(ActivityEvent, ActivityEventAdmin)
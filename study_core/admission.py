@@ -0,0 +1,323 @@
+# study_core/admission.py
+"""
+Admission control for Gemini calls.
+
+LLM-bound requests hold a worker thread for seconds at a time. If nothing
+limits them, a burst of quiz generations takes every worker and cheap
+endpoints (topics, login, admin) stop responding. So generate_with_retry
+runs inside slot(), which:
+
+- caps concurrent generations per process (MAX_CONCURRENT), keeping
+  RESERVED_INTERACTIVE of those slots for the interactive class only,
+- optionally caps them across processes (GLOBAL_MAX_CONCURRENT, a counter
+  in the default cache; it only holds globally if that cache is shared),
+- queues callers by priority class, with a bounded queue length and
+  bounded wait per class,
+- raises Rejected when a queue is full or the wait runs out. Views turn
+  that into 429 with a Retry-After estimated from recent service times.
+
+Priority classes, highest first:
+    interactive  tutor chat, where someone is waiting on every message
+    standard     study plans, notes, quizzes, recommendations
+    bulk         upload summarisation
+    background   cache refreshes and prefetch (the default outside views)
+
+Views pick a class with the @priority(...) decorator. Cache hits never
+reach slot(), so they aren't throttled. Async code (the WebSocket tutor)
+uses async_slot(), which waits in a thread instead of the event loop.
+
+Queued requests still hold a worker thread, so MAX_CONCURRENT plus the
+queue lengths should stay well under the server's thread count.
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from .instrumentation import phase, registry
+
+INTERACTIVE = 'interactive'
+STANDARD = 'standard'
+BULK = 'bulk'
+BACKGROUND = 'background'
+
+RANKS = {INTERACTIVE: 0, STANDARD: 1, BULK: 2, BACKGROUND: 3}
+
+DEFAULTS = {
+    'ENABLED': True,
+    'MAX_CONCURRENT': 4,  # generations per process
+    'RESERVED_INTERACTIVE': 1,  # of those, slots only the interactive class may use
+    'GLOBAL_MAX_CONCURRENT': 0,  # across processes via the default cache; 0 = off
+    'GLOBAL_SLOT_TTL': 300,  # seconds; bounds how long a crashed process can leak global slots
+    'MAX_QUEUE': {INTERACTIVE: 8, STANDARD: 8, BULK: 2, BACKGROUND: 4},
+    'MAX_WAIT': {INTERACTIVE: 20, STANDARD: 15, BULK: 5, BACKGROUND: 30},  # seconds
+}
+
+GLOBAL_KEY = 'admission:global:in_flight'
+GLOBAL_POLL = 0.05
+
+_priority = ContextVar('admission_priority', default=BACKGROUND)
+
+registry.describe('study_admission_total', 'Gemini admission decisions, by priority class and result.')
+
+
+def admission_settings():
+    options = {**DEFAULTS, **getattr(settings, 'ADMISSION', {})}
+    for key in ('MAX_QUEUE', 'MAX_WAIT'):
+        options[key] = {**DEFAULTS[key], **options[key]}
+    return options
+
+
+class Rejected(Exception):
+    """The generation was shed; retry after `retry_after` seconds."""
+
+    def __init__(self, klass, reason, retry_after):
+        super().__init__(f"{klass} generation rejected ({reason}); retry after {retry_after}s")
+        self.klass = klass
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+# --- PRIORITY ---
+
+def priority(klass):
+    """View decorator: run the view's generations in priority class `klass`."""
+    if klass not in RANKS:
+        raise ValueError(f"Unknown priority class: {klass}")
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            token = _priority.set(klass)
+            try:
+                return view(*args, **kwargs)
+            finally:
+                _priority.reset(token)
+        return wrapper
+    return decorator
+
+
+def current_priority():
+    return _priority.get()
+
+
+# --- CONTROLLER ---
+
+class _Ticket:
+    """A queued caller; _dispatch() hands it a slot by setting `started`."""
+
+    __slots__ = ('klass', 'started')
+
+    def __init__(self, klass):
+        self.klass = klass
+        self.started = None
+
+
+class AdmissionController:
+    """
+    Per-process slots handed out by (priority, arrival order).
+
+    A freed slot goes straight to the best waiter that may use it
+    (_dispatch), under the lock, before anyone else can see it. So every
+    caller left in the queue is one that really can't run yet: a new
+    arrival is admitted whenever its class is under its limit, and only
+    the truly blocked waiters count against MAX_QUEUE.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._waiting = []  # heap of (rank, seq, ticket)
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._running = dict.fromkeys(RANKS, 0)
+        self._queued = dict.fromkeys(RANKS, 0)
+        self._service_time = 5.0  # EWMA of seconds a slot is held, seeds Retry-After
+
+    def _limit(self, klass, options):
+        if klass == INTERACTIVE:
+            return options['MAX_CONCURRENT']
+        return max(1, options['MAX_CONCURRENT'] - options['RESERVED_INTERACTIVE'])
+
+    def retry_after(self, options):
+        """Rough seconds until the current queue drains, at least 1."""
+        backlog = sum(self._queued.values()) + self._in_flight
+        return max(1, math.ceil(self._service_time * backlog / max(options['MAX_CONCURRENT'], 1)))
+
+    def acquire(self, klass, options):
+        with self._cond:
+            # After _dispatch() no waiter of equal or higher priority can
+            # run, so being under the limit is enough to go ahead of them
+            if self._in_flight < self._limit(klass, options):
+                return self._admit(klass)
+            if self._queued[klass] >= options['MAX_QUEUE'][klass]:
+                raise Rejected(klass, 'queue_full', self.retry_after(options))
+
+            ticket = _Ticket(klass)
+            entry = (RANKS[klass], next(self._seq), ticket)
+            heapq.heappush(self._waiting, entry)
+            self._queued[klass] += 1
+            deadline = time.monotonic() + options['MAX_WAIT'][klass]
+            while ticket.started is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                    self._queued[klass] -= 1
+                    raise Rejected(klass, 'timeout', self.retry_after(options))
+                self._cond.wait(remaining)
+            return ticket.started
+
+    def _admit(self, klass):
+        self._in_flight += 1
+        self._running[klass] += 1
+        return time.monotonic()
+
+    def _dispatch(self, options):
+        """Give free slots to waiters in priority order (lock held)."""
+        granted = False
+        while self._waiting:
+            rank, seq, ticket = self._waiting[0]
+            if self._in_flight >= self._limit(ticket.klass, options):
+                # Lower classes have no higher limit than the head's
+                break
+            heapq.heappop(self._waiting)
+            self._queued[ticket.klass] -= 1
+            ticket.started = self._admit(ticket.klass)
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def release(self, klass, started, options=None):
+        with self._cond:
+            self._in_flight -= 1
+            self._running[klass] -= 1
+            self._service_time = 0.8 * self._service_time + 0.2 * (time.monotonic() - started)
+            self._dispatch(options or admission_settings())
+
+    def stats(self):
+        with self._cond:
+            return (
+                [({'class': klass, 'state': 'running'}, n) for klass, n in self._running.items()]
+                + [({'class': klass, 'state': 'queued'}, n) for klass, n in self._queued.items()]
+            )
+
+
+controller = AdmissionController()
+registry.register_gauge('study_admission_slots', controller.stats)
+
+
+# --- GLOBAL CAP ---
+
+def _acquire_global(klass, options, deadline):
+    limit = options['GLOBAL_MAX_CONCURRENT']
+    while True:
+        cache.add(GLOBAL_KEY, 0, timeout=options['GLOBAL_SLOT_TTL'])
+        try:
+            if cache.incr(GLOBAL_KEY) <= limit:
+                cache.touch(GLOBAL_KEY, options['GLOBAL_SLOT_TTL'])
+                return
+            cache.decr(GLOBAL_KEY)
+        except ValueError:  # expired between add() and incr()/decr()
+            continue
+        if time.monotonic() >= deadline:
+            raise Rejected(klass, 'global_limit', controller.retry_after(options))
+        time.sleep(GLOBAL_POLL)
+
+
+def _release_global():
+    try:
+        cache.decr(GLOBAL_KEY)
+    except ValueError:  # the counter expired while we held the slot
+        pass
+
+
+def _acquire(klass, options):
+    """Take a local (and, if configured, global) slot; returns the start time for release()."""
+    try:
+        started = controller.acquire(klass, options)
+        if options['GLOBAL_MAX_CONCURRENT']:
+            try:
+                _acquire_global(klass, options, time.monotonic() + options['MAX_WAIT'][klass])
+            except Rejected:
+                controller.release(klass, started, options)
+                raise
+    except Rejected as e:
+        registry.increment('study_admission_total', {'class': klass, 'result': e.reason})
+        raise
+    registry.increment('study_admission_total', {'class': klass, 'result': 'admitted'})
+    return started
+
+
+def _release(klass, started, options):
+    if options['GLOBAL_MAX_CONCURRENT']:
+        _release_global()
+    controller.release(klass, started, options)
+
+
+@contextmanager
+def slot(klass=None):
+    """Hold one generation slot for the duration of the block (or raise Rejected)."""
+    options = admission_settings()
+    if not options['ENABLED']:
+        yield
+        return
+    klass = klass or current_priority()
+
+    with phase('queue'):
+        started = _acquire(klass, options)
+    try:
+        yield
+    finally:
+        _release(klass, started, options)
+
+
+@asynccontextmanager
+async def async_slot(klass=None):
+    """slot() for async code: the blocking wait runs in a thread, off the event loop."""
+    options = admission_settings()
+    if not options['ENABLED']:
+        yield
+        return
+    klass = klass or current_priority()
+
+    acquiring = asyncio.get_running_loop().run_in_executor(None, _acquire, klass, options)
+    try:
+        started = await asyncio.shield(acquiring)
+    except asyncio.CancelledError:
+        # The waiting thread may still get the slot; hand it straight back
+        acquiring.add_done_callback(
+            lambda done: done.exception() is None and _release(klass, done.result(), options)
+        )
+        raise
+    try:
+        yield
+    finally:
+        _release(klass, started, options)
+
+
+def admitted(func):
+    """Run `func` inside slot(); applied outermost so queueing isn't timed as generation."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with slot():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def rejected_response(error):
+    response = Response(
+        {"error": "The AI service is busy. Please try again shortly.", "retry_after": error.retry_after},
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+    )
+    response['Retry-After'] = str(error.retry_after)
+    return response
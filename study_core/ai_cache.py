@@ -0,0 +1,197 @@
+# study_core/ai_cache.py
+"""
+Response cache for AI generations with stale-while-revalidate.
+
+Each entry carries two expiry times:
+
+- soft: until then the entry is served as a plain hit.
+- hard: between soft and hard the stale copy is still served
+  immediately, and one background refresh is started (guarded by a
+  cache.add() lock, so only one worker regenerates a hot key). Only
+  after hard expiry (or on a cold miss) does the request block on
+  Gemini.
+
+Soft expiry is jittered so entries written together don't go stale
+together. Failure messages from generate_with_retry are never cached.
+
+warm() fills an entry ahead of time (speculative prefetch). A request
+that misses while a warm() for the same key is running in this process
+waits for that generation instead of starting a second one.
+
+Entries and refresh locks live in the CACHE_ALIAS cache ('ai', sized by
+AI_CACHE_MAX_ENTRIES). With the default LocMem backend each worker has
+its own copy: a prompt is generated once per worker, and "one refresh"
+means one per worker. Entries culled when the cache is full are simply
+misses. A shared backend for the alias makes both hold across workers.
+"""
+import hashlib
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .instrumentation import registry
+
+DEFAULTS = {
+    'ENABLED': True,
+    'CACHE_ALIAS': 'ai',
+    'SOFT_TTL': 6 * 60 * 60,
+    'HARD_TTL': 24 * 60 * 60,
+    'JITTER': 0.1,  # +/- fraction applied to the soft TTL
+    'REFRESH_WORKERS': 2,
+    'REFRESH_LOCK_TTL': 120,  # seconds; covers the slowest generation plus retries
+    'INFLIGHT_WAIT': 90,  # max seconds a miss waits for an in-flight warm()
+}
+
+HIT = 'hit'
+STALE = 'stale'
+MISS = 'miss'
+BYPASS = 'bypass'
+JOINED = 'joined'  # waited for an in-flight warm() of the same key
+
+_executors = {}
+_lock = threading.Lock()
+
+# cache key -> Future for warm() generations running in this process
+_inflight = {}
+
+registry.describe('study_ai_cache_total', 'AI generation cache lookups and background refreshes, by result.')
+
+
+def cache_settings():
+    return {**DEFAULTS, **getattr(settings, 'AI_CACHE', {})}
+
+
+def cache_key(kind, prompt, model):
+    digest = hashlib.sha256(f'{model}\0{prompt}'.encode('utf-8')).hexdigest()
+    return f'ai:{kind}:{digest}'
+
+
+def _executor(workers):
+    """Per-process pool for background refreshes (re-created after fork)."""
+    pid = os.getpid()
+    executor = _executors.get(pid)
+    if executor is None:
+        with _lock:
+            executor = _executors.get(pid)
+            if executor is None:
+                executor = _executors[pid] = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix='ai-cache-refresh'
+                )
+    return executor
+
+
+def _store(cache, key, value, options):
+    now = time.time()
+    jitter = options['JITTER']
+    soft_ttl = options['SOFT_TTL'] * (1 + random.uniform(-jitter, jitter))
+    hard_ttl = options['HARD_TTL']
+    cache.set(key, {
+        'value': value,
+        'soft_expires': now + min(soft_ttl, hard_ttl),
+        'hard_expires': now + hard_ttl,
+    }, timeout=hard_ttl)
+
+
+def _refresh(cache, key, lock_key, kind, prompt, generate, failed, options):
+    try:
+        value = generate(prompt)
+        if failed(value):
+            registry.increment('study_ai_cache_total', {'kind': kind, 'result': 'refresh_failed'})
+            return
+        _store(cache, key, value, options)
+        registry.increment('study_ai_cache_total', {'kind': kind, 'result': 'refreshed'})
+    except Exception as e:
+        print(f"AI cache refresh failed for {kind}: {e}")
+        registry.increment('study_ai_cache_total', {'kind': kind, 'result': 'refresh_failed'})
+    finally:
+        cache.delete(lock_key)
+
+
+def get_or_generate(kind, prompt, generate, failed, model=''):
+    """
+    Return (text, status) for `prompt`; status is hit/stale/joined/miss/bypass.
+
+    `generate(prompt)` produces the text. `failed(text)` says whether the
+    result is an error message that must not be cached.
+    """
+    options = cache_settings()
+    if not options['ENABLED']:
+        return generate(prompt), BYPASS
+
+    cache = caches[options['CACHE_ALIAS']]
+    key = cache_key(kind, prompt, model)
+    entry = cache.get(key)
+    now = time.time()
+
+    if entry is not None and now < entry['hard_expires']:
+        if now < entry['soft_expires']:
+            registry.increment('study_ai_cache_total', {'kind': kind, 'result': HIT})
+            return entry['value'], HIT
+        # Stale: serve it now, and let exactly one caller refresh in the background
+        lock_key = f'{key}:refresh'
+        if cache.add(lock_key, 1, timeout=options['REFRESH_LOCK_TTL']):
+            try:
+                _executor(options['REFRESH_WORKERS']).submit(
+                    _refresh, cache, key, lock_key, kind, prompt, generate, failed, options
+                )
+            except RuntimeError:  # executor shut down (interpreter exiting)
+                cache.delete(lock_key)
+        registry.increment('study_ai_cache_total', {'kind': kind, 'result': STALE})
+        return entry['value'], STALE
+
+    pending = _inflight.get(key)
+    if pending is not None:
+        try:
+            value = pending.result(timeout=options['INFLIGHT_WAIT'])
+        except FutureTimeout:
+            value = None
+        if value is not None and not failed(value):
+            registry.increment('study_ai_cache_total', {'kind': kind, 'result': JOINED})
+            return value, JOINED
+
+    value = generate(prompt)
+    if not failed(value):
+        _store(cache, key, value, options)
+    registry.increment('study_ai_cache_total', {'kind': kind, 'result': MISS})
+    return value, MISS
+
+
+def is_fresh(kind, prompt, model=''):
+    options = cache_settings()
+    entry = caches[options['CACHE_ALIAS']].get(cache_key(kind, prompt, model))
+    return entry is not None and time.time() < entry['soft_expires']
+
+
+def warm(kind, prompt, generate, failed, model=''):
+    """
+    Generate and cache `prompt` unless a fresh entry exists or another
+    generation of it is already running. Returns True if it generated.
+    """
+    options = cache_settings()
+    if not options['ENABLED'] or is_fresh(kind, prompt, model):
+        return False
+    cache = caches[options['CACHE_ALIAS']]
+    key = cache_key(kind, prompt, model)
+    lock_key = f'{key}:refresh'
+    if not cache.add(lock_key, 1, timeout=options['REFRESH_LOCK_TTL']):
+        return False
+
+    future = Future()
+    _inflight[key] = future
+    value = None
+    try:
+        value = generate(prompt)
+        if not failed(value):
+            _store(cache, key, value, options)
+            registry.increment('study_ai_cache_total', {'kind': kind, 'result': 'warmed'})
+        return True
+    finally:
+        future.set_result(value)
+        _inflight.pop(key, None)
+        cache.delete(lock_key)
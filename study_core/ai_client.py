@@ -0,0 +1,73 @@
+# study_core/ai_client.py
+"""
+Lazily constructed Gemini clients.
+
+google-genai is expensive to import and the client is only needed by the
+generation endpoints, so nothing here touches the SDK until the first
+call to get_client(). Clients are cached per process (keyed by PID) so a
+gunicorn worker forked from a preloaded master never reuses the parent's
+client and its sockets. All clients in a process share the pooled httpx
+transports from http_pool.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+_clients = {}
+_lock = threading.Lock()
+_override = None
+
+
+def _build_client(api_key):
+    from google import genai  # heavy import, deferred until first use
+    from google.genai import types
+    from .http_pool import get_async_http_client, get_http_client
+
+    return genai.Client(
+        api_key=api_key,
+        http_options=types.HttpOptions(
+            httpx_client=get_http_client(),
+            httpx_async_client=get_async_http_client(),
+        ),
+    )
+
+
+def get_client(api_key=None):
+    """Return this process's Gemini client, creating it on first use."""
+    if _override is not None:
+        return _override
+    key = (os.getpid(), api_key or settings.GEMINI_API_KEY)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = _build_client(key[1])
+    return client
+
+
+def reset_clients():
+    """Drop cached clients (e.g. after settings change or in a forked child)."""
+    with _lock:
+        _clients.clear()
+
+
+def image_part(data, mime_type):
+    """Inline image content for generate_content(contents=[...])."""
+    from google.genai import types  # heavy import, deferred until first use
+
+    return types.Part.from_bytes(data=data, mime_type=mime_type)
+
+
+@contextmanager
+def override_client(client):
+    """Temporarily serve `client` from get_client(); used by benchmarks."""
+    global _override
+    previous = _override
+    _override = client
+    try:
+        yield client
+    finally:
+        _override = previous
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class StudyCoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'study_core'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,161 @@
+# study_core/benchmarking.py
+"""
+Helpers shared by the bench_* management commands.
+
+The API benchmark drives the real URLconf through django.test.Client
+against a throwaway test database, so it measures the full middleware,
+DRF and ORM stack without a network hop.
+"""
+import json
+import statistics
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list of numbers (q in 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies, elapsed):
+    """p50/p95/p99/mean in milliseconds plus throughput for a batch of timings."""
+    return {
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return 'unknown'
+
+
+@dataclass
+class Scenario:
+    """One endpoint call: method, path, JSON payload and which user to send it as."""
+    name: str
+    method: str
+    path: str
+    payload: dict = field(default_factory=dict)
+    auth: str = 'learner'  # 'anonymous', 'learner' or 'admin'
+    format: str = 'json'
+    expected_status: tuple = (200, 201)
+
+
+class Harness:
+    """Runs scenarios at a given concurrency and collects latency/throughput/query stats."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self._local = threading.local()
+
+    def _client(self):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = Client()
+        return client
+
+    def call(self, scenario):
+        client = self._client()
+        headers = {}
+        token = self.tokens.get(scenario.auth)
+        if token:
+            headers['HTTP_AUTHORIZATION'] = f'Token {token}'
+        method = getattr(client, scenario.method.lower())
+        if scenario.method.upper() == 'GET':
+            return method(scenario.path, scenario.payload, **headers)
+        if scenario.format == 'multipart':
+            return method(scenario.path, scenario.payload, **headers)
+        return method(scenario.path, json.dumps(scenario.payload), content_type='application/json', **headers)
+
+    def count_queries(self, scenario):
+        """Run one request sequentially and return (status_code, number_of_queries)."""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.call(scenario)
+        return response.status_code, len(ctx.captured_queries)
+
+    def run(self, scenario, concurrency, requests):
+        latencies = []
+        errors = 0
+        lock = threading.Lock()
+
+        def one(_):
+            nonlocal errors
+            started = time.perf_counter()
+            try:
+                response = self.call(scenario)
+                ok = response.status_code in scenario.expected_status
+            except Exception as e:
+                print(f"Benchmark request failed ({scenario.name}): {e}")
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    errors += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(requests)))
+        result = summarize(latencies, time.perf_counter() - started)
+        result['errors'] = errors
+        result['concurrency'] = concurrency
+        return result
+
+
+# --- BASELINES ---
+
+def save_baseline(path, results, meta):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({'meta': meta, 'results': results}, indent=2, sort_keys=True))
+
+
+def load_baseline(path):
+    return json.loads(Path(path).read_text())
+
+
+def compare_to_baseline(results, baseline, threshold=0.2):
+    """
+    Compare a run against a saved baseline.
+
+    results and baseline['results'] map "scenario@concurrency" to the
+    summary dicts. Returns a list of human readable regression messages:
+    p95/p99 more than `threshold` slower, throughput more than `threshold`
+    lower, or more queries per request than before.
+    """
+    regressions = []
+    previous = baseline.get('results', {})
+    for key, current in sorted(results.items()):
+        before = previous.get(key)
+        if not before:
+            continue
+        for metric in ('p95_ms', 'p99_ms'):
+            if before.get(metric) and current[metric] > before[metric] * (1 + threshold):
+                regressions.append(f"{key}: {metric} {before[metric]} -> {current[metric]}")
+        if before.get('throughput_rps') and current['throughput_rps'] < before['throughput_rps'] * (1 - threshold):
+            regressions.append(f"{key}: throughput {before['throughput_rps']} -> {current['throughput_rps']} rps")
+        if current.get('queries') is not None and before.get('queries') is not None:
+            if current['queries'] > before['queries']:
+                regressions.append(f"{key}: queries {before['queries']} -> {current['queries']}")
+    return regressions
@@ -0,0 +1,181 @@
+# study_core/compression.py
+"""
+Framed zlib compression with preset dictionaries for generated content.
+
+Every stored value starts with a 3 byte header:
+
+    codec (1 byte)   0 = stored as UTF-8, 1 = raw deflate
+    dict id (2 bytes, big-endian)   0 = no preset dictionary
+
+Preset dictionaries are trained from existing study sessions with
+`manage.py train_compression_dictionary` and stored in the
+CompressionDictionary table, in the same database as the rows that use
+them, so no deploy or rebuild can lose one. A dictionary is never edited
+or deleted once rows reference its id. New values are written with the
+highest-numbered dictionary; each process re-checks which that is every
+CURRENT_ID_TTL seconds. Loaded dictionaries are cached per process.
+"""
+import re
+import struct
+import threading
+import time
+import zlib
+from collections import Counter
+
+from django.db import connections, router, transaction
+
+CODEC_STORED = 0
+CODEC_DEFLATE = 1
+
+HEADER = struct.Struct('>BH')
+NO_DICTIONARY = 0
+
+MAX_DICTIONARY_SIZE = 32 * 1024  # deflate's window; anything older is unreachable
+COMPRESSION_LEVEL = 9  # rows are written once and read often; inflate speed doesn't depend on the level
+
+# Below this, the header and deflate overhead usually outweigh any saving
+MIN_COMPRESS_LENGTH = 64
+
+CURRENT_ID_TTL = 300  # seconds before a process looks for a newer dictionary
+
+_dictionaries = {}  # id -> bytes; dictionaries never change, so never expire
+_current = {'id': None, 'checked': 0.0}
+_lock = threading.Lock()
+
+
+class CompressionError(ValueError):
+    pass
+
+
+# --- DICTIONARIES ---
+
+def _model():
+    from .models import CompressionDictionary  # models imports this module via fields
+    return CompressionDictionary
+
+
+def _table_exists(model):
+    """False while migrations haven't created the table yet (they may still write compressed rows)."""
+    connection = connections[router.db_for_read(model)]
+    return model._meta.db_table in connection.introspection.table_names()
+
+
+def load_dictionary(dict_id):
+    if dict_id == NO_DICTIONARY:
+        return None
+    data = _dictionaries.get(dict_id)
+    if data is None:
+        model = _model()
+        data = model.objects.filter(pk=dict_id).values_list('data', flat=True).first()
+        if data is None:
+            raise CompressionError(f"Compression dictionary {dict_id} is missing")
+        data = _dictionaries[dict_id] = bytes(data)
+    return data
+
+
+def current_dictionary_id():
+    """Highest stored dictionary id, or 0 if none has been trained."""
+    now = time.monotonic()
+    with _lock:
+        if _current['id'] is not None and now - _current['checked'] < CURRENT_ID_TTL:
+            return _current['id']
+    model = _model()
+    if not _table_exists(model):
+        return NO_DICTIONARY
+    dict_id = model.objects.order_by('-pk').values_list('pk', flat=True).first() or NO_DICTIONARY
+    with _lock:
+        _current.update(id=dict_id, checked=now)
+    return dict_id
+
+
+def clear_cache():
+    """Forget the cached current id (loaded dictionaries stay valid)."""
+    with _lock:
+        _current.update(id=None, checked=0.0)
+
+
+def train_dictionary(samples, size=MAX_DICTIONARY_SIZE):
+    """
+    Build a zlib preset dictionary from sample texts.
+
+    Lines and short phrases that recur across samples (headings,
+    boilerplate sentences, list markers) are scored by how many bytes
+    they would save and packed up to `size`, most valuable last because
+    deflate encodes nearer matches with shorter distances.
+    """
+    document_frequency = Counter()
+    for text in samples:
+        pieces = set(line.strip() for line in text.splitlines() if len(line.strip()) > 3)
+        pieces.update(re.findall(r'(?:\S+\s+){2}\S+', text))
+        document_frequency.update(pieces)
+
+    minimum = 2 if len(samples) > 1 else 1
+    scored = sorted(
+        (count * len(piece.encode()), piece)
+        for piece, count in document_frequency.items() if count >= minimum
+    )
+    chosen = []
+    used = 0
+    for _, piece in reversed(scored):
+        encoded = piece.encode() + b'\n'
+        if used + len(encoded) > size:
+            continue
+        chosen.append(encoded)
+        used += len(encoded)
+    return b''.join(reversed(chosen))
+
+
+def save_dictionary(data):
+    """Store `data` as the next dictionary id and return that id."""
+    model = _model()
+    with transaction.atomic(using=router.db_for_write(model)):
+        last = model.objects.select_for_update().order_by('-pk').values_list('pk', flat=True).first()
+        dictionary = model.objects.create(id=(last or NO_DICTIONARY) + 1, data=data)
+    clear_cache()
+    return dictionary.id
+
+
+# --- ENCODE / DECODE ---
+
+def deflate(raw, dictionary=None):
+    """Raw deflate (no zlib header/checksum; the frame header identifies the data)."""
+    if dictionary:
+        compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -15, zdict=dictionary)
+    else:
+        compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -15)
+    return compressor.compress(raw) + compressor.flush()
+
+
+def inflate(data, dictionary=None):
+    if dictionary:
+        decompressor = zlib.decompressobj(-15, zdict=dictionary)
+    else:
+        decompressor = zlib.decompressobj(-15)
+    return decompressor.decompress(data) + decompressor.flush()
+
+
+def compress_text(text, dict_id=None):
+    raw = text.encode('utf-8')
+    if len(raw) < MIN_COMPRESS_LENGTH:
+        return HEADER.pack(CODEC_STORED, NO_DICTIONARY) + raw
+    dict_id = current_dictionary_id() if dict_id is None else dict_id
+    data = deflate(raw, load_dictionary(dict_id))
+    if len(data) >= len(raw):
+        return HEADER.pack(CODEC_STORED, NO_DICTIONARY) + raw
+    return HEADER.pack(CODEC_DEFLATE, dict_id) + data
+
+
+def decompress_text(data):
+    data = bytes(data)
+    if len(data) < HEADER.size:
+        raise CompressionError("Compressed value is shorter than its header")
+    codec, dict_id = HEADER.unpack_from(data)
+    payload = data[HEADER.size:]
+    if codec == CODEC_STORED:
+        return payload.decode('utf-8')
+    if codec != CODEC_DEFLATE:
+        raise CompressionError(f"Unknown compression codec {codec}")
+    try:
+        return inflate(payload, load_dictionary(dict_id)).decode('utf-8')
+    except zlib.error as e:
+        raise CompressionError(f"Corrupt compressed value: {e}") from e
@@ -0,0 +1,183 @@
+# study_core/dashboard.py
+"""
+Panels for the admin dashboard, served together by /api/admin/dashboard/.
+
+Each panel is a function returning JSON-ready data. It returns the same
+payload as the endpoint the dashboard used to call separately
+(analytics, recent activities, and the users, topics and courses lists).
+Every panel is cached on its own in the default cache under its own TTL
+(PANEL_TTLS). An activity feed wants to be fresher than a course list.
+load() serves what it can from the cache and builds the missing panels
+concurrently on a small per-process thread pool, each on its own
+database connection. The admin CRUD viewsets call invalidate() after a
+change, so an edited list shows up on the next load.
+
+A panel that fails is reported under `errors`. The rest of the dashboard
+is still returned.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+
+from . import activity
+from .instrumentation import phase, registry
+from .models import Course, Topic
+from .serializers import CourseValuesSerializer, TopicValuesSerializer, UserValuesSerializer
+
+DEFAULTS = {
+    'PARALLEL': True,
+    'WORKERS': 4,
+    'PANEL_TTLS': {  # seconds; 0 disables caching for a panel
+        'analytics': 60,
+        'activities': 10,
+        'users': 30,
+        'topics': 60,
+        'courses': 60,
+    },
+    'ACTIVITY_LIMIT': 5,
+}
+
+PANEL_KEY = 'dashboard:panel:{}'
+
+_executors = {}
+_lock = threading.Lock()
+
+registry.describe('study_dashboard_panels_total', 'Admin dashboard panels served, by panel and result (hit, built, error).')
+
+
+def dashboard_settings():
+    options = {**DEFAULTS, **getattr(settings, 'ADMIN_DASHBOARD', {})}
+    options['PANEL_TTLS'] = {**DEFAULTS['PANEL_TTLS'], **options['PANEL_TTLS']}
+    return options
+
+
+# --- PANELS ---
+
+def analytics():
+    """Headline numbers for the analytics panel (/api/admin/analytics/)."""
+    one_week_ago = timezone.now() - timedelta(days=7)
+    return {
+        'totalSessions': 0,
+        'activeLearners': User.objects.filter(is_staff=False).count(),
+        'popularTopic': "Mathematics: Calculus",
+        'avgStudyDuration': "0 mins",
+        'completionRate': "68%",
+        'totalTopics': 42,
+        'totalCourses': 15,
+        'totalUsers': User.objects.count(),
+        'recentUsers': User.objects.filter(date_joined__gte=one_week_ago).count(),
+    }
+
+
+def activities():
+    return [activity.serialize(event) for event in activity.recent(dashboard_settings()['ACTIVITY_LIMIT'])]
+
+
+def users():
+    return UserValuesSerializer(User.objects.all().order_by('date_joined')).data
+
+
+def topics():
+    return TopicValuesSerializer(Topic.objects.all().order_by('name')).data
+
+
+def courses():
+    return CourseValuesSerializer(Course.objects.all().order_by('name').prefetch_related('topics')).data
+
+
+PANELS = {
+    'analytics': analytics,
+    'activities': activities,
+    'users': users,
+    'topics': topics,
+    'courses': courses,
+}
+
+
+# --- LOADING ---
+
+def _executor(workers):
+    """Per-process pool for building panels (re-created after fork)."""
+    pid = os.getpid()
+    executor = _executors.get(pid)
+    if executor is None:
+        with _lock:
+            executor = _executors.get(pid)
+            if executor is None:
+                executor = _executors[pid] = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix='dashboard-panel'
+                )
+    return executor
+
+
+def _build(name, pooled=True):
+    """Build one panel; returns (data, error, seconds)."""
+    started = time.perf_counter()
+    try:
+        return PANELS[name](), None, time.perf_counter() - started
+    except Exception as e:
+        print(f"Dashboard panel {name} failed: {e}")
+        return None, str(e), time.perf_counter() - started
+    finally:
+        if pooled:
+            # Pool threads outlive the request: hand the connection back
+            connections.close_all()
+
+
+def load(names=None, refresh=False):
+    """
+    The requested panels (all by default) as
+    {'panels': {name: data}, 'errors': {name: message}, 'meta': {name: {...}}}.
+    refresh=True rebuilds every panel instead of reading the cache.
+    """
+    options = dashboard_settings()
+    names = [name for name in (names or PANELS) if name in PANELS]
+    ttls = options['PANEL_TTLS']
+    result = {'panels': {}, 'errors': {}, 'meta': {}}
+
+    missing = names
+    if not refresh:
+        cached = cache.get_many([PANEL_KEY.format(name) for name in names if ttls.get(name)])
+        missing = []
+        for name in names:
+            key = PANEL_KEY.format(name)
+            if key in cached:
+                result['panels'][name] = cached[key]
+                result['meta'][name] = {'cached': True, 'ttl': ttls[name]}
+                registry.increment('study_dashboard_panels_total', {'panel': name, 'result': 'hit'})
+            else:
+                missing.append(name)
+
+    with phase('panels'):
+        if options['PARALLEL'] and len(missing) > 1:
+            built = zip(missing, _executor(options['WORKERS']).map(_build, missing))
+        else:
+            built = ((name, _build(name, pooled=False)) for name in missing)
+        fresh = {}
+        for name, (data, error, seconds) in built:
+            result['meta'][name] = {'cached': False, 'ttl': ttls.get(name, 0), 'ms': round(seconds * 1000, 1)}
+            if error is not None:
+                result['errors'][name] = error
+                registry.increment('study_dashboard_panels_total', {'panel': name, 'result': 'error'})
+                continue
+            result['panels'][name] = data
+            registry.increment('study_dashboard_panels_total', {'panel': name, 'result': 'built'})
+            if ttls.get(name):
+                fresh[name] = data
+
+    for name, data in fresh.items():
+        cache.set(PANEL_KEY.format(name), data, ttls[name])
+    return result
+
+
+def invalidate(*names):
+    """Drop cached panels after the data behind them changed."""
+    cache.delete_many([PANEL_KEY.format(name) for name in names])
@@ -0,0 +1,147 @@
+# study_core/db_routing.py
+"""
+Read replica routing.
+
+Writes always go to `default`. Reads go to a replica (chosen at random
+from REPLICA_ROUTING['REPLICAS']) only inside requests that
+ReplicaRoutingMiddleware has marked eligible:
+
+- function views decorated with @replica_reads (read-only endpoints
+  like topics, search and study history), and
+- viewset list/retrieve actions (REPLICA_ACTIONS), unless the viewset
+  sets `replica_reads = False`.
+
+Everything else reads from `default`, including background threads,
+which never see the request's routing state.
+
+Read-your-writes: once a request writes, the rest of that request reads
+from `default`, and so do the same client's requests for STICKY_SECONDS
+afterwards. STICKY_SECONDS should cover the worst replica lag. A
+client is identified by its Authorization header (hashed) or its session
+cookie, and the mark is kept in the default cache, so it holds across
+processes when that cache is shared. Reads inside a transaction on
+`default` also stay on `default`.
+
+Locally, two SQLite files act as primary and replica (see
+DATABASE_REPLICA_URLS in settings); copy the primary file over the
+replica to simulate replication.
+"""
+import hashlib
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from .instrumentation import registry
+
+PRIMARY = 'default'
+
+DEFAULTS = {
+    'REPLICAS': [],  # DATABASES aliases
+    'STICKY_SECONDS': 10,
+    'REPLICA_ACTIONS': ('list', 'retrieve'),
+    # Always read from the primary: a token or session created a moment ago
+    # (at login) may not have reached the replica yet, and neither may a
+    # compression dictionary that primary rows already use
+    'PRIMARY_MODELS': ('authtoken.token', 'sessions.session', 'study_core.compressiondictionary'),
+}
+
+STICKY_KEY = 'replica:sticky:{}'
+
+registry.describe('study_db_route_total', 'Replica-eligible requests, by whether reads went to a replica or stuck to the primary.')
+
+
+def routing_settings():
+    return {**DEFAULTS, **getattr(settings, 'REPLICA_ROUTING', {})}
+
+
+class RoutingState:
+    """Per-request routing decision, held in a ContextVar."""
+
+    def __init__(self, replica=None, primary_models=()):
+        self.replica = replica  # alias to read from, or None for the primary
+        self.primary_models = primary_models
+        self.wrote = False
+
+
+_state = ContextVar('db_routing_state', default=None)
+
+
+def replica_reads(view):
+    """Mark a read-only view as safe to serve from a replica. Apply outermost, like csrf_exempt."""
+    view.replica_reads = True
+    return view
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.replica is None or state.wrote:
+            return PRIMARY
+        if model._meta.label_lower in state.primary_models or connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+
+# --- MIDDLEWARE ---
+
+def client_key(request):
+    credential = request.META.get('HTTP_AUTHORIZATION') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credential:
+        return None
+    return hashlib.sha256(credential.encode('utf-8')).hexdigest()[:32]
+
+
+def eligible(request, view_func, options):
+    if getattr(view_func, 'replica_reads', False):
+        return True
+    actions = getattr(view_func, 'actions', None)  # set on viewset views by as_view()
+    if actions and getattr(view_func.cls, 'replica_reads', True):
+        return actions.get(request.method.lower()) in options['REPLICA_ACTIONS']
+    return False
+
+
+class ReplicaRoutingMiddleware:
+    """Decides per request whether reads may use a replica; remembers clients that just wrote."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RoutingState()
+        token = _state.set(state)
+        request._db_routing = state
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote:
+            key = client_key(request)
+            if key:
+                cache.set(STICKY_KEY.format(key), 1, routing_settings()['STICKY_SECONDS'])
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        options = routing_settings()
+        if not options['REPLICAS'] or not eligible(request, view_func, options):
+            return None
+        key = client_key(request)
+        if key and cache.get(STICKY_KEY.format(key)):
+            registry.increment('study_db_route_total', {'route': 'sticky'})
+            return None
+        request._db_routing.replica = random.choice(options['REPLICAS'])
+        request._db_routing.primary_models = options['PRIMARY_MODELS']
+        registry.increment('study_db_route_total', {'route': 'replica'})
+        return None
@@ -0,0 +1,131 @@
+# study_core/fake_genai.py
+"""
+Local stand-in for google.genai.Client used by the benchmarks.
+
+It exposes the small part of the SDK surface the app uses
+(client.models.generate_content, and client.aio.models.generate_content_stream
+for the WebSocket tutor) and answers after a configurable latency,
+optionally failing a fraction of calls the same way the real API does
+when overloaded.
+"""
+import asyncio
+import random
+import threading
+import time
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenaiError(Exception):
+    pass
+
+
+class LatencyModel:
+    """
+    Samples a provider latency in seconds.
+
+    distribution is one of 'constant', 'uniform' (median +/- jitter) or
+    'lognormal' (median with a long right tail controlled by sigma).
+    """
+
+    def __init__(self, median_ms=800, jitter_ms=0, distribution='lognormal', sigma=0.5, seed=None):
+        self.median = median_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.distribution = distribution
+        self.sigma = sigma
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self):
+        with self._lock:
+            if self.distribution == 'constant':
+                return self.median
+            if self.distribution == 'uniform':
+                return max(0.0, self._random.uniform(self.median - self.jitter, self.median + self.jitter))
+            return self.median * self._random.lognormvariate(0, self.sigma)
+
+
+class _FakeModels:
+    def __init__(self, client):
+        self._client = client
+
+    def generate_content(self, model, contents, config=None):
+        return self._client._respond(model, contents)
+
+
+class _FakeAsyncModels:
+    def __init__(self, client):
+        self._client = client
+
+    async def generate_content_stream(self, model, contents, config=None):
+        return self._client._stream(model, contents)
+
+
+class _FakeAio:
+    def __init__(self, client):
+        self.models = _FakeAsyncModels(client)
+
+
+class FakeGenaiClient:
+    """Drop-in replacement for genai.Client; install with ai_client.override_client()."""
+
+    def __init__(self, latency=None, overload_rate=0.0, error_rate=0.0, response_chars=2000, seed=None):
+        self.latency = latency or LatencyModel(seed=seed)
+        self.overload_rate = overload_rate
+        self.error_rate = error_rate
+        self.response_chars = response_chars
+        self.models = _FakeModels(self)
+        self.aio = _FakeAio(self)
+        self.calls = 0
+        self.stream_chunks = 8  # a streamed answer arrives in this many chunks over the sampled latency
+        self.chunks_sent = 0
+        self.streams_closed_early = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _respond(self, model, contents):
+        with self._lock:
+            self.calls += 1
+            roll = self._random.random()
+        time.sleep(self.latency.sample())
+        if roll < self.overload_rate:
+            raise FakeGenaiError("503 UNAVAILABLE. The model is overloaded. Please try again later.")
+        if roll < self.overload_rate + self.error_rate:
+            raise FakeGenaiError("500 INTERNAL. An internal error has occurred.")
+        return FakeResponse(self._text(contents))
+
+    async def _stream(self, model, contents):
+        with self._lock:
+            self.calls += 1
+            roll = self._random.random()
+        latency = self.latency.sample()
+        if roll < self.overload_rate:
+            raise FakeGenaiError("503 UNAVAILABLE. The model is overloaded. Please try again later.")
+        if roll < self.overload_rate + self.error_rate:
+            raise FakeGenaiError("500 INTERNAL. An internal error has occurred.")
+        text = self._text(contents)
+        size = -(-len(text) // self.stream_chunks)
+        finished = False
+        try:
+            for start in range(0, len(text), size):
+                await asyncio.sleep(latency / self.stream_chunks)
+                with self._lock:
+                    self.chunks_sent += 1
+                yield FakeResponse(text[start:start + size])
+            finished = True
+        finally:
+            if not finished:
+                with self._lock:
+                    self.streams_closed_early += 1
+
+    def _text(self, contents):
+        if isinstance(contents, str):
+            prompt = contents
+        else:  # multimodal: only the text parts matter here
+            prompt = ' '.join(part for part in contents if isinstance(part, str))
+        line = "## Key Concepts\n- Definition, example and a short review question.\n"
+        body = (line * (self.response_chars // len(line) + 1))[:self.response_chars]
+        return f"# Generated for {prompt.strip()[:60]}\n\n{body}"
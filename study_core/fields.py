@@ -0,0 +1,33 @@
+# study_core/fields.py
+from django.db import models
+
+from .compression import compress_text, decompress_text
+
+
+class CompressedTextField(models.TextField):
+    """
+    Text in Python, compressed bytes in the database (BLOB / bytea).
+
+    Values are framed by study_core.compression, so serializers, forms
+    and the admin see a plain TextField. Because the column holds
+    compressed bytes, it can't be filtered or searched in SQL. Full-text
+    search goes through SearchDocument instead, which keeps a plain copy
+    of the text for ranking and snippets.
+    """
+    description = "Compressed text"
+
+    def get_internal_type(self):
+        return 'BinaryField'
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        if isinstance(value, str):  # a row that was never compressed
+            return value
+        return decompress_text(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = self.get_prep_value(value)
+        if value is None:
+            return None
+        return connection.Database.Binary(compress_text(value))
@@ -0,0 +1,193 @@
+# study_core/http_pool.py
+"""
+Shared httpx transports for the Gemini client.
+
+One sync and one async httpx client per process, with explicit pool
+limits, keep-alive and connect/read/write/pool timeouts taken from
+settings.GEMINI_HTTP. These timeouts bound a single HTTP attempt; the
+retry/backoff policy stays in views.generate_with_retry.
+
+Connection churn is tracked through httpcore trace events and exported
+through the instrumentation registry.
+"""
+import importlib.util
+import os
+import threading
+import time
+
+import httpx
+from django.conf import settings
+
+from .instrumentation import registry
+
+DEFAULTS = {
+    'MAX_CONNECTIONS': 20,
+    'MAX_KEEPALIVE_CONNECTIONS': 10,
+    'KEEPALIVE_EXPIRY': 60.0,
+    'CONNECT_TIMEOUT': 5.0,
+    'READ_TIMEOUT': 60.0,
+    'WRITE_TIMEOUT': 10.0,
+    'POOL_TIMEOUT': 5.0,
+    'HTTP2': True,
+}
+
+_clients = {}
+_lock = threading.Lock()
+
+registry.describe('study_http_connections_opened_total', 'New TCP connections opened to the AI provider.')
+registry.describe('study_http_tls_handshakes_total', 'TLS handshakes performed against the AI provider.')
+registry.describe('study_http_connect_seconds', 'TCP connect and TLS handshake time to the AI provider.')
+registry.describe('study_http_requests_total', 'HTTP requests sent to the AI provider, by protocol.')
+registry.describe('study_http_pool_connections', 'Connections currently held by the provider pool.')
+
+
+def http_settings():
+    return {**DEFAULTS, **getattr(settings, 'GEMINI_HTTP', {})}
+
+
+def http2_available():
+    return importlib.util.find_spec('h2') is not None
+
+
+# --- CONNECTION TRACING ---
+
+def _make_tracer():
+    """Per-request httpcore trace hook: count and time new connections and handshakes."""
+    started = {}
+
+    def trace(event_name, info):
+        step, _, stage = event_name.rpartition('.')
+        if step not in ('connection.connect_tcp', 'connection.start_tls'):
+            return
+        if stage == 'started':
+            started[step] = time.perf_counter()
+            return
+        if stage != 'complete':
+            return
+        if step == 'connection.connect_tcp':
+            registry.increment('study_http_connections_opened_total')
+        else:
+            registry.increment('study_http_tls_handshakes_total')
+        if step in started:
+            registry.observe(
+                'study_http_connect_seconds',
+                time.perf_counter() - started.pop(step),
+                {'step': step.split('.')[-1]},
+            )
+
+    return trace
+
+
+def _attach_trace(request):
+    request.extensions['trace'] = _make_tracer()
+
+
+def _count_response(response):
+    registry.increment('study_http_requests_total', {'http_version': response.http_version})
+
+
+async def _attach_trace_async(request):
+    trace = _make_tracer()
+
+    async def async_trace(event_name, info):
+        trace(event_name, info)
+
+    request.extensions['trace'] = async_trace
+
+
+async def _count_response_async(response):
+    _count_response(response)
+
+
+# --- CLIENTS ---
+
+class _DefaultTimeoutMixin:
+    """
+    google-genai passes timeout=None on every request when HttpOptions.timeout
+    is unset, which httpx reads as "no timeout at all". Map that back to the
+    client's configured timeouts.
+    """
+
+    def build_request(self, *args, timeout=httpx.USE_CLIENT_DEFAULT, **kwargs):
+        if timeout is None:
+            timeout = httpx.USE_CLIENT_DEFAULT
+        return super().build_request(*args, timeout=timeout, **kwargs)
+
+    def request(self, *args, timeout=httpx.USE_CLIENT_DEFAULT, **kwargs):
+        if timeout is None:
+            timeout = httpx.USE_CLIENT_DEFAULT
+        return super().request(*args, timeout=timeout, **kwargs)
+
+
+class PooledClient(_DefaultTimeoutMixin, httpx.Client):
+    pass
+
+
+class PooledAsyncClient(_DefaultTimeoutMixin, httpx.AsyncClient):
+    pass
+
+
+def _client_kwargs():
+    options = http_settings()
+    return {
+        'limits': httpx.Limits(
+            max_connections=options['MAX_CONNECTIONS'],
+            max_keepalive_connections=options['MAX_KEEPALIVE_CONNECTIONS'],
+            keepalive_expiry=options['KEEPALIVE_EXPIRY'],
+        ),
+        'timeout': httpx.Timeout(
+            connect=options['CONNECT_TIMEOUT'],
+            read=options['READ_TIMEOUT'],
+            write=options['WRITE_TIMEOUT'],
+            pool=options['POOL_TIMEOUT'],
+        ),
+        'http2': bool(options['HTTP2']) and http2_available(),
+    }
+
+
+def get_http_client():
+    """Return this process's shared sync httpx client."""
+    key = (os.getpid(), 'sync')
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = PooledClient(
+                    event_hooks={'request': [_attach_trace], 'response': [_count_response]},
+                    **_client_kwargs(),
+                )
+    return client
+
+
+def get_async_http_client():
+    """Return this process's shared async httpx client."""
+    key = (os.getpid(), 'async')
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = PooledAsyncClient(
+                    event_hooks={'request': [_attach_trace_async], 'response': [_count_response_async]},
+                    **_client_kwargs(),
+                )
+    return client
+
+
+def pool_stats():
+    """Idle/active connection counts for the shared clients in this process."""
+    stats = []
+    pid = os.getpid()
+    for (owner, kind), client in list(_clients.items()):
+        if owner != pid:
+            continue
+        pool = getattr(client._transport, '_pool', None)
+        connections = getattr(pool, 'connections', [])
+        idle = sum(1 for connection in connections if connection.is_idle())
+        stats.append(({'client': kind, 'state': 'idle'}, idle))
+        stats.append(({'client': kind, 'state': 'active'}, len(connections) - idle))
+    return stats
+
+
+registry.register_gauge('study_http_pool_connections', pool_stats)
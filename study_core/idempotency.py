@@ -0,0 +1,223 @@
+# study_core/idempotency.py
+"""
+Idempotency-Key support for the POST generation endpoints.
+
+Clients send a random Idempotency-Key header with a generation request,
+and send the same key again on a retry or double submit. The first request
+with a given key runs the view. Its response is stored and replayed to
+later requests with the same key, marked with Idempotent-Replayed: true.
+A duplicate that arrives while the first request is still running waits
+for it: through a threading.Event when both are in this process, by
+polling the cache otherwise. If the wait runs out it gets 409 with
+Retry-After.
+
+Keys live in their own cache alias (CACHE_ALIAS, 'idempotency'), so
+churn in the default cache can't cull a stored response early. Keys are
+only seen by the workers that share that alias: with the stock LocMem
+backend each worker has its own, and a retry that lands on another
+worker runs again. Point the alias at a shared backend (Redis, Memcached,
+DatabaseCache) to deduplicate across workers.
+
+Keys are scoped to the caller (user id, or IP for anonymous requests)
+and the view. Each key also records a fingerprint of the request body,
+and reusing a key with a different body is answered with 422.
+
+Only final answers are stored: 2xx, and 4xx except 409 and 429. For 429
+and 5xx, or a response passed to mark_transient() (the views use it for
+generation failures, which come back as 200), the key is released so
+that a retry actually runs. Stored responses expire after RETENTION
+seconds.
+"""
+import hashlib
+import threading
+import time
+from functools import wraps
+
+import orjson
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+from .instrumentation import phase, registry
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+DEFAULTS = {
+    'ENABLED': True,
+    'RETENTION': 24 * 60 * 60,  # seconds a stored response is replayed
+    'LOCK_TTL': 180,  # seconds an in-progress marker survives a crashed worker
+    'WAIT': 60,  # max seconds a duplicate waits for the in-progress request
+    'POLL_INTERVAL': 0.25,
+    'MAX_KEY_LENGTH': 255,
+    'CACHE_ALIAS': 'idempotency',
+}
+
+# Response headers carried over to replays
+REPLAYED_HEADERS = ('X-AI-Cache',)
+
+IN_PROGRESS = 'in_progress'
+DONE = 'done'
+
+# cache key -> threading.Event, set when that request finishes in this process
+_events = {}
+_lock = threading.Lock()
+
+registry.describe('study_idempotency_total', 'Idempotency-Key lookups on generation endpoints, by result.')
+
+
+def idempotency_settings():
+    return {**DEFAULTS, **getattr(settings, 'IDEMPOTENCY', {})}
+
+
+def _cache(options=None):
+    return caches[(options or idempotency_settings())['CACHE_ALIAS']]
+
+
+def _scope(request):
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def _cache_key(request, view_name, key):
+    digest = hashlib.sha256(f'{_scope(request)}\0{view_name}\0{key}'.encode('utf-8')).hexdigest()
+    return f'idempotency:{digest}'
+
+
+def fingerprint(request):
+    """Hash of the request body; uploaded files count by name, size and content hash."""
+    body = {}
+    for name in sorted(request.data.keys()):
+        value = request.data.get(name)
+        if hasattr(value, 'chunks'):
+            content = hashlib.sha256()
+            for chunk in value.chunks():
+                content.update(chunk)
+            value.seek(0)
+            value = [value.name, value.size, content.hexdigest()]
+        body[name] = value
+    return hashlib.sha256(orjson.dumps(body, default=str, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+def _replay(entry):
+    response = Response(entry['data'], status=entry['status'])
+    for name, value in entry['headers'].items():
+        response[name] = value
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def _error(message, code, retry_after=None):
+    response = Response({"error": message}, status=code)
+    if retry_after is not None:
+        response['Retry-After'] = str(retry_after)
+    return response
+
+
+def mark_transient(response):
+    """Don't replay `response`: a retry with the same key should run again."""
+    response.idempotency_transient = True
+    return response
+
+
+def _storable(response):
+    if not isinstance(response, Response) or getattr(response, 'idempotency_transient', False):
+        return False
+    code = response.status_code
+    return code < 500 and code not in (status.HTTP_409_CONFLICT, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+def _wait_for(cache_key, options):
+    """Wait for the in-progress request under `cache_key`; returns its final entry or None."""
+    cache = _cache(options)
+    event = _events.get(cache_key)
+    if event is not None:
+        event.wait(options['WAIT'])
+        entry = cache.get(cache_key)
+        return entry if entry is not None and entry['state'] == DONE else None
+
+    deadline = time.monotonic() + options['WAIT']
+    while time.monotonic() < deadline:
+        time.sleep(options['POLL_INTERVAL'])
+        entry = cache.get(cache_key)
+        if entry is None:  # released (failed) or expired
+            return None
+        if entry['state'] == DONE:
+            return entry
+    return None
+
+
+def idempotent(view):
+    """Function-view decorator (place under @api_view) honouring the Idempotency-Key header."""
+    view_name = view.__name__
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        options = idempotency_settings()
+        key = request.headers.get(HEADER)
+        if not options['ENABLED'] or not key:
+            return view(request, *args, **kwargs)
+        if len(key) > options['MAX_KEY_LENGTH']:
+            return _error(f"{HEADER} must be at most {options['MAX_KEY_LENGTH']} characters.",
+                          status.HTTP_400_BAD_REQUEST)
+
+        cache = _cache(options)
+        cache_key = _cache_key(request, view_name, key)
+        request_fingerprint = fingerprint(request)
+
+        for _ in range(2):  # second pass: the original failed while we waited, so we run it
+            marker = {'state': IN_PROGRESS, 'fingerprint': request_fingerprint}
+            with _lock:
+                claimed = cache.add(cache_key, marker, timeout=options['LOCK_TTL'])
+                if claimed:
+                    _events[cache_key] = threading.Event()
+            if claimed:
+                break
+
+            entry = cache.get(cache_key)
+            if entry is None:  # expired between add() and get()
+                continue
+            if entry['fingerprint'] != request_fingerprint:
+                registry.increment('study_idempotency_total', {'view': view_name, 'result': 'mismatch'})
+                return _error(f"{HEADER} was already used for a different request.",
+                              status.HTTP_422_UNPROCESSABLE_ENTITY)
+            if entry['state'] == IN_PROGRESS:
+                with phase('idempotency_wait'):
+                    entry = _wait_for(cache_key, options)
+                if entry is None:
+                    if cache.get(cache_key) is not None:
+                        registry.increment('study_idempotency_total', {'view': view_name, 'result': 'conflict'})
+                        return _error("A request with this Idempotency-Key is still in progress.",
+                                      status.HTTP_409_CONFLICT, retry_after=5)
+                    continue
+                registry.increment('study_idempotency_total', {'view': view_name, 'result': 'joined'})
+                return _replay(entry)
+            registry.increment('study_idempotency_total', {'view': view_name, 'result': 'replayed'})
+            return _replay(entry)
+        else:
+            return view(request, *args, **kwargs)
+
+        registry.increment('study_idempotency_total', {'view': view_name, 'result': 'executed'})
+        response = None
+        try:
+            response = view(request, *args, **kwargs)
+            return response
+        finally:
+            if _storable(response):
+                cache.set(cache_key, {
+                    'state': DONE,
+                    'fingerprint': request_fingerprint,
+                    'status': response.status_code,
+                    'data': response.data,
+                    'headers': {name: response[name] for name in REPLAYED_HEADERS if response.has_header(name)},
+                }, timeout=options['RETENTION'])
+            else:
+                cache.delete(cache_key)
+            with _lock:
+                event = _events.pop(cache_key, None)
+            if event is not None:
+                event.set()
+
+    return wrapper
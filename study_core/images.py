@@ -0,0 +1,121 @@
+# study_core/images.py
+"""
+Server-side preprocessing of uploaded images before they go to Gemini.
+
+Phone photos of whiteboards and notes arrive as multi-megabyte JPEGs at
+12+ megapixels, far more than the model needs to read them. Each upload is:
+
+- decoded at reduced size when possible (JPEG draft mode scales in the
+  DCT, so a 4000px photo is never fully decoded),
+- rotated according to its EXIF orientation,
+- downscaled so its longer side is at most MAX_SIDE,
+- re-encoded as a compact JPEG or WebP.
+
+The work runs on a small per-process pool. Pillow releases the GIL while
+decoding and resizing, and the pool size also caps how many large images
+are held in memory at once.
+"""
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from django.conf import settings
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .instrumentation import phase
+
+DEFAULTS = {
+    'MAX_SIDE': 1600,  # px, longer side after downscaling
+    'FORMAT': 'JPEG',  # or 'WEBP'
+    'QUALITY': 80,
+    'MAX_PIXELS': 50_000_000,  # refuse anything bigger (decompression bombs)
+    'WORKERS': 2,
+    'TIMEOUT': 20,  # seconds
+}
+
+MIME_TYPES = {'JPEG': 'image/jpeg', 'WEBP': 'image/webp'}
+
+_executors = {}
+_lock = threading.Lock()
+
+
+class ImageError(ValueError):
+    pass
+
+
+def image_settings():
+    return {**DEFAULTS, **getattr(settings, 'IMAGE_UPLOADS', {})}
+
+
+def _executor(workers):
+    pid = os.getpid()
+    executor = _executors.get(pid)
+    if executor is None:
+        with _lock:
+            executor = _executors.get(pid)
+            if executor is None:
+                executor = _executors[pid] = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix='image-prep'
+                )
+    return executor
+
+
+def _flatten(image, keep_alpha):
+    """Convert to RGB (or RGBA for WebP), putting transparency on white."""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        if keep_alpha:
+            return image
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image if image.mode == 'RGB' else image.convert('RGB')
+
+
+def prepare_image(data, options=None):
+    """
+    Downscale and re-encode image bytes. Returns (bytes, mime_type, info);
+    raises ImageError for anything Pillow can't read or that is too large.
+    """
+    options = options or image_settings()
+    max_side = options['MAX_SIDE']
+    target = options['FORMAT'].upper()
+    try:
+        image = Image.open(io.BytesIO(data))
+        width, height = image.size
+        if width * height > options['MAX_PIXELS']:
+            raise ImageError(f"Image is too large ({width}x{height}).")
+        image.draft('RGB', (max_side, max_side))  # JPEG only; no-op for other formats
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        image = _flatten(image, keep_alpha=target == 'WEBP')
+
+        out = io.BytesIO()
+        if target == 'WEBP':
+            image.save(out, 'WEBP', quality=options['QUALITY'], method=4)
+        else:
+            image.save(out, 'JPEG', quality=options['QUALITY'], optimize=True, progressive=True)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as e:
+        raise ImageError(f"Unsupported or corrupt image: {e}") from e
+
+    info = {
+        'original_size': [width, height],
+        'size': list(image.size),
+        'original_bytes': len(data),
+        'bytes': out.tell(),
+    }
+    return out.getvalue(), MIME_TYPES.get(target, 'image/jpeg'), info
+
+
+def preprocess(data):
+    """prepare_image() on the image pool; blocks the caller for at most TIMEOUT seconds."""
+    options = image_settings()
+    with phase('image'):
+        future = _executor(options['WORKERS']).submit(prepare_image, data, options)
+        try:
+            return future.result(timeout=options['TIMEOUT'])
+        except FutureTimeout:
+            future.cancel()
+            raise ImageError("Image processing timed out.")
@@ -0,0 +1,314 @@
+# study_core/instrumentation.py
+"""
+In-process latency instrumentation for the API.
+
+Every request gets a set of phase timers (db, serialize, prompt, llm,
+retry_sleep, ...) which the TimingMiddleware folds into per-view
+HDR-style histograms at the end of the request. The histograms are
+rendered in Prometheus text format by the admin metrics endpoint.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+# --- HISTOGRAM ---
+
+# 2^SUB_BUCKET_BITS linear sub-buckets per power of two keeps the relative
+# error of any recorded value under 1% (same idea as HdrHistogram).
+SUB_BUCKET_BITS = 8
+SUB_BUCKET_MASK = (1 << SUB_BUCKET_BITS) - 1
+
+# Values are stored as integer microseconds.
+UNIT = 1_000_000
+
+DEFAULT_QUANTILES = (0.5, 0.9, 0.95, 0.99, 0.999)
+
+
+def _bucket_index(value):
+    if value < (1 << SUB_BUCKET_BITS):
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return (shift << SUB_BUCKET_BITS) + (value >> shift)
+
+
+def _bucket_value(index):
+    """Highest value that falls into the given bucket."""
+    shift = index >> SUB_BUCKET_BITS
+    if shift == 0:
+        return index
+    mantissa = index & SUB_BUCKET_MASK
+    return ((mantissa + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """Log-linear histogram of durations (seconds) with ~1% relative error."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        micros = max(int(seconds * UNIT), 0)
+        index = _bucket_index(micros)
+        with self._lock:
+            self._counts[index] = self._counts.get(index, 0) + 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def quantiles(self, quantiles=DEFAULT_QUANTILES):
+        """Return {quantile: seconds} for the requested quantiles."""
+        with self._lock:
+            items = sorted(self._counts.items())
+            count = self.count
+            highest = self.max
+        result = {}
+        if not count:
+            return {q: 0.0 for q in quantiles}
+        targets = sorted(quantiles)
+        seen = 0
+        position = 0
+        for q in targets:
+            rank = max(1, int(round(q * count)))
+            while position < len(items) and seen + items[position][1] < rank:
+                seen += items[position][1]
+                position += 1
+            index = items[min(position, len(items) - 1)][0]
+            result[q] = min(_bucket_value(index) / UNIT, highest)
+        return result
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'max': self.max,
+            'quantiles': self.quantiles(),
+        }
+
+
+class MetricsRegistry:
+    """Process-wide collection of histograms, counters and gauges."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._help = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((labels or {}).items()))
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def histogram(self, name, labels=None):
+        key = self._key(name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, LatencyHistogram())
+        return histogram
+
+    def observe(self, name, seconds, labels=None):
+        self.histogram(name, labels).record(seconds)
+
+    def increment(self, name, labels=None, amount=1):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def register_gauge(self, name, callback):
+        """Register a callable returning a number or a list of (labels, value)."""
+        with self._lock:
+            self._gauges[name] = callback
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def fmt_labels(labels, extra=None):
+            pairs = list(labels) + list(extra or [])
+            if not pairs:
+                return ''
+            body = ','.join(
+                '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                for k, v in pairs
+            )
+            return '{' + body + '}'
+
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+
+        current = None
+        for (name, labels), histogram in histograms:
+            if name != current:
+                current = name
+                if name in self._help:
+                    lines.append(f'# HELP {name} {self._help[name]}')
+                lines.append(f'# TYPE {name} summary')
+            snap = histogram.snapshot()
+            for q, value in snap['quantiles'].items():
+                lines.append(f"{name}{fmt_labels(labels, [('quantile', q)])} {value:.6f}")
+            lines.append(f"{name}_sum{fmt_labels(labels)} {snap['sum']:.6f}")
+            lines.append(f"{name}_count{fmt_labels(labels)} {snap['count']}")
+
+        current = None
+        for (name, labels), value in counters:
+            if name != current:
+                current = name
+                if name in self._help:
+                    lines.append(f'# HELP {name} {self._help[name]}')
+                lines.append(f'# TYPE {name} counter')
+            lines.append(f'{name}{fmt_labels(labels)} {value}')
+
+        for name, callback in gauges:
+            try:
+                values = callback()
+            except Exception as e:
+                print(f"Metrics gauge {name} failed: {e}")
+                continue
+            if name in self._help:
+                lines.append(f'# HELP {name} {self._help[name]}')
+            lines.append(f'# TYPE {name} gauge')
+            if not isinstance(values, (list, tuple)):
+                values = [({}, values)]
+            for labels, value in values:
+                lines.append(f'{name}{fmt_labels(sorted(labels.items()))} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+registry.describe('study_request_duration_seconds', 'Wall-clock time per API request, by view.')
+registry.describe('study_request_phase_seconds', 'Exclusive time spent per phase within a request, by view.')
+registry.describe('study_llm_generation_seconds', 'Total time of one generate_with_retry call including retries.')
+registry.describe('study_llm_calls_total', 'Provider calls by outcome.')
+registry.describe('study_requests_total', 'API requests by view and status class.')
+
+
+# --- PER-REQUEST PHASE TIMERS ---
+
+class RequestTimings:
+    """Accumulates exclusive phase durations for one request."""
+
+    def __init__(self, view='unmatched'):
+        self.view = view
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.counts = {}
+        self._stack = []
+
+    def add(self, name, seconds, count=1):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + count
+
+    def server_timing(self, total):
+        """Build a Server-Timing header value (durations in milliseconds)."""
+        parts = []
+        for name, seconds in self.phases.items():
+            parts.append(f'{name};dur={seconds * 1000:.1f};desc="{self.counts[name]}x"')
+        parts.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(parts)
+
+
+_current = ContextVar('study_request_timings', default=None)
+
+
+def current_timings():
+    return _current.get()
+
+
+def start_request(view='unmatched'):
+    timings = RequestTimings(view)
+    token = _current.set(timings)
+    return timings, token
+
+
+def finish_request(timings, token, status_code=None):
+    """Fold the request's timings into the registry and return the total."""
+    total = time.perf_counter() - timings.started
+    _current.reset(token)
+    labels = {'view': timings.view}
+    registry.observe('study_request_duration_seconds', total, labels)
+    for name, seconds in timings.phases.items():
+        registry.observe('study_request_phase_seconds', seconds, {'view': timings.view, 'phase': name})
+    if status_code is not None:
+        registry.increment('study_requests_total', {'view': timings.view, 'status': f'{status_code // 100}xx'})
+    return total
+
+
+@contextmanager
+def phase(name):
+    """
+    Time a block as phase `name` of the current request.
+
+    Phases are exclusive: time spent in a nested phase (e.g. db queries run
+    while serializing) is attributed to the inner phase only. Re-entering a
+    phase that is already open is a no-op so nested serializers don't
+    double count. Outside a request the duration goes straight to the
+    registry under view="background".
+    """
+    timings = _current.get()
+    if timings is not None and any(frame[0] == name for frame in timings._stack):
+        yield
+        return
+
+    frame = [name, 0.0]
+    if timings is not None:
+        timings._stack.append(frame)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if timings is None:
+            registry.observe('study_request_phase_seconds', elapsed, {'view': 'background', 'phase': name})
+        else:
+            timings._stack.pop()
+            timings.add(name, max(elapsed - frame[1], 0.0))
+            if timings._stack:
+                timings._stack[-1][1] += elapsed
+
+
+def timed_phase(name):
+    """Decorator form of phase()."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def instrument_generation(func):
+    """Record total generation time (including retries) around an LLM helper."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings = _current.get()
+            view = timings.view if timings is not None else 'background'
+            registry.observe('study_llm_generation_seconds', time.perf_counter() - started, {'view': view})
+    return wrapper
+
+
+def record_llm_outcome(outcome):
+    registry.increment('study_llm_calls_total', {'outcome': outcome})
@@ -0,0 +1,108 @@
+# study_core/management/commands/bench_admission.py
+import logging
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from study_core import admission
+from study_core.ai_client import override_client
+from study_core.benchmarking import Harness, summarize
+from study_core.fake_genai import FakeGenaiClient, LatencyModel
+from study_core.management.commands.bench_api import Command as BenchApiCommand
+from study_core.management.commands.bench_api import UploadScenario, build_scenarios
+
+# scenario name -> share of the arrivals
+MIX = {
+    'quiz_generate': 0.45,
+    'upload_summarize': 0.15,
+    'ai_tutor_chat': 0.1,
+    'topics': 0.2,
+    'auth_login': 0.1,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a burst of mixed traffic (mostly quiz generations) against a fixed pool of "
+        "worker threads, with admission control off and on. Reports latency per endpoint "
+        "(including time waiting for a worker) and how many requests were shed with 429."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help="Simulated server threads.")
+        parser.add_argument('--rate', type=float, default=40, help="Arrivals per second.")
+        parser.add_argument('--duration', type=float, default=5.0, help="Seconds of arrivals per mode.")
+        parser.add_argument('--latency-ms', type=float, default=800, help="Median fake Gemini latency.")
+        parser.add_argument('--max-concurrent', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        logging.getLogger('django.request').setLevel(logging.ERROR)  # one warning per 429 otherwise
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            seed_options = {'topics': 200, 'courses': 30, 'users': 20}
+            harness = Harness(BenchApiCommand().seed(seed_options))
+            ai_cache_settings = {**getattr(settings, 'AI_CACHE', {}), 'ENABLED': False}
+            for enabled in (False, True):
+                admission_settings = {
+                    **getattr(settings, 'ADMISSION', {}),
+                    'ENABLED': enabled,
+                    'MAX_CONCURRENT': options['max_concurrent'],
+                    # Queued requests hold a worker too, so keep the queues short relative to --workers
+                    'MAX_QUEUE': {admission.INTERACTIVE: 2, admission.STANDARD: 1, admission.BULK: 0},
+                }
+                fake = FakeGenaiClient(
+                    latency=LatencyModel(median_ms=options['latency_ms'], distribution='lognormal',
+                                         sigma=0.3, seed=options['seed']),
+                    seed=options['seed'],
+                )
+                with override_client(fake), override_settings(AI_CACHE=ai_cache_settings,
+                                                              ADMISSION=admission_settings):
+                    self.run_mode('admission on' if enabled else 'admission off', harness, fake, options)
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+    def run_mode(self, name, harness, fake, options):
+        scenarios = build_scenarios()
+        scenarios['upload_summarize'] = UploadScenario(scenarios['upload_summarize'])
+        rng = random.Random(options['seed'])
+        names, weights = zip(*MIX.items())
+
+        latencies = defaultdict(list)
+        statuses = defaultdict(Counter)
+        lock = threading.Lock()
+
+        def serve(scenario_name, arrived):
+            response = harness.call(scenarios[scenario_name])
+            with lock:
+                latencies[scenario_name].append(time.perf_counter() - arrived)
+                statuses[scenario_name][response.status_code] += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            arrivals = int(options['rate'] * options['duration'])
+            for i in range(arrivals):
+                # Open loop: arrivals don't slow down when the server does
+                delay = started + i / options['rate'] - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(serve, rng.choices(names, weights)[0], time.perf_counter())
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{name} ({fake.calls} Gemini calls)"))
+        for scenario_name in names:
+            result = summarize(latencies[scenario_name], elapsed)
+            self.stdout.write(
+                f"  {scenario_name:<18} n={result['requests']:<4} p50 {result['p50_ms']:>8.1f}ms  "
+                f"p99 {result['p99_ms']:>8.1f}ms  {dict(statuses[scenario_name])}"
+            )
@@ -0,0 +1,85 @@
+# study_core/management/commands/bench_ai_cache.py
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from study_core import ai_cache
+from study_core.ai_client import override_client
+from study_core.benchmarking import summarize
+from study_core.fake_genai import FakeGenaiClient, LatencyModel
+from study_core.views import generate_with_retry, generation_failed
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer a few hot AI cache keys across several expiries and compare hard-TTL-only "
+        "caching with stale-while-revalidate: latency percentiles and Gemini calls."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keys', type=int, default=5, help="Number of hot prompts.")
+        parser.add_argument('--ttl', type=float, default=1.0, help="Soft TTL in seconds.")
+        parser.add_argument('--duration', type=float, default=5.0, help="Seconds per mode.")
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--latency-ms', type=float, default=300, help="Median fake Gemini latency.")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        modes = {
+            # Entries vanish at the TTL: whoever arrives next waits for Gemini
+            'hard-ttl': {'SOFT_TTL': options['ttl'], 'HARD_TTL': options['ttl'], 'JITTER': 0.0},
+            'stale-while-revalidate': {'SOFT_TTL': options['ttl'], 'HARD_TTL': options['ttl'] * 30},
+        }
+        for name, ttls in modes.items():
+            fake = FakeGenaiClient(
+                latency=LatencyModel(median_ms=options['latency_ms'], distribution='lognormal',
+                                     sigma=0.3, seed=options['seed']),
+                seed=options['seed'],
+            )
+            settings_for_mode = {**ai_cache.DEFAULTS, **ttls, 'REFRESH_WORKERS': 2}
+            caches[settings_for_mode['CACHE_ALIAS']].clear()
+            with override_client(fake), override_settings(AI_CACHE=settings_for_mode):
+                self.run_mode(name, fake, options)
+
+    def run_mode(self, name, fake, options):
+        prompts = [f'Generate study notes for hot topic {i}' for i in range(options['keys'])]
+        for prompt in prompts:  # warm every key once
+            ai_cache.get_or_generate('notes', prompt, generate_with_retry, generation_failed)
+        calls_after_warmup = fake.calls
+
+        latencies = []
+        statuses = Counter()
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['duration']
+
+        def worker(index):
+            n = index
+            while time.perf_counter() < deadline:
+                prompt = prompts[n % len(prompts)]
+                n += 1
+                started = time.perf_counter()
+                _, cache_status = ai_cache.get_or_generate('notes', prompt, generate_with_retry, generation_failed)
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[cache_status] += 1
+                time.sleep(0.005)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            list(pool.map(worker, range(options['concurrency'])))
+        result = summarize(latencies, time.perf_counter() - started)
+        time.sleep(options['latency_ms'] / 1000 * 3)  # let in-flight refreshes land before counting
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        self.stdout.write(
+            f"  {result['requests']} requests  {result['throughput_rps']:.0f} rps  "
+            f"p50 {result['p50_ms']:.2f}ms  p95 {result['p95_ms']:.2f}ms  p99 {result['p99_ms']:.2f}ms"
+        )
+        self.stdout.write(
+            f"  {dict(statuses)}  Gemini calls after warm-up: {fake.calls - calls_after_warmup}"
+        )
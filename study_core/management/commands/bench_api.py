@@ -0,0 +1,240 @@
+# study_core/management/commands/bench_api.py
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from rest_framework.authtoken.models import Token
+
+from study_core.ai_client import override_client
+from study_core.benchmarking import (
+    Harness,
+    Scenario,
+    compare_to_baseline,
+    git_revision,
+    load_baseline,
+    save_baseline,
+)
+from study_core.fake_genai import FakeGenaiClient, LatencyModel
+from study_core.models import Course, Topic
+
+BENCH_PASSWORD = 'bench-password-123'
+
+
+def build_scenarios():
+    """Every study_core endpoint plus auth, keyed by a short name."""
+    generation = {'topic': 'Thermodynamics', 'subtopics': ['Entropy', 'Heat engines']}
+    scenarios = [
+        Scenario('topics', 'GET', '/api/topics/', auth='anonymous'),
+        Scenario('sync_full', 'GET', '/api/sync/'),
+        Scenario('admin_topics_list', 'GET', '/api/admin/topics/', auth='admin'),
+        Scenario('admin_topics_create', 'POST', '/api/admin/topics/', {'name': None, 'description': 'bench'}, auth='admin'),
+        Scenario('admin_courses_list', 'GET', '/api/admin/courses/', auth='admin'),
+        Scenario('admin_users_list', 'GET', '/api/admin/users/', auth='admin'),
+        Scenario('study_history', 'GET', '/api/study-history/'),
+        Scenario('session_generation', 'POST', '/api/sessions/',
+                 {'topic_name': 'Thermodynamics', 'duration_input': '3 days', 'subtopics': ['Entropy']}),
+        Scenario('study_tools', 'POST', '/api/study-tools/', generation),
+        Scenario('quiz_generate', 'POST', '/api/quiz-generate/', generation),
+        Scenario('ai_tutor_chat', 'POST', '/api/ai-tutor/chat/',
+                 {'message': 'What is entropy?', 'subject': 'physics', 'difficulty': 'beginner'}),
+        Scenario('ai_recommendations', 'POST', '/api/ai-recommendations/',
+                 {'analysis': {}, 'prompt': 'Suggest next steps as JSON.'}),
+        Scenario('upload_summarize', 'POST', '/api/upload-summarize/', format='multipart'),
+        Scenario('auth_login', 'POST', '/api/auth/login/',
+                 {'email': 'learner@bench.local', 'password': BENCH_PASSWORD}, auth='anonymous'),
+    ]
+    return {scenario.name: scenario for scenario in scenarios}
+
+
+class UniqueNames:
+    """Gives every create request a fresh name so unique constraints don't fail."""
+
+    def __init__(self, scenario):
+        self.scenario = scenario
+        self.counter = 0
+
+    def __getattr__(self, name):
+        return getattr(self.scenario, name)
+
+    @property
+    def payload(self):
+        self.counter += 1
+        return {**self.scenario.payload, 'name': f'Bench topic {time.perf_counter_ns()}-{self.counter}'}
+
+
+class UploadScenario:
+    """Builds a fresh SimpleUploadedFile per request (file objects can't be reused)."""
+
+    def __init__(self, scenario):
+        self.scenario = scenario
+
+    def __getattr__(self, name):
+        return getattr(self.scenario, name)
+
+    @property
+    def payload(self):
+        text = b'Entropy measures the number of microstates. ' * 200
+        return {
+            'file': SimpleUploadedFile('notes.txt', text, content_type='text/plain'),
+            'upload_type': 'notes',
+        }
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the study_core and auth endpoints against a fake Gemini client. "
+        "Reports throughput, p50/p95/p99 and queries per request, and can save or "
+        "compare against a baseline to flag regressions between commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', default='all',
+                            help="Comma separated scenario names, or 'all'.")
+        parser.add_argument('--concurrency', default='1,4,8',
+                            help="Comma separated concurrency levels.")
+        parser.add_argument('--requests', type=int, default=50,
+                            help="Requests per scenario per concurrency level.")
+        parser.add_argument('--topics', type=int, default=200, help="Topics to seed.")
+        parser.add_argument('--courses', type=int, default=30, help="Courses to seed.")
+        parser.add_argument('--users', type=int, default=100, help="Extra users to seed.")
+        parser.add_argument('--latency-ms', type=float, default=50,
+                            help="Median fake Gemini latency.")
+        parser.add_argument('--jitter-ms', type=float, default=20)
+        parser.add_argument('--distribution', default='lognormal',
+                            choices=['constant', 'uniform', 'lognormal'])
+        parser.add_argument('--overload-rate', type=float, default=0.0,
+                            help="Fraction of fake calls that fail with 503 overloaded.")
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help="Fraction of fake calls that fail with a non-retryable error.")
+        parser.add_argument('--ai-cache', action='store_true',
+                            help="Keep the AI response cache on (off by default so generation "
+                                 "scenarios measure the Gemini path).")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--baseline-dir', default=str(Path(settings.BASE_DIR) / 'benchmarks'))
+        parser.add_argument('--save-baseline', metavar='NAME',
+                            help="Save results as benchmarks/NAME.json.")
+        parser.add_argument('--compare', metavar='NAME',
+                            help="Compare results against benchmarks/NAME.json.")
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help="Relative slowdown tolerated before flagging a regression.")
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        all_scenarios = build_scenarios()
+        if options['scenarios'] == 'all':
+            selected = list(all_scenarios.values())
+        else:
+            names = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+            unknown = [name for name in names if name not in all_scenarios]
+            if unknown:
+                raise CommandError(f"Unknown scenarios: {', '.join(unknown)}. "
+                                   f"Available: {', '.join(all_scenarios)}")
+            selected = [all_scenarios[name] for name in names]
+        levels = [int(level) for level in options['concurrency'].split(',')]
+
+        fake = FakeGenaiClient(
+            latency=LatencyModel(
+                median_ms=options['latency_ms'],
+                jitter_ms=options['jitter_ms'],
+                distribution=options['distribution'],
+                seed=options['seed'],
+            ),
+            overload_rate=options['overload_rate'],
+            error_rate=options['error_rate'],
+            seed=options['seed'],
+        )
+
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            ai_cache_settings = {**getattr(settings, 'AI_CACHE', {}), 'ENABLED': options['ai_cache']}
+            with override_client(fake), override_settings(AI_CACHE=ai_cache_settings):
+                tokens = self.seed(options)
+                results = self.run_scenarios(Harness(tokens), selected, levels, options['requests'])
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        self.report(results, fake)
+
+        baseline_dir = Path(options['baseline_dir'])
+        meta = {'revision': git_revision(), 'options': {
+            key: options[key] for key in (
+                'requests', 'concurrency', 'topics', 'courses', 'users',
+                'latency_ms', 'jitter_ms', 'distribution', 'overload_rate', 'error_rate',
+            )
+        }}
+        if options['save_baseline']:
+            path = baseline_dir / f"{options['save_baseline']}.json"
+            save_baseline(path, results, meta)
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {path}"))
+        if options['compare']:
+            path = baseline_dir / f"{options['compare']}.json"
+            if not path.exists():
+                raise CommandError(f"No baseline at {path}")
+            baseline = load_baseline(path)
+            regressions = compare_to_baseline(results, baseline, options['threshold'])
+            revision = baseline.get('meta', {}).get('revision', '?')
+            if regressions:
+                self.stdout.write(self.style.ERROR(f"Regressions against {revision}:"))
+                for line in regressions:
+                    self.stdout.write(f"  {line}")
+                if options['fail_on_regression']:
+                    raise CommandError(f"{len(regressions)} regression(s) found")
+            else:
+                self.stdout.write(self.style.SUCCESS(f"No regressions against {revision}"))
+
+    def seed(self, options):
+        """Populate the test database and return API tokens per auth role."""
+        topics = Topic.objects.bulk_create([
+            Topic(name=f'Topic {i:04d}', description=f'Description for topic {i}', is_active=i % 5 != 0)
+            for i in range(options['topics'])
+        ])
+        for i in range(options['courses']):
+            course = Course.objects.create(name=f'Course {i:03d}', duration_hours=10 + i, is_published=i % 2 == 0)
+            course.topics.set(topics[i:i + 8])
+        User.objects.bulk_create([
+            User(username=f'user{i}', email=f'user{i}@bench.local') for i in range(options['users'])
+        ])
+        admin = User.objects.create_superuser('bench-admin', 'admin@bench.local', BENCH_PASSWORD)
+        learner = User.objects.create_user('bench-learner', 'learner@bench.local', BENCH_PASSWORD)
+        return {
+            'anonymous': None,
+            'admin': Token.objects.create(user=admin).key,
+            'learner': Token.objects.create(user=learner).key,
+        }
+
+    def run_scenarios(self, harness, scenarios, levels, requests):
+        results = {}
+        for scenario in scenarios:
+            if scenario.name == 'admin_topics_create':
+                scenario = UniqueNames(scenario)
+            elif scenario.name == 'upload_summarize':
+                scenario = UploadScenario(scenario)
+            status_code, queries = harness.count_queries(scenario)
+            if status_code not in scenario.expected_status:
+                self.stdout.write(self.style.WARNING(
+                    f"{scenario.name}: warm-up request returned {status_code}"
+                ))
+            for level in levels:
+                result = harness.run(scenario, level, requests)
+                result['queries'] = queries
+                results[f'{scenario.name}@{level}'] = result
+                self.stdout.write(
+                    f"{scenario.name:<22} c={level:<3} "
+                    f"{result['throughput_rps']:>8.1f} rps  "
+                    f"p50 {result['p50_ms']:>8.1f}ms  p95 {result['p95_ms']:>8.1f}ms  "
+                    f"p99 {result['p99_ms']:>8.1f}ms  q={queries:<3} err={result['errors']}"
+                )
+        return results
+
+    def report(self, results, fake):
+        self.stdout.write(self.style.SUCCESS(
+            f"Ran {len(results)} scenario/concurrency combinations; fake Gemini served {fake.calls} calls."
+        ))
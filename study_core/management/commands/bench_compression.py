@@ -0,0 +1,137 @@
+# study_core/management/commands/bench_compression.py
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from study_core import compression
+from study_core.benchmarking import percentile
+from study_core.models import StudySession
+
+WORDS = (
+    'entropy energy system model variable function derivative integral vector matrix cell protein '
+    'reaction equilibrium force momentum wave circuit algorithm recursion pointer class inference '
+    'hypothesis evidence theorem proof graph network lattice reference sample gradient'
+).split()
+
+ACTIVITIES = [
+    'Read the chapter on {w} and summarise the key ideas',
+    'Watch a short lecture about {w} and take notes',
+    'Solve 5 practice problems on {w}',
+    'Create flashcards for the {w} definitions',
+    'Explain {w} in your own words to a study partner',
+    'Review your notes on {w} and list open questions',
+]
+
+
+def synthetic_plan(rng):
+    """A study-plan shaped markdown document; used when the database has no sessions."""
+    topic = ' '.join(rng.sample(WORDS, 2)).title()
+    lines = [f'# Study Plan: {topic}', '', f'**Duration:** {rng.randint(2, 14)} days', '']
+    for day in range(1, rng.randint(3, 8) + 1):
+        word = rng.choice(WORDS)
+        lines += [f'## Day {day}: {word.title()} fundamentals', '', '**Learning objectives:**']
+        lines += [f'- Understand how {rng.choice(WORDS)} relates to {word}' for _ in range(rng.randint(2, 4))]
+        lines += ['', '**Activities:**']
+        lines += [
+            f'- {rng.choice(ACTIVITIES).format(w=rng.choice(WORDS))} ({rng.choice([15, 20, 30, 45, 60])} min)'
+            for _ in range(rng.randint(3, 6))
+        ]
+        lines += ['', '**Review:** Spend 15 minutes revisiting the previous day before starting.', '']
+    lines += ['## Tips for Success', '- Take short breaks every 45 minutes', '- Test yourself instead of re-reading']
+    return '\n'.join(lines)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure storage and read latency of compressed generated_content: raw vs zlib vs "
+        "zlib with a dictionary trained on part of the corpus, plus ORM read time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--from-db', action='store_true',
+                            help="Use existing study sessions from the default database as the corpus.")
+
+    def handle(self, *args, **options):
+        if options['from_db']:
+            corpus = list(StudySession.objects.values_list('generated_content', flat=True)[:options['rows']])
+        else:
+            rng = random.Random(options['seed'])
+            corpus = [synthetic_plan(rng) for _ in range(options['rows'])]
+        self.storage(corpus)
+
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            self.read_latency(corpus)
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+    def storage(self, corpus):
+        training = [text for index, text in enumerate(corpus) if index % 5]
+        holdout = corpus[::5]
+        dictionary = compression.train_dictionary(training)
+        raw = [text.encode('utf-8') for text in holdout]
+        raw_size = sum(len(data) for data in raw)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Storage ({len(holdout)} held-out rows, mean {raw_size // max(len(raw), 1)} bytes, "
+            f"dictionary {len(dictionary)} bytes)"
+        ))
+        for label, zdict in (('zlib', None), ('zlib+dictionary', dictionary)):
+            compress_times, decompress_times, size = [], [], 0
+            for data in raw:
+                started = time.perf_counter()
+                packed = compression.deflate(data, zdict)
+                compress_times.append(time.perf_counter() - started)
+                size += len(packed) + compression.HEADER.size
+                started = time.perf_counter()
+                compression.inflate(packed, zdict)
+                decompress_times.append(time.perf_counter() - started)
+            self.stdout.write(
+                f"  {label:<16} {size:>9} bytes  {raw_size / size:>5.2f}x  "
+                f"compress p50 {percentile(compress_times, 50) * 1e6:>6.1f}us  "
+                f"decompress p50 {percentile(decompress_times, 50) * 1e6:>6.1f}us"
+            )
+        self.stdout.write(f"  {'raw':<16} {raw_size:>9} bytes")
+
+    def read_latency(self, corpus):
+        user = User.objects.create_user('bench-compression')
+        StudySession.objects.bulk_create([
+            StudySession(user=user, topic_name=f'Topic {i}', duration_input='3 days', generated_content=text)
+            for i, text in enumerate(corpus)
+        ], batch_size=500)
+        table = StudySession._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT SUM(LENGTH(generated_content)) FROM {table}')
+            stored = cursor.fetchone()[0]
+        raw_size = sum(len(text.encode('utf-8')) for text in corpus)
+
+        timings = {'fetch bytes': [], 'ORM (decompress)': []}
+        for _ in range(5):
+            started = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT generated_content FROM {table}')
+                cursor.fetchall()
+            timings['fetch bytes'].append(time.perf_counter() - started)
+            started = time.perf_counter()
+            list(StudySession.objects.values_list('generated_content', flat=True))
+            timings['ORM (decompress)'].append(time.perf_counter() - started)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Database ({len(corpus)} rows, dictionary id {compression.current_dictionary_id()})"
+        ))
+        self.stdout.write(f"  column size {stored} bytes vs {raw_size} uncompressed ({raw_size / stored:.2f}x)")
+        for label, values in timings.items():
+            self.stdout.write(
+                f"  read all rows, {label:<17} p50 {percentile(values, 50) * 1000:>7.2f}ms  "
+                f"({percentile(values, 50) / len(corpus) * 1e6:.1f}us/row)"
+            )
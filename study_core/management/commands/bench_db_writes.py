@@ -0,0 +1,115 @@
+# study_core/management/commands/bench_db_writes.py
+import multiprocessing
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+
+from study_config.database import sqlite_database
+from study_core import progress, reviews
+from study_core.benchmarking import percentile
+
+TOPICS = ['Algebra', 'Calculus', 'Genetics', 'Optics', 'Recursion', 'Cold War', 'Databases', 'Ecology']
+
+
+def run_job(job):
+    """One worker process: record quiz attempts, or read progress and the review queue, until the deadline."""
+    kind, user_id, seed, start, deadline, workload, question_count = job
+    rng = random.Random(seed)
+    user = User.objects.get(pk=user_id)
+    latencies, errors = [], 0
+    time.sleep(max(0.0, start - time.time()))  # all processes begin together
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            if kind == 'write' and workload == 'session':
+                progress.record_study_session(user, rng.choice(TOPICS))
+            elif kind == 'write':
+                progress.record_attempt(user, rng.choice(TOPICS), [
+                    {'question': f'{user.username} question {rng.randrange(200)}', 'chosen_answer': 'a',
+                     'correct_answer': 'a', 'is_correct': rng.random() < 0.7}
+                    for _ in range(question_count)
+                ])
+            else:
+                progress.analysis(user)
+                reviews.due(user)
+            latencies.append(time.perf_counter() - started)
+        except OperationalError:  # "database is locked"
+            errors += 1
+    connections.close_all()
+    return kind, latencies, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrent write throughput on a SQLite file with Django's default settings and with "
+        "the tuned settings from study_config/database.py (WAL, synchronous=NORMAL, busy_timeout, "
+        "IMMEDIATE transactions). Writers bump study counts or record quiz attempts while readers load progress and "
+        "the review queue, each in its own process like gunicorn workers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--duration', type=float, default=5.0, help="Seconds per configuration.")
+        parser.add_argument('--workload', choices=['session', 'attempt'], default='session',
+                            help="session: bump a topic's study count (one UPDATE); "
+                                 "attempt: record a whole quiz attempt (about 20 statements).")
+        parser.add_argument('--questions', type=int, default=10, help="Questions per recorded attempt.")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        original = connections.settings['default']
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                for label, tuned in (('default', False), ('tuned', True)):
+                    path = Path(directory) / f'{label}.sqlite3'
+                    self.use_database(sqlite_database(path, tuned=tuned))
+                    call_command('migrate', verbosity=0)
+                    self.report(label, self.run(options))
+        finally:
+            self.use_database(original)
+
+    def use_database(self, database):
+        """Point the default alias at `database`; connections opened afterwards use it."""
+        connections['default'].close()
+        connections.settings['default'] = connections.configure_settings({'default': database})['default']
+        del connections['default']
+
+    def run(self, options):
+        users = [User.objects.create_user(f'bench-writer-{i}') for i in range(options['writers'])]
+        # Children are forked: no connection may be open across the fork
+        connections.close_all()
+        start = time.time() + 1.0  # leaves time for the processes to start
+        deadline = start + options['duration']
+        jobs = [('write', user.pk, options['seed'] + i) for i, user in enumerate(users)]
+        jobs += [('read', users[i % len(users)].pk, options['seed'] + 1000 + i) for i in range(options['readers'])]
+
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=len(jobs), mp_context=context) as pool:
+            outcomes = list(pool.map(run_job, [(*job, start, deadline, options['workload'], options['questions']) for job in jobs]))
+
+        results = {'writes': [], 'reads': [], 'errors': 0, 'elapsed': options['duration']}
+        for kind, latencies, errors in outcomes:
+            results['writes' if kind == 'write' else 'reads'] += latencies
+            results['errors'] += errors
+        return results
+
+    def report(self, label, results):
+        writes, reads = results['writes'], results['reads']
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        self.stdout.write(
+            f"  writes {len(writes) / results['elapsed']:>7.1f}/s  "
+            f"p50 {percentile(writes, 50) * 1000:>7.1f}ms  p99 {percentile(writes, 99) * 1000:>7.1f}ms"
+        )
+        self.stdout.write(
+            f"  reads  {len(reads) / results['elapsed']:>7.1f}/s  "
+            f"p50 {percentile(reads, 50) * 1000:>7.1f}ms  p99 {percentile(reads, 99) * 1000:>7.1f}ms"
+        )
+        self.stdout.write(f"  'database is locked' errors {results['errors']}")
@@ -0,0 +1,79 @@
+# study_core/management/commands/bench_import.py
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from study_core.benchmarking import percentile
+
+# What a gunicorn worker does before it can serve its first request.
+BOOT_SNIPPET = (
+    "import os, django;"
+    "os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'study_config.settings');"
+    "django.setup();"
+    "import study_config.urls;"
+    "from django.core.wsgi import get_wsgi_application;"
+    "get_wsgi_application()"
+)
+
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure worker cold-start: wall time of a fresh interpreter that sets up "
+        "Django and loads the URLconf, plus the heaviest imports from -X importtime."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--top', type=int, default=15,
+                            help="How many of the slowest top-level imports to list.")
+
+    def _boot(self, importtime=False):
+        command = [sys.executable]
+        if importtime:
+            command += ['-X', 'importtime']
+        command += ['-c', BOOT_SNIPPET]
+        env = {**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'}
+        started = time.perf_counter()
+        result = subprocess.run(command, cwd=settings.BASE_DIR, env=env,
+                                capture_output=True, text=True, check=True)
+        return time.perf_counter() - started, result.stderr
+
+    def handle(self, *args, **options):
+        self._boot()  # warm the OS file cache and .pyc files
+        timings = [self._boot()[0] for _ in range(options['runs'])]
+        self.stdout.write(
+            f"Worker boot over {len(timings)} runs: "
+            f"median {statistics.median(timings) * 1000:.0f}ms, "
+            f"p95 {percentile(timings, 95) * 1000:.0f}ms, "
+            f"min {min(timings) * 1000:.0f}ms"
+        )
+
+        _, report = self._boot(importtime=True)
+        modules = []
+        loaded = set()
+        for line in report.splitlines():
+            match = IMPORTTIME_LINE.match(line)
+            if match:
+                _, cumulative, indent, name = match.groups()
+                loaded.add(name)
+                # Only packages imported directly (not their submodules)
+                if len(indent) <= 1:
+                    modules.append((int(cumulative), name))
+        modules.sort(reverse=True)
+        total = sum(cumulative for cumulative, _ in modules)
+        self.stdout.write(f"Top-level imports: {total / 1000:.0f}ms cumulative")
+        for cumulative, name in modules[:options['top']]:
+            self.stdout.write(f"  {cumulative / 1000:>8.1f}ms  {name}")
+
+        if 'google.genai' in loaded:
+            self.stdout.write(self.style.WARNING("google.genai is imported at boot"))
+        else:
+            self.stdout.write(self.style.SUCCESS("google.genai is not imported at boot"))
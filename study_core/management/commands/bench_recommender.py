@@ -0,0 +1,119 @@
+# study_core/management/commands/bench_recommender.py
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from study_core import recommender
+from study_core.benchmarking import percentile
+from study_core.models import TopicMastery
+from study_core.progress import topic_key
+
+# Topics cluster by subject: learners mostly stay inside one or two subjects
+SUBJECTS = {
+    'Mathematics': ['Algebra', 'Calculus', 'Linear Algebra', 'Probability', 'Statistics', 'Number Theory',
+                    'Geometry', 'Trigonometry', 'Differential Equations', 'Discrete Math'],
+    'Physics': ['Kinematics', 'Thermodynamics', 'Electromagnetism', 'Optics', 'Quantum Mechanics',
+                'Relativity', 'Waves', 'Fluid Dynamics'],
+    'Biology': ['Cell Biology', 'Genetics', 'Evolution', 'Ecology', 'Human Anatomy', 'Microbiology',
+                'Botany', 'Neuroscience'],
+    'Programming': ['Python Basics', 'Data Structures', 'Algorithms', 'Recursion', 'Databases',
+                    'Web Development', 'Operating Systems', 'Networking', 'Git'],
+    'History': ['Ancient Rome', 'World War I', 'World War II', 'Cold War', 'French Revolution',
+                'Industrial Revolution', 'Renaissance'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the local recommender on synthetic learners: model build time, per-user scoring "
+        "latency, and how often a held-out topic shows up in nextSteps compared with recommending "
+        "popular topics."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--sample', type=int, default=300, help="Users scored for latency and hit rate.")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            self.run(options)
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+    def seed(self, options):
+        """Create learners; one topic per learner is held back to check nextSteps against."""
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+        subjects = list(SUBJECTS)
+        users = User.objects.bulk_create([User(username=f'bench-rec-{i}') for i in range(options['users'])])
+        rows, held_out = [], {}
+        for user in users:
+            picked = rng.sample(subjects, rng.choice([1, 1, 2]))
+            topics = [topic for subject in picked for topic in rng.sample(SUBJECTS[subject], rng.randint(2, 5))]
+            held_out[user.pk] = topics.pop()
+            for topic in topics:
+                attempts = rng.randint(0, 4)
+                score = rng.random()
+                rows.append(TopicMastery(
+                    user=user, topic_key=topic_key(topic), topic_name=topic,
+                    study_sessions=rng.randint(1, 4), attempts=attempts, questions=attempts * 10,
+                    correct=int(attempts * 10 * score), recent_score=score if attempts else 0.0,
+                    best_score=score if attempts else 0.0,
+                    last_studied_at=now - timezone.timedelta(days=rng.randint(0, 40)),
+                ))
+        TopicMastery.objects.bulk_create(rows, batch_size=1000)
+        self.stdout.write(f"Seeded {len(users)} learners, {len(rows)} topic rows")
+        return users, held_out
+
+    def run(self, options):
+        users, held_out = self.seed(options)
+        settings = recommender.recommender_settings()
+
+        builds = []
+        for _ in range(3):
+            started = time.perf_counter()
+            model = recommender.build_model(settings)
+            builds.append(time.perf_counter() - started)
+        recommender.invalidate()
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Model ({len(model.keys)} topics)"))
+        self.stdout.write(f"  build p50 {percentile(builds, 50) * 1000:.1f}ms")
+
+        rng = random.Random(options['seed'])
+        sample = rng.sample(users, min(options['sample'], len(users)))
+        popular = [model.names[i] for i in sorted(range(len(model.keys)), key=lambda i: -model.learners[i])]
+        totals, scoring, hits, baseline = [], [], 0, 0
+        recommender.rebuild(settings)
+        for user in sample:
+            started = time.perf_counter()
+            rows = list(TopicMastery.objects.filter(user=user))
+            fetched = time.perf_counter()
+            result = recommender.recommend(user, rows, settings)
+            done = time.perf_counter()
+            totals.append(done - started)
+            scoring.append(done - fetched)
+
+            target = held_out[user.pk]
+            hits += target in {item.get('topic') for item in result['nextSteps']}
+            seen = {row.topic_name for row in rows}
+            baseline += target in [name for name in popular if name not in seen][:settings['LIMITS']['nextSteps']]
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Per user ({len(sample)} learners)"))
+        self.stdout.write(
+            f"  scoring p50 {percentile(scoring, 50) * 1000:.2f}ms  p95 {percentile(scoring, 95) * 1000:.2f}ms"
+        )
+        self.stdout.write(
+            f"  with DB read p50 {percentile(totals, 50) * 1000:.2f}ms  p95 {percentile(totals, 95) * 1000:.2f}ms"
+        )
+        self.stdout.write(self.style.MIGRATE_HEADING("Held-out topic in nextSteps"))
+        self.stdout.write(f"  item-item cosine {hits / len(sample):.1%}")
+        self.stdout.write(f"  popular topics   {baseline / len(sample):.1%}")
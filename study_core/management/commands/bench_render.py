@@ -0,0 +1,106 @@
+# study_core/management/commands/bench_render.py
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.renderers import JSONRenderer
+
+from study_core.benchmarking import percentile
+from study_core.models import Course, Topic
+from study_core.renderers import ORJSONRenderer
+from study_core.serializers import (
+    CourseSerializer,
+    CourseValuesSerializer,
+    TopicSerializer,
+    TopicValuesSerializer,
+    UserSerializer,
+    UserValuesSerializer,
+)
+
+DATASETS = {
+    'topics': (lambda: Topic.objects.order_by('name'), TopicSerializer, TopicValuesSerializer),
+    'courses': (lambda: Course.objects.order_by('name').prefetch_related('topics'),
+                CourseSerializer, CourseValuesSerializer),
+    'users': (lambda: User.objects.order_by('date_joined'), UserSerializer, UserValuesSerializer),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare list serialization paths (ModelSerializer vs values_list fast path) "
+        "and renderers (DRF JSONRenderer vs orjson) on seeded data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--topics', type=int, default=2000)
+        parser.add_argument('--courses', type=int, default=300)
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--repeat', type=int, default=15, help="Timed passes per combination.")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            self.seed(options)
+            for name, (queryset, model_serializer, values_serializer) in DATASETS.items():
+                self.bench(name, queryset, model_serializer, values_serializer, options['repeat'])
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+    def seed(self, options):
+        topics = Topic.objects.bulk_create([
+            Topic(name=f'Topic {i:05d}', description=f'Description for topic {i} ' * 4, is_active=i % 5 != 0)
+            for i in range(options['topics'])
+        ])
+        courses = Course.objects.bulk_create([
+            Course(name=f'Course {i:04d}', slug=f'course-{i:04d}', description='Course description',
+                   duration_hours=10 + i % 40, is_published=i % 2 == 0)
+            for i in range(options['courses'])
+        ])
+        Through = Course.topics.through
+        Through.objects.bulk_create([
+            Through(course_id=course.pk, topic_id=topic.pk)
+            for i, course in enumerate(courses) for topic in topics[i % len(topics):][:8]
+        ])
+        User.objects.bulk_create([
+            User(username=f'user{i}', email=f'user{i}@bench.local', first_name='Bench', last_name=f'{i}')
+            for i in range(options['users'])
+        ])
+
+    def bench(self, name, queryset, model_serializer, values_serializer, repeat):
+        paths = {
+            'model': lambda: model_serializer(queryset(), many=True).data,
+            'values': lambda: values_serializer(queryset()).data,
+        }
+        renderers = {'drf-json': JSONRenderer(), 'orjson': ORJSONRenderer()}
+
+        reference = json.loads(renderers['drf-json'].render(paths['model']()))
+        fast = json.loads(renderers['orjson'].render(paths['values']()))
+        if fast != reference:
+            raise CommandError(f"{name}: fast path output differs from ModelSerializer + JSONRenderer")
+
+        baseline = None
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{name} ({len(reference)} rows)"))
+        for path_name, serialize in paths.items():
+            for renderer_name, renderer in renderers.items():
+                serialize_times, render_times = [], []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    data = serialize()
+                    serialized = time.perf_counter()
+                    renderer.render(data)
+                    serialize_times.append(serialized - started)
+                    render_times.append(time.perf_counter() - serialized)
+                serialize_ms = percentile(serialize_times, 50) * 1000
+                render_ms = percentile(render_times, 50) * 1000
+                total = serialize_ms + render_ms
+                baseline = baseline or total
+                self.stdout.write(
+                    f"  {path_name:<7} + {renderer_name:<8} serialize {serialize_ms:>8.2f}ms  "
+                    f"render {render_ms:>7.2f}ms  total {total:>8.2f}ms  x{baseline / total:.1f}"
+                )
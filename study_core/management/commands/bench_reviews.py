@@ -0,0 +1,115 @@
+# study_core/management/commands/bench_reviews.py
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from study_core import reviews
+from study_core.benchmarking import percentile
+from study_core.models import ReviewItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the review queue for a user with many items: due-now query latency and plan, "
+        "grading, the attempt write path and the nightly reschedule."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=50000, help="Review items for the measured user.")
+        parser.add_argument('--other-users', type=int, default=20)
+        parser.add_argument('--runs', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            self.run(options)
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+    def seed_items(self, user, count, rng, now):
+        settings = reviews.review_settings()
+        items = []
+        for i in range(count):
+            item = ReviewItem(
+                user=user, kind=ReviewItem.QUESTION, topic_key=f'topic {i % 200}', topic_name=f'Topic {i % 200}',
+                item_key=reviews.item_key(ReviewItem.QUESTION, f'topic {i % 200}', f'{user.pk} question {i}'),
+                prompt=f'Question {i}?', answer='Answer',
+            )
+            # Review histories of varying length, last reviewed in the past few months
+            reviewed = now - timedelta(days=rng.uniform(0, 90))
+            for _ in range(rng.randint(1, 6)):
+                reviews.apply_grade(item, rng.choice([1, 3, 4, 4, 5]), reviewed, settings)
+            items.append(item)
+        ReviewItem.objects.bulk_create(items, batch_size=2000)
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+        user = User.objects.create_user('bench-reviews')
+        started = time.perf_counter()
+        self.seed_items(user, options['items'], rng, now)
+        for i in range(options['other_users']):
+            self.seed_items(User.objects.create_user(f'bench-reviews-{i}'), options['items'] // 10, rng, now)
+        total = ReviewItem.objects.count()
+        due_now = ReviewItem.objects.filter(user=user, due_at__lte=now).count()
+        self.stdout.write(
+            f"Seeded {total} review items ({options['items']} for the measured user, {due_now} due) "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+        queryset = ReviewItem.objects.filter(user=user, due_at__lte=now).order_by('due_at')[:51]
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            explain = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+            cursor.execute(explain + sql, params)
+            plan = [' '.join(str(col) for col in row) for row in cursor.fetchall()]
+        self.stdout.write(self.style.MIGRATE_HEADING("Due-now plan"))
+        for line in plan:
+            self.stdout.write(f"  {line}")
+
+        timings = []
+        for _ in range(options['runs']):
+            started = time.perf_counter()
+            reviews.due(user)
+            timings.append(time.perf_counter() - started)
+        self.stdout.write(self.style.MIGRATE_HEADING(f"due(limit=50) x{options['runs']}"))
+        self.stdout.write(f"  p50 {percentile(timings, 50) * 1000:.2f}ms  p95 {percentile(timings, 95) * 1000:.2f}ms")
+
+        items, _ = reviews.due(user, 200)
+        timings = []
+        for item in items:
+            started = time.perf_counter()
+            reviews.grade(item, rng.choice([1, 3, 4, 5]))
+            timings.append(time.perf_counter() - started)
+        self.stdout.write(self.style.MIGRATE_HEADING(f"grade() x{len(items)}"))
+        self.stdout.write(f"  p50 {percentile(timings, 50) * 1000:.2f}ms  p95 {percentile(timings, 95) * 1000:.2f}ms")
+
+        results = [
+            {'question': f'{user.pk} question {rng.randrange(options["items"])}', 'correct_answer': 'Answer',
+             'is_correct': rng.random() < 0.7}
+            for _ in range(20)
+        ]
+        started = time.perf_counter()
+        reviews.record_results(user, 'Topic 7', 'topic 7', results, 0.7)
+        self.stdout.write(self.style.MIGRATE_HEADING("record_results() for a 20-question attempt"))
+        self.stdout.write(f"  {(time.perf_counter() - started) * 1000:.2f}ms")
+
+        from django.test import override_settings
+
+        with override_settings(REVIEWS={'INTERVAL_MODIFIER': 0.8}):
+            started = time.perf_counter()
+            scanned, changed = reviews.reschedule()
+            elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.MIGRATE_HEADING("reschedule() with INTERVAL_MODIFIER 1.0 -> 0.8"))
+        self.stdout.write(f"  {changed} of {scanned} items changed in {elapsed:.2f}s ({scanned / elapsed:,.0f} items/s)")
@@ -0,0 +1,17 @@
+# study_core/management/commands/prune_activity.py
+from django.core.management.base import BaseCommand
+
+from study_core import activity
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete activity log events older than ACTIVITY['RETENTION_DAYS'], "
+        "a batch at a time. Run daily."
+    )
+
+    def handle(self, *args, **options):
+        deleted = activity.prune()
+        self.stdout.write(self.style.SUCCESS(
+            f"Pruned {deleted} activity events older than {activity.activity_settings()['RETENTION_DAYS']} days"
+        ))
@@ -0,0 +1,18 @@
+# study_core/management/commands/prune_tombstones.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from study_core import sync
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete delta sync tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS. "
+        "Clients with an older cursor get a full resync. Run daily."
+    )
+
+    def handle(self, *args, **options):
+        deleted = sync.prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(
+            f"Pruned {deleted} tombstones older than {settings.SYNC_TOMBSTONE_RETENTION_DAYS} days"
+        ))
@@ -0,0 +1,33 @@
+# study_core/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from study_core import search
+from study_core.models import Course, SearchDocument, StudySession, Topic
+
+
+class Command(BaseCommand):
+    help = "Rebuild all search documents from Topics, Courses and StudySessions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        with transaction.atomic():
+            SearchDocument.objects.all().delete()
+            for queryset in (
+                Topic.objects.all(),
+                Course.objects.prefetch_related('topics'),
+                StudySession.objects.all(),
+            ):
+                batch = []
+                for instance in queryset.iterator(chunk_size=batch_size):
+                    batch.append(instance)
+                    if len(batch) >= batch_size:
+                        search.index_objects(batch)
+                        batch = []
+                search.index_objects(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {SearchDocument.objects.count()} documents"
+        ))
@@ -0,0 +1,34 @@
+# study_core/management/commands/reschedule_reviews.py
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from study_core import reviews
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute review intervals, ease and due dates under the current REVIEWS settings "
+        "(learning intervals, minimum ease, interval modifier, maximum interval, fuzz), in batches "
+        "with bulk_update. Run nightly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--user', help="Only reschedule this username's items.")
+        parser.add_argument('--dry-run', action='store_true', help="Count the changes without writing them.")
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f"No user named {options['user']}")
+
+        started = time.perf_counter()
+        scanned, changed = reviews.reschedule(options['batch_size'], user, options['dry_run'])
+        verb = "Would reschedule" if options['dry_run'] else "Rescheduled"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {changed} of {scanned} review items in {time.perf_counter() - started:.1f}s"
+        ))
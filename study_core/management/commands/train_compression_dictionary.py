@@ -0,0 +1,76 @@
+# study_core/management/commands/train_compression_dictionary.py
+from django.core.management.base import BaseCommand, CommandError
+
+from study_core import compression
+from study_core.models import StudySession
+
+BATCH_SIZE = 500
+
+
+def deflated_size(samples, dictionary=None):
+    return sum(len(compression.deflate(text.encode('utf-8'), dictionary)) for text in samples)
+
+
+class Command(BaseCommand):
+    help = (
+        "Train a zlib preset dictionary from recent study sessions and store it as the next "
+        "CompressionDictionary row. New values use it as soon as each worker notices it "
+        "(within compression.CURRENT_ID_TTL seconds)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=2000,
+                            help="Most recent sessions to train on.")
+        parser.add_argument('--size', type=int, default=compression.MAX_DICTIONARY_SIZE,
+                            help="Dictionary size in bytes (max 32768).")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Report the compression ratio without saving the dictionary.")
+        parser.add_argument('--recompress', action='store_true',
+                            help="Rewrite every session with the newest dictionary afterwards.")
+
+    def handle(self, *args, **options):
+        if not 0 < options['size'] <= compression.MAX_DICTIONARY_SIZE:
+            raise CommandError(f"--size must be between 1 and {compression.MAX_DICTIONARY_SIZE}")
+        texts = list(
+            StudySession.objects.order_by('-pk').values_list('generated_content', flat=True)[:options['samples']]
+        )
+        if len(texts) < 10:
+            raise CommandError(f"Need at least 10 study sessions to train on, found {len(texts)}")
+
+        # Hold out every 5th sample so the reported ratio isn't measured on training data
+        training = [text for index, text in enumerate(texts) if index % 5]
+        holdout = texts[::5]
+        dictionary = compression.train_dictionary(training, size=options['size'])
+
+        raw = sum(len(text.encode('utf-8')) for text in holdout)
+        plain = deflated_size(holdout)
+        with_dictionary = deflated_size(holdout, dictionary)
+        self.stdout.write(
+            f"{len(training)} training / {len(holdout)} holdout samples, dictionary {len(dictionary)} bytes\n"
+            f"  raw {raw} bytes, zlib {plain} ({raw / max(plain, 1):.2f}x), "
+            f"zlib+dictionary {with_dictionary} ({raw / max(with_dictionary, 1):.2f}x)"
+        )
+
+        if options['dry_run']:
+            return
+        if with_dictionary >= plain:
+            raise CommandError("The trained dictionary doesn't beat plain zlib; not saving it")
+        dict_id = compression.save_dictionary(dictionary)
+        self.stdout.write(self.style.SUCCESS(f"Saved dictionary {dict_id} ({len(dictionary)} bytes)"))
+        if options['recompress']:
+            self.recompress()
+
+    def recompress(self):
+        last_pk = 0
+        total = 0
+        while True:
+            batch = list(
+                StudySession.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'generated_content')[:BATCH_SIZE]
+            )
+            if not batch:
+                break
+            # Decompressed on load, recompressed with the newest dictionary on save
+            StudySession.objects.bulk_update(batch, ['generated_content'])
+            last_pk = batch[-1].pk
+            total += len(batch)
+        self.stdout.write(self.style.SUCCESS(f"Recompressed {total} sessions"))
@@ -0,0 +1,104 @@
+# study_core/middleware.py
+import threading
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+from django.http import HttpResponse
+
+from . import profiling
+from .instrumentation import finish_request, phase, start_request
+
+
+class TimingMiddleware:
+    """
+    Times every request, attributes DB time to the 'db' phase and
+    records the result into the per-view histograms. Adds a
+    Server-Timing header so the breakdown shows up in browser devtools.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings, token = start_request()
+        request._timings = timings
+        response = None
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(self._time_query))
+                response = self.get_response(request)
+        finally:
+            self._label(request, timings)
+            status_code = response.status_code if response is not None else 500
+            total = finish_request(timings, token, status_code)
+
+        response['Server-Timing'] = timings.server_timing(total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Label early so LLM/background metrics recorded mid-request carry the view name
+        self._label(request, request._timings)
+        return None
+
+    @staticmethod
+    def _label(request, timings):
+        match = getattr(request, 'resolver_match', None)
+        if match is not None:
+            timings.view = match.url_name or match.view_name or 'unnamed'
+
+    @staticmethod
+    def _time_query(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            with phase('db'):
+                return execute(sql, params, many, context)
+        finally:
+            profiling.check_slow_query(context['connection'], sql, params, many, time.perf_counter() - started)
+
+
+class ProfilingMiddleware:
+    """
+    Runs a staff request under the sampling profiler when it asks with
+    `X-Profile: 1` or `?profile=1`. The profile is stored and its id
+    returned in X-Profile-Id. With `X-Profile: return` (or
+    `?profile=return`) the collapsed stacks replace the response body.
+    Anyone else's flag is ignored.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = request.headers.get('X-Profile') or request.GET.get('profile')
+        if not mode or mode == '0' or not self._is_staff(request):
+            return self.get_response(request)
+
+        options = profiling.profiling_settings()
+        profiler = profiling.SamplingProfiler(
+            threading.get_ident(), options['SAMPLE_INTERVAL'], options['MAX_STACK_DEPTH'],
+        ).start()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+
+        if mode == 'return':
+            return HttpResponse(profiler.collapsed(), content_type='text/plain; charset=utf-8')
+        response['X-Profile-Id'] = profiling.store_profile(profiler, request, response.status_code)
+        return response
+
+    @staticmethod
+    def _is_staff(request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return user.is_staff
+        # API clients authenticate in DRF, after middleware; check the token here
+        from rest_framework.exceptions import AuthenticationFailed
+        from users.authentication import CachedTokenAuthentication
+        try:
+            result = CachedTokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return False
+        return result is not None and result[0].is_staff
@@ -0,0 +1,124 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+FTS_TABLE = 'study_core_searchdocument_fts'
+
+SQLITE_FORWARD = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, body, content='study_core_searchdocument', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS study_core_searchdocument_ai AFTER INSERT ON study_core_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS study_core_searchdocument_ad AFTER DELETE ON study_core_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS study_core_searchdocument_au AFTER UPDATE ON study_core_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+]
+
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS study_core_searchdocument_ai',
+    'DROP TRIGGER IF EXISTS study_core_searchdocument_ad',
+    'DROP TRIGGER IF EXISTS study_core_searchdocument_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+# Must match study_core.search.POSTGRES_DOCUMENT_VECTOR
+POSTGRES_FORWARD = [
+    """CREATE INDEX IF NOT EXISTS study_core_searchdocument_fts_idx ON study_core_searchdocument USING GIN ((
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(body, '')), 'B')
+    ))""",
+]
+
+POSTGRES_REVERSE = ['DROP INDEX IF EXISTS study_core_searchdocument_fts_idx']
+
+
+def _execute(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            _execute(schema_editor, SQLITE_FORWARD)
+        except Exception as e:
+            # SQLite built without FTS5: search falls back to icontains
+            print(f"FTS5 unavailable, skipping full-text index: {e}")
+    elif vendor == 'postgresql':
+        _execute(schema_editor, POSTGRES_FORWARD)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _execute(schema_editor, SQLITE_REVERSE)
+    elif vendor == 'postgresql':
+        _execute(schema_editor, POSTGRES_REVERSE)
+
+
+def backfill_documents(apps, schema_editor):
+    SearchDocument = apps.get_model('study_core', 'SearchDocument')
+    Topic = apps.get_model('study_core', 'Topic')
+    Course = apps.get_model('study_core', 'Course')
+    StudySession = apps.get_model('study_core', 'StudySession')
+    now = timezone.now()
+
+    documents = [
+        SearchDocument(kind='topic', object_id=topic.pk, title=topic.name,
+                       body=topic.description, is_public=topic.is_active, updated_at=now)
+        for topic in Topic.objects.all()
+    ]
+    for course in Course.objects.prefetch_related('topics'):
+        topic_names = ', '.join(topic.name for topic in course.topics.all())
+        documents.append(SearchDocument(
+            kind='course', object_id=course.pk, title=course.name,
+            body=f'{course.description}\n{topic_names}'.strip(),
+            is_public=course.is_published, updated_at=now,
+        ))
+    for session in StudySession.objects.all().iterator():
+        documents.append(SearchDocument(
+            kind='session', object_id=session.pk, title=session.topic_name,
+            body=session.generated_content, owner_id=session.user_id,
+            is_public=False, updated_at=now,
+        ))
+    SearchDocument.objects.bulk_create(documents, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('study_core', '0004_alter_topic_options_topic_updated_at_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('topic', 'Topic'), ('course', 'Course'), ('session', 'Study session')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('is_public', models.BooleanField(default=True)),
+                ('title', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document')],
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+    ]
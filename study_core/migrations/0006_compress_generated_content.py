@@ -0,0 +1,92 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:10
+
+from django.db import migrations, models
+
+import study_core.fields
+
+BATCH_SIZE = 500
+
+
+def compress_existing(apps, schema_editor):
+    """Copy generated_content into the compressed column, BATCH_SIZE rows at a time."""
+    StudySession = apps.get_model('study_core', 'StudySession')
+    sessions = StudySession.objects.using(schema_editor.connection.alias)
+    last_pk = 0
+    while True:
+        batch = list(
+            sessions.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .only('pk', 'generated_content')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for session in batch:
+            session.generated_content_compressed = session.generated_content
+        sessions.bulk_update(batch, ['generated_content_compressed'])
+        last_pk = batch[-1].pk
+
+
+def decompress_existing(apps, schema_editor):
+    StudySession = apps.get_model('study_core', 'StudySession')
+    sessions = StudySession.objects.using(schema_editor.connection.alias)
+    last_pk = 0
+    while True:
+        batch = list(
+            sessions.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .only('pk', 'generated_content_compressed')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for session in batch:
+            session.generated_content = session.generated_content_compressed or ''
+        sessions.bulk_update(batch, ['generated_content'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('study_core', '0005_searchdocument'),
+    ]
+
+    operations = [
+        # Preset dictionaries live next to the rows that need them (study_core.compression)
+        migrations.CreateModel(
+            name='CompressionDictionary',
+            fields=[
+                ('id', models.PositiveSmallIntegerField(primary_key=True, serialize=False)),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Compression dictionaries',
+            },
+        ),
+        migrations.AddField(
+            model_name='studysession',
+            name='generated_content_compressed',
+            field=study_core.fields.CompressedTextField(null=True),
+        ),
+        # Nullable so the reverse migration can re-add it before refilling it
+        migrations.AlterField(
+            model_name='studysession',
+            name='generated_content',
+            field=models.TextField(null=True, help_text='The full structured study plan or quiz generated by the AI.'),
+        ),
+        migrations.RunPython(compress_existing, decompress_existing),
+        migrations.RemoveField(
+            model_name='studysession',
+            name='generated_content',
+        ),
+        migrations.RenameField(
+            model_name='studysession',
+            old_name='generated_content_compressed',
+            new_name='generated_content',
+        ),
+        migrations.AlterField(
+            model_name='studysession',
+            name='generated_content',
+            field=study_core.fields.CompressedTextField(help_text='The full structured study plan or quiz generated by the AI.'),
+        ),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_study_sessions(apps, schema_editor):
+    """Seed TopicMastery study counts from the existing study plans."""
+    StudySession = apps.get_model('study_core', 'StudySession')
+    TopicMastery = apps.get_model('study_core', 'TopicMastery')
+    rows = {}
+    for user_id, name, created_at in StudySession.objects.values_list('user_id', 'topic_name', 'created_at').iterator():
+        key = ' '.join(name.split()).casefold()[:255]  # progress.topic_key()
+        row = rows.get((user_id, key))
+        if row is None:
+            row = rows[(user_id, key)] = TopicMastery(user_id=user_id, topic_key=key, topic_name=name[:255])
+        row.study_sessions += 1
+        if row.last_studied_at is None or created_at > row.last_studied_at:
+            row.last_studied_at = created_at
+    TopicMastery.objects.bulk_create(rows.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('study_core', '0007_sync_tombstones_and_updated_at_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic_name', models.CharField(max_length=255)),
+                ('topic_key', models.CharField(max_length=255)),
+                ('total', models.PositiveIntegerField()),
+                ('correct', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='quiz_attempts', to='study_core.studysession')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_attempts', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuestionResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField()),
+                ('question', models.TextField()),
+                ('chosen_answer', models.CharField(blank=True, max_length=500)),
+                ('correct_answer', models.CharField(blank=True, max_length=500)),
+                ('is_correct', models.BooleanField()),
+                ('attempt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='study_core.quizattempt')),
+            ],
+            options={
+                'ordering': ['attempt', 'position'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TopicMastery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic_key', models.CharField(max_length=255)),
+                ('topic_name', models.CharField(max_length=255)),
+                ('study_sessions', models.PositiveIntegerField(default=0)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('questions', models.PositiveIntegerField(default=0)),
+                ('correct', models.PositiveIntegerField(default=0)),
+                ('recent_score', models.FloatField(default=0.0)),
+                ('best_score', models.FloatField(default=0.0)),
+                ('last_studied_at', models.DateTimeField(blank=True, null=True)),
+                ('last_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='topic_mastery', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Topic mastery',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['user', 'topic_key', 'created_at'], name='study_attempt_user_topic_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='questionresult',
+            constraint=models.UniqueConstraint(fields=('attempt', 'position'), name='unique_question_position'),
+        ),
+        migrations.AddConstraint(
+            model_name='topicmastery',
+            constraint=models.UniqueConstraint(fields=('user', 'topic_key'), name='unique_topic_mastery'),
+        ),
+        migrations.RunPython(backfill_study_sessions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('study_core', '0008_quiz_attempts_topic_mastery'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('question', 'Question'), ('topic', 'Topic')], max_length=10)),
+                ('item_key', models.CharField(max_length=64)),
+                ('topic_key', models.CharField(max_length=255)),
+                ('topic_name', models.CharField(max_length=255)),
+                ('prompt', models.TextField(help_text='The question, or the topic name for topic items.')),
+                ('answer', models.CharField(blank=True, max_length=500)),
+                ('repetitions', models.PositiveIntegerField(default=0)),
+                ('interval_days', models.FloatField(default=0.0)),
+                ('ease', models.FloatField(default=2.5)),
+                ('lapses', models.PositiveIntegerField(default=0)),
+                ('last_grade', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('last_reviewed_at', models.DateTimeField(blank=True, null=True)),
+                ('due_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_items', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'due_at'], name='study_review_user_due_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'item_key'), name='unique_review_item')],
+            },
+        ),
+    ]
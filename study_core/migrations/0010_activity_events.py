@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:34
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_registrations(apps, schema_editor):
+    """Seed the feed with the registrations recent_activities used to read from auth_user."""
+    User = apps.get_model('auth', 'User')
+    ActivityEvent = apps.get_model('study_core', 'ActivityEvent')
+    ActivityEvent.objects.bulk_create([
+        ActivityEvent(
+            event_type='user_registered', user_id=user.pk, username=user.username,
+            message=f'New user registered: {user.username}', created_at=user.date_joined,
+        )
+        for user in User.objects.filter(is_staff=False).only('pk', 'username', 'date_joined').iterator()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('study_core', '0009_review_items'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(max_length=40)),
+                ('user_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('username', models.CharField(blank=True, max_length=150)),
+                ('message', models.CharField(max_length=255)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-created_at'], name='study_activity_created_idx'), models.Index(fields=['event_type', '-created_at'], name='study_activity_type_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_registrations, migrations.RunPython.noop),
+    ]
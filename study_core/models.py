@@ -1,8 +1,11 @@
 # study_core/models.py - FULLY UPDATED
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from django.utils.text import slugify
 
+from .fields import CompressedTextField
+
 User = get_user_model()
 
 class StudyTopic(models.Model):
@@ -22,7 +25,8 @@ class StudyTopic(models.Model):
 class StudySession(models.Model):
     """
     Stores a single AI-generated study plan or quiz session.
-    The content is saved as plain text or JSON string in the 'generated_content'.
+    The content is saved as plain text or JSON string in the 'generated_content'
+    (stored compressed, see study_core/compression.py).
     """
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='study_sessions')
@@ -35,7 +39,7 @@ class StudySession(models.Model):
         help_text="General topic category for grouping."
     )
     duration_input = models.CharField(max_length=50, help_text="User's input on time/duration (e.g., '3 days', '2 hours').")
-    generated_content = models.TextField(help_text="The full structured study plan or quiz generated by the AI.")
+    generated_content = CompressedTextField(help_text="The full structured study plan or quiz generated by the AI.")
     created_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
@@ -65,6 +69,10 @@ class Topic(models.Model):
         ordering = ['name']
         verbose_name = "Study Topic"
         verbose_name_plural = "Study Topics"
+        indexes = [
+            # Delta sync: changes since a cursor (see study_core/sync.py)
+            models.Index(fields=['updated_at'], name='study_topic_updated_at_idx'),
+        ]
 
 
 class Course(models.Model):
@@ -93,6 +101,9 @@ class Course(models.Model):
         ordering = ['name']
         verbose_name = "Study Course"
         verbose_name_plural = "Study Courses"
+        indexes = [
+            models.Index(fields=['updated_at'], name='study_course_updated_at_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -100,4 +111,248 @@ class Course(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+class CompressionDictionary(models.Model):
+    """
+    A zlib preset dictionary for CompressedTextField (see
+    study_core/compression.py). Rows are written once and never changed
+    or deleted: every value compressed with a dictionary names it by id.
+    Kept in the database so the dictionary always lives wherever the
+    rows that need it do.
+    """
+
+    id = models.PositiveSmallIntegerField(primary_key=True)
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = "Compression dictionaries"
+
+    def __str__(self):
+        return f'dictionary {self.id} ({len(self.data)} bytes)'
+
+
+class SearchDocument(models.Model):
+    """
+    Denormalized, searchable text for a Topic, Course or StudySession.
+
+    Rows are kept in sync by study_core.signals and indexed by the
+    database-specific full-text index created in migration 0005
+    (SQLite FTS5 table or PostgreSQL GIN index); see study_core/search.py.
+    """
+
+    KIND_TOPIC = 'topic'
+    KIND_COURSE = 'course'
+    KIND_SESSION = 'session'
+    KIND_CHOICES = [
+        (KIND_TOPIC, 'Topic'),
+        (KIND_COURSE, 'Course'),
+        (KIND_SESSION, 'Study session'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+
+    # Private documents (study sessions) belong to one user
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+
+    # Inactive topics and unpublished courses are only visible to staff
+    is_public = models.BooleanField(default=True)
+
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_search_document'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind}:{self.object_id} {self.title}'
+
+
+class Tombstone(models.Model):
+    """
+    Records a deleted Topic or Course so delta sync clients can drop it.
+    Rows older than SYNC_TOMBSTONE_RETENTION_DAYS are pruned; clients
+    with an older cursor get a full resync instead.
+    """
+
+    KIND_TOPIC = 'topic'
+    KIND_COURSE = 'course'
+    KIND_CHOICES = [
+        (KIND_TOPIC, 'Topic'),
+        (KIND_COURSE, 'Course'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'deleted_at'], name='study_tombstone_kind_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind}:{self.object_id} deleted {self.deleted_at:%Y-%m-%d %H:%M}'
+
+
+class QuizAttempt(models.Model):
+    """One completed quiz: which topic, how many questions, how many right."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quiz_attempts')
+    topic_name = models.CharField(max_length=255)
+    # Normalised topic_name; the key TopicMastery rows are grouped by
+    topic_key = models.CharField(max_length=255)
+    session = models.ForeignKey(StudySession, on_delete=models.SET_NULL, null=True, blank=True, related_name='quiz_attempts')
+    total = models.PositiveIntegerField()
+    correct = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'topic_key', 'created_at'], name='study_attempt_user_topic_idx'),
+        ]
+
+    @property
+    def score(self):
+        return self.correct / self.total if self.total else 0.0
+
+    def __str__(self):
+        return f'{self.user_id} | {self.topic_name}: {self.correct}/{self.total}'
+
+
+class QuestionResult(models.Model):
+    """A single answered question within a QuizAttempt."""
+
+    attempt = models.ForeignKey(QuizAttempt, on_delete=models.CASCADE, related_name='results')
+    position = models.PositiveSmallIntegerField()
+    question = models.TextField()
+    chosen_answer = models.CharField(max_length=500, blank=True)
+    correct_answer = models.CharField(max_length=500, blank=True)
+    is_correct = models.BooleanField()
+
+    class Meta:
+        ordering = ['attempt', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['attempt', 'position'], name='unique_question_position'),
+        ]
+
+    def __str__(self):
+        return f'{self.attempt_id}#{self.position} {"correct" if self.is_correct else "wrong"}'
+
+
+class TopicMastery(models.Model):
+    """
+    Running per-user, per-topic totals, updated in place with F()
+    expressions on every quiz attempt and study plan (see
+    study_core/progress.py), so reading progress never rescans history.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='topic_mastery')
+    topic_key = models.CharField(max_length=255)
+    topic_name = models.CharField(max_length=255)
+    study_sessions = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    questions = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+    # Exponentially weighted attempt score (0-1): recent attempts count most
+    recent_score = models.FloatField(default=0.0)
+    best_score = models.FloatField(default=0.0)
+    last_studied_at = models.DateTimeField(null=True, blank=True)
+    last_attempt_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "Topic mastery"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'topic_key'], name='unique_topic_mastery'),
+        ]
+
+    @property
+    def accuracy(self):
+        return self.correct / self.questions if self.questions else None
+
+    def __str__(self):
+        return f'{self.user_id} | {self.topic_name}: {self.recent_score:.2f}'
+
+
+class ReviewItem(models.Model):
+    """
+    Spaced-repetition state for one quiz question or topic a user has
+    been tested on (see study_core/reviews.py). The (user, due_at) index
+    serves the due-now queue as a single range scan.
+    """
+
+    QUESTION = 'question'
+    TOPIC = 'topic'
+    KIND_CHOICES = [(QUESTION, 'Question'), (TOPIC, 'Topic')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='review_items')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # sha256 of kind, topic_key and the normalised question; dedupes repeats of the same item
+    item_key = models.CharField(max_length=64)
+    topic_key = models.CharField(max_length=255)
+    topic_name = models.CharField(max_length=255)
+    prompt = models.TextField(help_text="The question, or the topic name for topic items.")
+    answer = models.CharField(max_length=500, blank=True)
+    # SM-2 state
+    repetitions = models.PositiveIntegerField(default=0)
+    interval_days = models.FloatField(default=0.0)
+    ease = models.FloatField(default=2.5)
+    lapses = models.PositiveIntegerField(default=0)
+    last_grade = models.PositiveSmallIntegerField(null=True, blank=True)
+    last_reviewed_at = models.DateTimeField(null=True, blank=True)
+    due_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'item_key'], name='unique_review_item'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'due_at'], name='study_review_user_due_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} | {self.kind}: {self.prompt[:40]} (due {self.due_at:%Y-%m-%d})'
+
+
+class ActivityEvent(models.Model):
+    """
+    Append-only log of things users and staff did, for the admin activity
+    feed. Rows are written in batches by study_core/activity.py and
+    pruned by age (ACTIVITY['RETENTION_DAYS']), never updated.
+    """
+
+    USER_REGISTERED = 'user_registered'
+    USER_LOGGED_IN = 'user_logged_in'
+    CONTENT_GENERATED = 'content_generated'
+    FILE_UPLOADED = 'file_uploaded'
+    TOPIC_CREATED = 'topic_created'
+    TOPIC_UPDATED = 'topic_updated'
+    TOPIC_DELETED = 'topic_deleted'
+    COURSE_CREATED = 'course_created'
+    COURSE_UPDATED = 'course_updated'
+    COURSE_DELETED = 'course_deleted'
+    USER_UPDATED = 'user_updated'
+
+    event_type = models.CharField(max_length=40)
+    # No foreign key: events outlive the users and objects they mention,
+    # and writing them never needs a join or a cascade
+    user_id = models.PositiveBigIntegerField(null=True, blank=True)
+    username = models.CharField(max_length=150, blank=True)
+    message = models.CharField(max_length=255)
+    data = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at'], name='study_activity_created_idx'),
+            models.Index(fields=['event_type', '-created_at'], name='study_activity_type_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.created_at:%Y-%m-%d %H:%M} {self.event_type}: {self.message}'
@@ -0,0 +1,169 @@
+# study_core/prefetch.py
+"""
+Speculative prefetch of notes and quizzes after a study plan.
+
+Learners nearly always ask for notes and a quiz on the same topic right
+after a plan. When prefetch is ENABLED (off by default) and the plan
+request opts in with "prefetch": true, session_generation_view schedules
+both into the AI cache (ai_cache.warm) on a small low-priority pool.
+The follow-up requests then hit the cache, or join the generation still
+in flight.
+
+Guard rails:
+- a per-user budget of prefetch generations per window (cache counter),
+- a bounded queue; prefetches are dropped rather than queued behind
+  real work,
+- cancellation: the plan response carries a prefetch_id, and
+  POST /api/prefetch/<id>/cancel/ stops any generation not yet started.
+
+Budgets and job state live in their own cache alias (CACHE_ALIAS,
+'prefetch'), so churn in the default cache can't cull a counter early.
+With the stock LocMem backend that alias is per process: each worker
+keeps its own budget, so a user can get up to BUDGET_PER_USER times the
+number of workers, and a cancel only reaches the worker that ran the
+plan. Point the alias at a shared backend (Redis, Memcached,
+DatabaseCache) for both to hold across workers.
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import ai_cache
+from .instrumentation import registry
+
+DEFAULTS = {
+    'ENABLED': False,  # each prefetch is a paid generation the learner may never ask for
+    'CACHE_ALIAS': 'prefetch',
+    'WORKERS': 1,
+    'MAX_QUEUE': 20,  # pending jobs per process before new ones are dropped
+    'BUDGET_PER_USER': 10,  # generations per user per window
+    'BUDGET_WINDOW': 60 * 60,
+    'JOB_TTL': 15 * 60,
+}
+
+_executors = {}
+_lock = threading.Lock()
+_pending = 0
+
+registry.describe('study_prefetch_total', 'Speculative prefetch jobs and generations, by result.')
+
+
+def prefetch_settings():
+    return {**DEFAULTS, **getattr(settings, 'AI_PREFETCH', {})}
+
+
+def _executor(workers):
+    pid = os.getpid()
+    executor = _executors.get(pid)
+    if executor is None:
+        with _lock:
+            executor = _executors.get(pid)
+            if executor is None:
+                executor = _executors[pid] = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix='ai-prefetch'
+                )
+    return executor
+
+
+def _cache(options=None):
+    return caches[(options or prefetch_settings())['CACHE_ALIAS']]
+
+
+def _job_key(job_id):
+    return f'prefetch:job:{job_id}'
+
+
+def _take_budget(user_id, wanted, options):
+    """Reserve up to `wanted` generations from the user's budget; returns how many were granted."""
+    window = int(time.time() // options['BUDGET_WINDOW'])
+    key = f'prefetch:budget:{user_id}:{window}'
+    cache = _cache(options)
+    cache.add(key, 0, timeout=options['BUDGET_WINDOW'])
+    try:
+        used = cache.incr(key, wanted)
+    except ValueError:  # expired between add() and incr()
+        cache.set(key, wanted, timeout=options['BUDGET_WINDOW'])
+        used = wanted
+    granted = max(0, min(wanted, options['BUDGET_PER_USER'] - (used - wanted)))
+    if granted < wanted:
+        cache.decr(key, wanted - granted)
+    return granted
+
+
+def is_cancelled(job_id):
+    job = _cache().get(_job_key(job_id))
+    return job is None or job['cancelled']
+
+
+def cancel(job_id, user_id):
+    """Cancel a job owned by `user_id`. Returns False if it doesn't exist or isn't theirs."""
+    options = prefetch_settings()
+    job = _cache(options).get(_job_key(job_id))
+    if job is None or job['user_id'] != user_id:
+        return False
+    job['cancelled'] = True
+    _cache(options).set(_job_key(job_id), job, timeout=options['JOB_TTL'])
+    return True
+
+
+def _run(job_id, tasks, generate, failed, model):
+    global _pending
+    try:
+        for kind, prompt in tasks:
+            if is_cancelled(job_id):
+                registry.increment('study_prefetch_total', {'result': 'cancelled'})
+                return
+            try:
+                generated = ai_cache.warm(kind, prompt, generate, failed, model=model)
+            except Exception as e:
+                print(f"Prefetch of {kind} failed: {e}")
+                generated = False
+            registry.increment('study_prefetch_total', {'result': 'generated' if generated else 'skipped'})
+    finally:
+        with _lock:
+            _pending -= 1
+
+
+def schedule(user, tasks, generate, failed, model=''):
+    """
+    Queue (kind, prompt) generations for `user`. Returns a job id, or None
+    if prefetch is disabled, the user is anonymous or out of budget, or
+    the queue is full.
+    """
+    global _pending
+    options = prefetch_settings()
+    if not options['ENABLED'] or not ai_cache.cache_settings()['ENABLED']:
+        return None
+    if user is None or not user.is_authenticated:
+        return None
+    tasks = [(kind, prompt) for kind, prompt in tasks if not ai_cache.is_fresh(kind, prompt, model)]
+    if not tasks:
+        return None
+
+    with _lock:
+        if _pending >= options['MAX_QUEUE']:
+            registry.increment('study_prefetch_total', {'result': 'dropped'})
+            return None
+        _pending += 1
+    granted = _take_budget(user.pk, len(tasks), options)
+    if not granted:
+        with _lock:
+            _pending -= 1
+        registry.increment('study_prefetch_total', {'result': 'over_budget'})
+        return None
+
+    job_id = uuid.uuid4().hex
+    _cache(options).set(_job_key(job_id), {'user_id': user.pk, 'cancelled': False}, timeout=options['JOB_TTL'])
+    try:
+        _executor(options['WORKERS']).submit(_run, job_id, tasks[:granted], generate, failed, model)
+    except RuntimeError:
+        with _lock:
+            _pending -= 1
+        return None
+    registry.increment('study_prefetch_total', {'result': 'scheduled'})
+    return job_id
@@ -0,0 +1,250 @@
+# study_core/profiling.py
+"""
+On-demand request profiling and a slow-query log, for staff.
+
+Profiling: a staff request that sends `X-Profile: 1` (or `?profile=1`)
+runs under a sampling profiler. A background thread reads the request
+thread's stack every SAMPLE_INTERVAL seconds and counts identical stacks.
+The result is stored in the default cache in collapsed-stack format,
+one `frame;frame;frame count` line per stack. flamegraph.pl, speedscope
+and similar tools read that format directly. The response carries
+X-Profile-Id, and the profile is fetched from /api/admin/profiles/<id>/.
+With `X-Profile: return` the response body is the profile itself. The
+flag is ignored for anyone who isn't staff.
+
+Slow queries: TimingMiddleware passes every query's duration to
+check_slow_query(). Queries slower than SLOW_QUERY_MS go into a bounded
+per-process ring buffer with their SQL, duration, the view, the
+application call site and, for SELECTs, the EXPLAIN output. Parameter
+values are never kept, only their types: they include token keys,
+password hashes and learners' text. Quoted literals in the plan are
+masked for the same reason (Postgres inlines parameter values there).
+The plan is cached per statement so a hot slow query isn't explained on
+every call. /api/admin/slow-queries/ shows the buffer.
+"""
+import os
+import re
+import sys
+import threading
+import time
+import traceback
+import uuid
+from collections import Counter, OrderedDict, deque
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .instrumentation import current_timings, registry
+
+DEFAULTS = {
+    'SAMPLE_INTERVAL': 0.005,  # seconds between stack samples
+    'PROFILE_TTL': 60 * 60,  # seconds a stored profile is kept
+    'MAX_STACK_DEPTH': 100,
+    'SLOW_QUERY_MS': 100,
+    'SLOW_QUERY_LOG_SIZE': 200,
+    'EXPLAIN': True,
+    'CALL_SITE_DEPTH': 6,  # application frames kept per slow query
+}
+
+PROFILE_KEY = 'profile:{}'
+PROFILE_INDEX_KEY = 'profile:index'
+PROFILE_INDEX_SIZE = 50
+PLAN_CACHE_SIZE = 256
+
+BASE_DIR = str(settings.BASE_DIR)
+# Frames from these paths aren't "call sites" even though they're under BASE_DIR
+LIBRARY_MARKERS = ('site-packages', 'dist-packages', f'{os.sep}lib{os.sep}python')
+# Middleware and this module wrap every query; they're never the interesting frame
+PLUMBING_FILES = ('profiling.py', 'middleware.py', 'db_routing.py')
+# Quoted literals in EXPLAIN output
+LITERAL = re.compile(r"'(?:[^']|'')*'")
+
+registry.describe('study_profiles_total', 'Requests run under the sampling profiler.')
+registry.describe('study_slow_queries_total', 'Queries slower than PROFILING[\'SLOW_QUERY_MS\'], by view.')
+
+
+def profiling_settings():
+    return {**DEFAULTS, **getattr(settings, 'PROFILING', {})}
+
+
+# --- SAMPLING PROFILER ---
+
+def _frame_label(frame):
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(BASE_DIR):
+        filename = os.path.relpath(filename, BASE_DIR)
+    else:
+        filename = os.path.basename(filename)
+    return f'{code.co_qualname} ({filename}:{code.co_firstlineno})'.replace(';', ':')
+
+
+class SamplingProfiler:
+    """Samples one thread's stack from a background thread until stop()."""
+
+    def __init__(self, thread_id, interval, max_depth):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None and len(labels) < self.max_depth:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(labels))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        """The samples in collapsed-stack format, heaviest stacks first."""
+        return '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common()) + '\n'
+
+
+def store_profile(profiler, request, status_code):
+    """Keep a finished profile in the default cache; returns its id."""
+    options = profiling_settings()
+    profile_id = uuid.uuid4().hex[:12]
+    timings = current_timings()
+    summary = {
+        'id': profile_id,
+        'method': request.method,
+        'path': request.get_full_path()[:300],
+        'view': timings.view if timings is not None else None,
+        'status': status_code,
+        'duration_ms': round(profiler.elapsed * 1000, 1),
+        'samples': profiler.samples,
+        'interval_ms': profiler.interval * 1000,
+        'created_at': time.time(),
+        'pid': os.getpid(),
+    }
+    cache.set(PROFILE_KEY.format(profile_id), {**summary, 'collapsed': profiler.collapsed()}, options['PROFILE_TTL'])
+    index = [entry for entry in cache.get(PROFILE_INDEX_KEY, []) if cache.has_key(PROFILE_KEY.format(entry['id']))]
+    cache.set(PROFILE_INDEX_KEY, ([summary] + index)[:PROFILE_INDEX_SIZE], options['PROFILE_TTL'])
+    registry.increment('study_profiles_total')
+    return profile_id
+
+
+def get_profile(profile_id):
+    return cache.get(PROFILE_KEY.format(profile_id))
+
+
+def list_profiles():
+    return [entry for entry in cache.get(PROFILE_INDEX_KEY, []) if cache.has_key(PROFILE_KEY.format(entry['id']))]
+
+
+# --- SLOW QUERY LOG ---
+
+_slow_queries = deque(maxlen=DEFAULTS['SLOW_QUERY_LOG_SIZE'])
+_slow_lock = threading.Lock()
+_plans = OrderedDict()  # (alias, sql) -> EXPLAIN output, least recently used first
+_local = threading.local()
+
+
+def _call_site(depth):
+    """The innermost application frames (outside Django and other libraries) that led to the query."""
+    frames = [
+        frame for frame in traceback.extract_stack()[:-3]
+        if frame.filename.startswith(BASE_DIR)
+        and not any(marker in frame.filename for marker in LIBRARY_MARKERS)
+        and not frame.filename.endswith(PLUMBING_FILES)
+    ]
+    return [
+        f'{os.path.relpath(frame.filename, BASE_DIR)}:{frame.lineno} in {frame.name}: {frame.line}'
+        for frame in frames[-depth:]
+    ]
+
+
+def _explain(connection, sql, params):
+    key = (connection.alias, sql)
+    with _slow_lock:
+        if key in _plans:
+            _plans.move_to_end(key)
+            return _plans[key]
+    try:
+        prefix = connection.ops.explain_query_prefix()
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            plan = '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+        plan = LITERAL.sub("'?'", plan)
+    except Exception as e:
+        plan = f'EXPLAIN failed: {e}'
+    with _slow_lock:
+        _plans[key] = plan
+        while len(_plans) > PLAN_CACHE_SIZE:
+            _plans.popitem(last=False)
+    return plan
+
+
+def _param_types(params, many):
+    """The types of a query's parameters; the values stay out of the log."""
+    if many:
+        return f'<{len(params)} parameter sets>'
+    if isinstance(params, dict):
+        return {name: type(value).__name__ for name, value in params.items()}
+    return [type(value).__name__ for value in params or ()]
+
+
+def check_slow_query(connection, sql, params, many, seconds):
+    """Record the query in the slow-query log if it took longer than SLOW_QUERY_MS."""
+    options = profiling_settings()
+    if seconds * 1000 < options['SLOW_QUERY_MS'] or getattr(_local, 'explaining', False):
+        return
+    timings = current_timings()
+    view = timings.view if timings is not None else 'background'
+    entry = {
+        'at': time.time(),
+        'duration_ms': round(seconds * 1000, 2),
+        'alias': connection.alias,
+        'view': view,
+        'sql': sql,
+        'params': _param_types(params, many),
+        'call_site': _call_site(options['CALL_SITE_DEPTH']),
+        'plan': None,
+    }
+    explainable = not many and sql.lstrip()[:6].upper().startswith(('SELECT', 'WITH'))
+    if options['EXPLAIN'] and explainable and not connection.needs_rollback:
+        _local.explaining = True
+        try:
+            entry['plan'] = _explain(connection, sql, params)
+        finally:
+            _local.explaining = False
+    with _slow_lock:
+        if _slow_queries.maxlen != options['SLOW_QUERY_LOG_SIZE']:
+            _resize(options['SLOW_QUERY_LOG_SIZE'])
+        _slow_queries.append(entry)
+    registry.increment('study_slow_queries_total', {'view': view})
+
+
+def _resize(size):
+    global _slow_queries
+    _slow_queries = deque(_slow_queries, maxlen=size)
+
+
+def slow_queries():
+    """Logged slow queries in this process, newest first."""
+    with _slow_lock:
+        return list(reversed(_slow_queries))
+
+
+def clear_slow_queries():
+    with _slow_lock:
+        _slow_queries.clear()
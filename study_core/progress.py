@@ -0,0 +1,143 @@
+# study_core/progress.py
+"""
+Learner progress: quiz attempts and per-topic mastery aggregates.
+
+record_attempt() stores the attempt and its question results and then
+folds it into the user's TopicMastery row with a single UPDATE of F()
+expressions. New study plans bump the same row (see signals). Counts,
+the weighted recent score and the best score are therefore always
+current, and analysis() reads one row per topic instead of scanning
+attempt history.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import reviews
+from .models import QuestionResult, QuizAttempt, TopicMastery
+
+# Weight of the newest attempt in recent_score
+RECENT_WEIGHT = 0.4
+
+# recent_score bands used by analysis()
+WEAK_BELOW = 0.6
+STRONG_FROM = 0.85
+
+
+def topic_key(name):
+    """Case- and whitespace-insensitive grouping key for a free-text topic name."""
+    return ' '.join(str(name).split()).casefold()[:255]
+
+
+def _bump(user, name, first_values, **updates):
+    """
+    Apply `updates` (F() expressions) to the user's mastery row for `name`,
+    creating it with `first_values` if this is the first activity on it.
+    """
+    key = topic_key(name)
+    rows = TopicMastery.objects.filter(user=user, topic_key=key)
+    if rows.update(topic_name=name[:255], **updates):
+        return
+    try:
+        with transaction.atomic():
+            TopicMastery.objects.create(user=user, topic_key=key, topic_name=name[:255], **first_values)
+    except IntegrityError:  # created concurrently: apply the increment to that row
+        rows.update(topic_name=name[:255], **updates)
+
+
+def record_study_session(user, name, when=None):
+    when = when or timezone.now()
+    _bump(
+        user, name,
+        {'study_sessions': 1, 'last_studied_at': when},
+        study_sessions=F('study_sessions') + 1,
+        last_studied_at=Value(when),
+    )
+
+
+@transaction.atomic
+def record_attempt(user, name, results, session=None):
+    """
+    Store a quiz attempt. `results` is a list of dicts with question,
+    chosen_answer, correct_answer and is_correct. Also grades the
+    attempt's review items (see reviews.py). Returns the attempt.
+    """
+    now = timezone.now()
+    total = len(results)
+    correct = sum(1 for result in results if result['is_correct'])
+    attempt = QuizAttempt.objects.create(
+        user=user, topic_name=name[:255], topic_key=topic_key(name),
+        session=session, total=total, correct=correct,
+    )
+    QuestionResult.objects.bulk_create([
+        QuestionResult(attempt=attempt, position=position, **result)
+        for position, result in enumerate(results)
+    ])
+
+    score = correct / total if total else 0.0
+    _bump(
+        user, name,
+        {'attempts': 1, 'questions': total, 'correct': correct, 'recent_score': score,
+         'best_score': score, 'last_attempt_at': now},
+        attempts=F('attempts') + 1,
+        questions=F('questions') + total,
+        correct=F('correct') + correct,
+        # SET expressions see the old row: a first attempt takes the score as is
+        recent_score=Case(
+            When(attempts=0, then=Value(score)),
+            default=F('recent_score') * (1 - RECENT_WEIGHT) + score * RECENT_WEIGHT,
+        ),
+        best_score=Greatest(F('best_score'), Value(score)),
+        last_attempt_at=Value(now),
+    )
+    reviews.record_results(user, name, attempt.topic_key, results, score, now)
+    return attempt
+
+
+def _level(row):
+    if not row.attempts:
+        return 'unassessed'
+    if row.recent_score < WEAK_BELOW:
+        return 'weak'
+    if row.recent_score >= STRONG_FROM:
+        return 'strong'
+    return 'developing'
+
+
+def analysis(user, rows=None):
+    """Progress summary for `user`, built from their TopicMastery rows only."""
+    rows = list(TopicMastery.objects.filter(user=user)) if rows is None else rows
+    topics = []
+    for row in rows:
+        last_active = max(filter(None, (row.last_studied_at, row.last_attempt_at)), default=None)
+        topics.append({
+            'topic': row.topic_name,
+            'level': _level(row),
+            'study_sessions': row.study_sessions,
+            'attempts': row.attempts,
+            'questions': row.questions,
+            'accuracy': round(row.accuracy, 3) if row.accuracy is not None else None,
+            'recent_score': round(row.recent_score, 3),
+            'best_score': round(row.best_score, 3),
+            'last_active': last_active,
+        })
+    topics.sort(key=lambda topic: (topic['last_active'] is not None, topic['last_active'] or 0), reverse=True)
+
+    questions = sum(row.questions for row in rows)
+    return {
+        'topics': topics,
+        'totals': {
+            'topics': len(rows),
+            'study_sessions': sum(row.study_sessions for row in rows),
+            'attempts': sum(row.attempts for row in rows),
+            'questions': questions,
+            'accuracy': round(sum(row.correct for row in rows) / questions, 3) if questions else None,
+        },
+        'weak_topics': [topic['topic'] for topic in topics if topic['level'] == 'weak'],
+        'strong_topics': [topic['topic'] for topic in topics if topic['level'] == 'strong'],
+        'focus_topics': [
+            topic['topic'] for topic in sorted(topics, key=lambda t: t['study_sessions'] + t['attempts'], reverse=True)[:3]
+        ],
+        'weak_below': WEAK_BELOW,
+    }
@@ -0,0 +1,253 @@
+# study_core/prompt_budget.py
+"""
+Token budgets for prompts.
+
+Prompts used to be cut by characters (3000 for uploads) or not at all
+(tutor history), so input size, and with it latency and cost, swung
+widely. Each prompt kind now has a token budget (PROMPT_BUDGET['BUDGETS'])
+split between the fixed instructions, the user's own text, conversation
+history and document content:
+
+- count_tokens() is a local estimate, a little pessimistic, and free.
+  With PROVIDER_COUNT on, fit_prompt() also checks the finished prompt
+  with Gemini's count_tokens (results cached) and shrinks it again if
+  the estimate was short.
+- truncate() cuts text to a token count at a word boundary.
+- fit_history() keeps the newest turns that fit and folds older ones into
+  a one-line recap of what the student asked earlier.
+- fit_document() keeps the start and end of a long document plus evenly
+  spaced paragraphs from between them (gaps marked with [...]), so a
+  summary still covers the whole of it.
+"""
+import hashlib
+import math
+import re
+from functools import lru_cache
+
+from django.conf import settings
+
+from .instrumentation import registry
+
+DEFAULTS = {
+    'PROVIDER_COUNT': False,  # also check finished prompts with Gemini count_tokens
+    'CHARS_PER_TOKEN': 4,  # estimator: long words cost one token per this many chars
+    'BUDGETS': {
+        # tokens, instructions included
+        'tutor': {'total': 4000, 'question': 1000, 'history': 2500},
+        'summary': {'total': 12000},
+        'recommendations': {'total': 3000},
+    },
+}
+
+ELLIPSIS = '[...]'
+RECAP_TOKENS = 150  # upper bound for fit_history()'s recap of dropped turns
+_PIECES = re.compile(r'[A-Za-z0-9_]+|[^\sA-Za-z0-9_]')
+
+registry.describe('study_prompt_tokens_total', 'Estimated prompt input tokens, by prompt kind.')
+registry.describe('study_prompt_trimmed_total', 'Prompts trimmed to fit their token budget, by prompt kind and part.')
+
+
+def budget_settings():
+    options = {**DEFAULTS, **getattr(settings, 'PROMPT_BUDGET', {})}
+    options['BUDGETS'] = {
+        kind: {**DEFAULTS['BUDGETS'].get(kind, {}), **budget}
+        for kind, budget in {**DEFAULTS['BUDGETS'], **options['BUDGETS']}.items()
+    }
+    return options
+
+
+def budget_for(kind):
+    return budget_settings()['BUDGETS'][kind]
+
+
+# --- COUNTING ---
+
+def count_tokens(text, chars_per_token=None):
+    """
+    Local token estimate. Runs of letters/digits cost one token per
+    CHARS_PER_TOKEN characters (at least one). Every other non-space
+    character (punctuation, CJK, emoji) costs one token.
+    """
+    if not text:
+        return 0
+    chars_per_token = chars_per_token or getattr(settings, 'PROMPT_BUDGET', {}).get(
+        'CHARS_PER_TOKEN', DEFAULTS['CHARS_PER_TOKEN']
+    )
+    return sum(
+        math.ceil(len(piece) / chars_per_token) if piece[0].isalnum() or piece[0] == '_' else 1
+        for piece in _PIECES.findall(text)
+    )
+
+
+@lru_cache(maxsize=1024)
+def _provider_count(digest, text, model):
+    from .ai_client import get_client
+
+    return get_client().models.count_tokens(model=model, contents=text).total_tokens
+
+
+def provider_count(text, model):
+    """Gemini's own count for `text`, or None if it can't be had."""
+    try:
+        return _provider_count(hashlib.sha256(text.encode('utf-8')).hexdigest(), text, model)
+    except Exception as e:
+        print(f"count_tokens failed, using the local estimate: {e}")
+        return None
+
+
+def measure(prompt):
+    """Token count of a finished prompt: the provider's when enabled, else the estimate."""
+    tokens = None
+    if budget_settings()['PROVIDER_COUNT']:
+        from .views import GEMINI_MODEL  # views imports prompts, which import this module
+
+        tokens = provider_count(prompt, GEMINI_MODEL)
+    return count_tokens(prompt) if tokens is None else tokens
+
+
+def trimmed(kind, part):
+    registry.increment('study_prompt_trimmed_total', {'prompt': kind, 'part': part})
+
+
+def fit_prompt(kind, render, room):
+    """
+    Build a prompt with render(room), where `room` is the token allowance
+    for its flexible part (history or document). If the measured prompt
+    is still over the kind's total, rebuild once with proportionally
+    less room.
+    """
+    total = budget_for(kind)['total']
+    prompt = render(room)
+    tokens = measure(prompt)
+    if tokens > total and room > 0:
+        trimmed(kind, 'recount')
+        prompt = render(int(room * total / tokens * 0.95))
+        tokens = measure(prompt)
+    registry.increment('study_prompt_tokens_total', {'prompt': kind}, tokens)
+    return prompt
+
+
+# --- FITTING ---
+
+def truncate(text, max_tokens):
+    """Longest prefix of `text` within `max_tokens`, cut at a word boundary."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    suffix = count_tokens(' ' + ELLIPSIS)
+    if max_tokens < suffix:
+        return ''
+    # Every token covers at most a few characters plus the whitespace around it
+    low, high = 0, min(len(text), max_tokens * 16)
+    while low < high:  # binary search on the character length
+        mid = (low + high + 1) // 2
+        if count_tokens(text[:mid]) + suffix <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    cut = text[:low]
+    if ' ' in cut[len(cut) // 2:]:
+        cut = cut[:cut.rindex(' ')]
+    return cut.rstrip() + ' ' + ELLIPSIS
+
+
+def fit_history(history, max_tokens, line):
+    """
+    Render the newest turns of `history` that fit in `max_tokens`, using
+    line(turn) for each. Older turns become one recap line listing the
+    student's earlier questions. Returns (lines, dropped_count).
+    """
+    turns = [
+        {**turn, 'content': str(turn['content'])}
+        for turn in (history or []) if isinstance(turn, dict) and turn.get('content')
+    ]
+    rendered_cost = sum(count_tokens(line(turn)) for turn in turns)
+    # Room kept back for the recap when not every turn fits
+    recap_room = min(RECAP_TOKENS, max_tokens // 4) if rendered_cost > max_tokens else 0
+
+    kept = []
+    used = recap_room
+    for turn in reversed(turns):
+        rendered = line(turn)
+        cost = count_tokens(rendered)
+        if used + cost > max_tokens:
+            if not kept:
+                # The newest turn alone is too long: keep its start rather than no conversation
+                rendered = _truncate_turn(turn, max_tokens - used, line)
+                if rendered:
+                    kept.append(rendered)
+            break
+        kept.append(rendered)
+        used += cost
+    kept.reverse()
+
+    dropped = turns[:len(turns) - len(kept)]
+    if dropped:
+        asked = '; '.join(
+            turn['content'].strip().splitlines()[0][:80] for turn in dropped if turn.get('role') == 'user'
+        )
+        if asked:
+            recap = truncate(f"(Earlier, the student asked about: {asked})", recap_room)
+            if recap:
+                kept.insert(0, recap)
+    return kept, len(dropped)
+
+
+def _truncate_turn(turn, max_tokens, line):
+    """line(turn) with its content truncated so the whole line fits in `max_tokens`, or None."""
+    room = max_tokens - count_tokens(line({**turn, 'content': ''}))
+    while room > 0:
+        rendered = line({**turn, 'content': truncate(turn['content'], room)})
+        overshoot = count_tokens(rendered) - max_tokens
+        if overshoot <= 0:
+            return rendered
+        room -= overshoot
+    return None
+
+
+def fit_document(text, max_tokens):
+    """`text` if it fits; otherwise its opening and closing plus evenly spaced paragraphs between."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    paragraphs = [p.strip() for p in re.split(r'\n\s*\n', text) if p.strip()]
+    if len(paragraphs) < 3:
+        return truncate(text, max_tokens)
+
+    costs = [count_tokens(p) + 1 for p in paragraphs]
+    marker = count_tokens(ELLIPSIS) + 1
+    chosen = set()
+    used = marker  # the closing [...] when the last paragraph doesn't make it
+
+    # Opening paragraphs first (they usually set out what the document is about) ...
+    for index, cost in enumerate(costs):
+        if used + cost > max_tokens * 0.4:
+            break
+        chosen.add(index)
+        used += cost
+
+    # ... the closing one (conclusions) ...
+    last = len(paragraphs) - 1
+    if last not in chosen and used + costs[last] + marker <= max_tokens:
+        chosen.add(last)
+        used += costs[last] + marker
+
+    # ... then paragraphs spread evenly over the rest, as many as fit
+    rest = [index for index in range(len(paragraphs)) if index not in chosen]
+    for step in (8, 4, 2, 1):
+        for index in rest[::step]:
+            if index in chosen or used + costs[index] + marker > max_tokens:
+                continue
+            chosen.add(index)
+            used += costs[index] + marker
+
+    if not chosen:
+        return truncate(paragraphs[0], max_tokens)
+    parts = []
+    previous = -1
+    for index in sorted(chosen):
+        if index != previous + 1:
+            parts.append(ELLIPSIS)
+        parts.append(paragraphs[index])
+        previous = index
+    if previous != len(paragraphs) - 1:
+        parts.append(ELLIPSIS)
+    return '\n\n'.join(parts)
@@ -0,0 +1,228 @@
+# study_core/prompts.py
+"""Prompt builders for the Gemini-backed endpoints."""
+import json
+
+from .instrumentation import timed_phase
+from .prompt_budget import budget_for, count_tokens, fit_document, fit_history, fit_prompt, trimmed, truncate
+
+SUBJECT_PROMPTS = {
+    'math': "You are a mathematics tutor. Explain concepts clearly with examples.",
+    'science': "You are a science tutor. Focus on scientific principles and real-world applications.",
+    'physics': "You are a physics tutor. Explain physical concepts with practical examples.",
+    'chemistry': "You are a chemistry tutor. Focus on chemical reactions and properties.",
+    'biology': "You are a biology tutor. Explain biological concepts with diagrams in mind.",
+    'programming': "You are a programming tutor. Provide code examples and best practices.",
+    'general': "You are a general learning tutor. Adapt to the student's needs."
+}
+
+DIFFICULTY_LEVELS = {
+    'beginner': "Explain like I'm a beginner. Use simple language and basic examples.",
+    'intermediate': "Explain for an intermediate learner. Include some technical details.",
+    'advanced': "Explain for an advanced learner. Include technical details and advanced concepts."
+}
+
+
+@timed_phase('prompt')
+def build_study_plan_prompt(topic_name, duration, subtopics=None):
+    """Prompt for session_generation_view."""
+    # Build a more detailed prompt with subtopics
+    if subtopics:
+        prompt = f"""
+            Create a detailed study plan for: {topic_name}
+            Focus specifically on: {', '.join(subtopics)}
+            Duration: {duration}
+
+            Format the plan with:
+            1. Clear daily objectives
+            2. Specific learning activities
+            3. Time allocation for each subtopic
+            4. Review sessions
+
+            Make it practical and achievable.
+            """
+    else:
+        prompt = f"""
+            Create a detailed study plan for: {topic_name}
+            Duration: {duration}
+
+            Format with clear daily tasks, learning objectives, and time allocation.
+            """
+    return prompt
+
+
+@timed_phase('prompt')
+def build_notes_prompt(topic, subtopics=None):
+    """Prompt for study_tools_view."""
+    if subtopics:
+        return (
+            f"Generate comprehensive, well-structured study notes "
+            f"for the topic: '{topic}' focusing specifically on: {', '.join(subtopics)}.\n\n"
+            f"Format the notes with:\n"
+            f"- Clear headings and subheadings\n"
+            f"- Key concepts and definitions\n"
+            f"- Examples and practical applications\n"
+            f"- Summary points for review\n"
+            f"- Use markdown formatting for better readability"
+        )
+    return (
+        f"Generate concise, comprehensive, and well-structured study notes "
+        f"for the topic: '{topic}'. The notes should be formatted clearly "
+        f"using markdown for headings, bullet points, and key concepts."
+    )
+
+
+@timed_phase('prompt')
+def build_quiz_prompt(topic, subtopics=None):
+    """Prompt for quiz_generate_view."""
+    if subtopics:
+        return (
+            f"Create a multiple-choice quiz with 5 questions "
+            f"about: '{topic}' focusing specifically on: {', '.join(subtopics)}.\n\n"
+            f"Format requirements:\n"
+            f"- Each question should have 4 options (A, B, C, D)\n"
+            f"- Clearly indicate the correct answer on a new line after each question\n"
+            f"- Include a mix of conceptual and application questions\n"
+            f"- Make the questions challenging but fair\n"
+            f"- End with an answer key that explains why each answer is correct"
+        )
+    return (
+        f"Create a short, multiple-choice quiz with 5 questions "
+        f"about the topic: '{topic}'. For each question, provide 4 options "
+        f"and clearly indicate the correct answer on a new line after the question."
+    )
+
+
+SUMMARY_TEMPLATE = """
+        Please provide a comprehensive summary of the following content.
+        Focus on the key points, main ideas, and important details.
+
+        Content to summarize:
+        {content}
+
+        Provide a well-structured summary that captures the essence of the material.
+        """
+
+
+@timed_phase('prompt')
+def build_summary_prompt(text_content):
+    """Prompt for upload_summarize_view; long documents are sampled down to the token budget."""
+    room = budget_for('summary')['total'] - count_tokens(SUMMARY_TEMPLATE)
+
+    def render(room):
+        content = fit_document(text_content, room)
+        if content is not text_content:
+            trimmed('summary', 'document')
+        return SUMMARY_TEMPLATE.format(content=content)
+
+    return fit_prompt('summary', render, room)
+
+
+@timed_phase('prompt')
+def build_image_summary_prompt():
+    """Instruction sent alongside an uploaded image in upload_summarize_view."""
+    return """
+        The attached image is a photo or scan of study material (notes, a whiteboard,
+        a textbook page or a diagram). Read all of the text and figures in it, then
+        provide a comprehensive summary of the content.
+        Focus on the key points, main ideas, and important details.
+
+        Provide a well-structured summary that captures the essence of the material.
+        """
+
+
+def _history_line(msg):
+    role = "Student" if msg.get('role') == 'user' else "Tutor"
+    return f"{role}: {msg['content']}\n"
+
+
+@timed_phase('prompt')
+def build_tutor_prompt(user_message, subject='general', difficulty='beginner', conversation_history=None):
+    """Prompt for the tutor, with as many prior turns as the token budget allows."""
+    budget = budget_for('tutor')
+    question = truncate(user_message, budget['question'])
+    if question is not user_message:
+        trimmed('tutor', 'question')
+    prompt = f"""
+        {SUBJECT_PROMPTS.get(subject, SUBJECT_PROMPTS['general'])}
+        {DIFFICULTY_LEVELS.get(difficulty, DIFFICULTY_LEVELS['beginner'])}
+
+        Student's question: {question}
+
+        Please provide:
+        1. A clear, step-by-step explanation
+        2. Relevant examples if applicable
+        3. Key takeaways
+        4. Follow-up questions to check understanding
+
+        Keep the response engaging and educational.
+        """
+    if not conversation_history:
+        return fit_prompt('tutor', lambda room: prompt, 0)
+
+    # Add conversation context: newest turns first, older ones folded into a recap
+    def render(room):
+        lines, dropped = fit_history(conversation_history, room, _history_line)
+        if dropped:
+            trimmed('tutor', 'history')
+        if not lines:
+            return prompt
+        return prompt + "\n\nPrevious conversation context:\n" + "".join(
+            line if line.endswith("\n") else line + "\n" for line in lines
+        )
+
+    room = min(budget['history'], budget['total'] - count_tokens(prompt))
+    return fit_prompt('tutor', render, room)
+
+
+@timed_phase('prompt')
+def build_recommendations_prompt(prompt):
+    """ai_recommendations_view takes its prompt from the client; cap it at the budget."""
+    def render(room):
+        fitted = truncate(prompt, room)
+        if fitted is not prompt:
+            trimmed('recommendations', 'prompt')
+        return fitted
+
+    return fit_prompt('recommendations', render, budget_for('recommendations')['total'])
+
+
+PHRASING_FORMAT = """
+Rewrite the title, description and reason of each recommendation below so
+they read naturally and speak to this learner. Keep every item, in the same
+order, about the same topic, with the same priority. Do not add items.
+
+Return JSON with suggestions, gaps, nextSteps arrays.
+Each item should have: title, description, reason, and priority (high/medium/low).
+"""
+
+
+@timed_phase('prompt')
+def build_progress_recommendations_prompt(analysis, recommendations):
+    """Prompt asking Gemini to reword the local recommender's results (see views.local_recommendations)."""
+    totals = analysis['totals']
+    accuracy = f"{totals['accuracy']:.0%}" if totals['accuracy'] is not None else 'no quizzes yet'
+    header = (
+        "A learner's study progress:\n\n"
+        f"- Topics studied: {totals['topics']}\n"
+        f"- Study plans: {totals['study_sessions']}, quiz attempts: {totals['attempts']}, "
+        f"overall quiz accuracy: {accuracy}\n"
+        f"- Main focus: {', '.join(analysis['focus_topics']) or 'None yet'}\n"
+        f"- Weak topics (recent quiz score under {analysis['weak_below']:.0%}): "
+        f"{', '.join(analysis['weak_topics']) or 'None identified'}\n"
+        f"- Strong topics: {', '.join(analysis['strong_topics']) or 'None yet'}\n"
+        + PHRASING_FORMAT
+    )
+    items = '\n'.join(
+        f"{kind}: " + json.dumps(
+            [{key: item[key] for key in ('title', 'description', 'reason', 'priority')} for item in entries]
+        )
+        for kind, entries in recommendations.items()
+    )
+
+    def render(room):
+        fitted = truncate(items, room)
+        if fitted is not items:
+            trimmed('recommendations', 'items')
+        return header + '\n' + fitted
+
+    return fit_prompt('recommendations', render, max(budget_for('recommendations')['total'] - count_tokens(header), 0))
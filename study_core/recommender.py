@@ -0,0 +1,377 @@
+# study_core/recommender.py
+"""
+Local study recommendations, computed from progress data without Gemini.
+
+Most recommendations follow directly from a learner's own history:
+review what has gone quiet, shore up weak quiz topics, keep going with
+the current focus. Those come straight from their TopicMastery rows (see
+progress.py). "What to study next" uses item-item collaborative
+filtering over every learner's rows:
+
+- build_model() reads TopicMastery in user order, a chunk of users at a
+  time, into a dense users x topics block of interaction strengths
+  (log1p of study plans + quiz attempts) and accumulates the topic
+  co-occurrence matrix X^T X. Normalising it by the column norms gives
+  the cosine similarity between topics. Only the MAX_TOPICS most common
+  topics are modelled, so the matrix stays small (500 topics = 1 MB).
+- recommend() scores unseen topics as similarity @ user vector, where the
+  user vector decays with time since each topic was last active, so
+  recent interests count most. New or isolated users get popular topics.
+
+The model is built per process in a background thread, never inside a
+request: the first request to need it starts the build, and so does the
+first one after MODEL_TTL seconds. Until the first build finishes,
+nextSteps falls back to the generic cold-start items; during a rebuild
+requests keep using the previous model. Scoring one user takes well
+under a millisecond; the database read for their rows dominates.
+"""
+import copy
+import math
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count
+from django.utils import timezone
+
+from .instrumentation import registry
+from .models import TopicMastery
+from .progress import STRONG_FROM, WEAK_BELOW
+
+DEFAULTS = {
+    'MODEL_TTL': 15 * 60,  # seconds between similarity model rebuilds
+    'MAX_TOPICS': 500,  # most common topics kept in the model
+    'MIN_LEARNERS': 2,  # topics studied by fewer learners are never recommended
+    'CHUNK_USERS': 1000,  # users per block when accumulating X^T X
+    'HALF_LIFE_DAYS': 30,  # recency decay of the user's own interest vector
+    'REVIEW_AFTER_DAYS': 7,  # topics idle this long are suggested for review
+    'PHRASE_WITH_LLM': False,  # let Gemini reword the local results (clients can also ask per request)
+    'LIMITS': {'suggestions': 3, 'gaps': 2, 'nextSteps': 2},
+}
+
+# Shown for anonymous users and to pad lists with nothing personal to say
+GENERIC = {
+    "suggestions": [
+        {
+            "title": "Review Recent Topics",
+            "description": "Spend time reviewing what you've studied recently to reinforce your learning.",
+            "reason": "Regular review improves retention",
+            "priority": "high"
+        },
+        {
+            "title": "Practice Problems",
+            "description": "Solve practical exercises related to your subjects.",
+            "reason": "Practice builds skill and confidence",
+            "priority": "medium"
+        }
+    ],
+    "gaps": [
+        {
+            "title": "Identify Weak Areas",
+            "description": "Take time to identify topics you find challenging and focus on them.",
+            "reason": "Addressing weaknesses creates balanced knowledge",
+            "priority": "medium"
+        }
+    ],
+    "nextSteps": [
+        {
+            "title": "Set Learning Goals",
+            "description": "Define clear goals for what you want to achieve in your studies.",
+            "reason": "Goals provide direction and motivation",
+            "priority": "high"
+        }
+    ]
+}
+
+registry.describe('study_recommender_seconds', 'Local recommender timings, by stage (build or score).')
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def recommender_settings():
+    options = {**DEFAULTS, **getattr(settings, 'RECOMMENDER', {})}
+    options['LIMITS'] = {**DEFAULTS['LIMITS'], **options['LIMITS']}
+    return options
+
+
+def generic():
+    return copy.deepcopy(GENERIC)
+
+
+# --- MODEL ---
+
+class TopicModel:
+    """Topic-topic cosine similarity plus how many learners studied each topic."""
+
+    def __init__(self, keys, names, similarity, learners):
+        self.keys = keys
+        self.names = names
+        self.index = {key: i for i, key in enumerate(keys)}
+        self.similarity = similarity  # float32 (topics, topics), zero diagonal
+        self.learners = learners  # int array (topics,)
+        self.built_at = time.monotonic()
+
+
+def _strength(row):
+    return math.log1p(row.study_sessions + row.attempts)
+
+
+def build_model(options=None):
+    """Read every learner's TopicMastery rows and compute the topic similarity matrix."""
+    options = options or recommender_settings()
+    started = time.perf_counter()
+
+    common = (
+        TopicMastery.objects.values('topic_key')
+        .annotate(learners=Count('user_id'))
+        .order_by('-learners', 'topic_key')[:options['MAX_TOPICS']]
+    )
+    learners = {row['topic_key']: row['learners'] for row in common}
+    keys = sorted(learners)
+    index = {key: i for i, key in enumerate(keys)}
+    size = len(keys)
+    names = [''] * size
+    cooccurrence = np.zeros((size, size), dtype=np.float64)
+
+    chunk_users = options['CHUNK_USERS']
+    block = np.zeros((chunk_users, size), dtype=np.float32)
+    users = {}
+
+    def flush():
+        nonlocal cooccurrence
+        if users:
+            used = block[:len(users)]
+            cooccurrence += used.T @ used
+            used[:] = 0
+            users.clear()
+
+    rows = (
+        TopicMastery.objects.filter(topic_key__in=keys)
+        .order_by('user_id')
+        .values_list('user_id', 'topic_key', 'topic_name', 'study_sessions', 'attempts')
+    )
+    for user_id, key, name, study_sessions, attempts in rows.iterator(chunk_size=2000):
+        if user_id not in users:
+            if len(users) == chunk_users:
+                flush()
+            users[user_id] = len(users)
+        column = index[key]
+        block[users[user_id], column] = math.log1p(study_sessions + attempts)
+        names[column] = name
+    flush()
+
+    norms = np.sqrt(np.diag(cooccurrence))
+    norms[norms == 0] = 1.0
+    similarity = (cooccurrence / np.outer(norms, norms)).astype(np.float32)
+    np.fill_diagonal(similarity, 0.0)
+
+    model = TopicModel(keys, names, similarity, np.array([learners[key] for key in keys], dtype=np.int64))
+    registry.observe('study_recommender_seconds', time.perf_counter() - started, {'stage': 'build'})
+    return model
+
+
+def rebuild(options=None):
+    """Build a fresh model in this thread and make it the process's current one."""
+    global _model
+    _model = build_model(options)
+    return _model
+
+
+def _rebuild_in_background(options):
+    try:
+        rebuild(options)
+    except Exception as e:
+        print(f"Recommender model build failed: {e}")
+    finally:
+        _model_lock.release()
+        connections.close_all()
+
+
+def get_model(options=None):
+    """
+    The process's current model, or None until the first build finishes.
+    A missing or stale model starts one background rebuild and the caller
+    carries on with what there is.
+    """
+    options = options or recommender_settings()
+    model = _model
+    if model is not None and time.monotonic() - model.built_at < options['MODEL_TTL']:
+        return model
+    if _model_lock.acquire(blocking=False):
+        thread = threading.Thread(
+            target=_rebuild_in_background, args=(options,), name='recommender-build', daemon=True
+        )
+        try:
+            thread.start()
+        except Exception:
+            _model_lock.release()
+            raise
+    return model
+
+
+def invalidate():
+    global _model
+    _model = None
+
+
+# --- SCORING ---
+
+def _days_since(when, now):
+    return (now - when).total_seconds() / 86400 if when else None
+
+
+def _last_active(row):
+    return max(filter(None, (row.last_studied_at, row.last_attempt_at)), default=None)
+
+
+def _item(title, description, reason, priority, topic=None):
+    item = {"title": title, "description": description, "reason": reason, "priority": priority}
+    if topic:
+        item["topic"] = topic
+    return item
+
+
+def _next_topics(rows, model, options, now):
+    """Ranked (topic name, reason) pairs for topics this user hasn't touched yet."""
+    if model is None or not model.keys:
+        return []
+    interest = np.zeros(len(model.keys), dtype=np.float32)
+    for row in rows:
+        column = model.index.get(row.topic_key)
+        if column is None:
+            continue
+        idle = _days_since(_last_active(row), now) or 0.0
+        interest[column] = _strength(row) * 0.5 ** (idle / options['HALF_LIFE_DAYS'])
+
+    eligible = model.learners >= options['MIN_LEARNERS']
+    eligible[interest > 0] = False
+    seen = {row.topic_key for row in rows}
+    eligible &= np.array([key not in seen for key in model.keys])
+
+    limit = options['LIMITS']['nextSteps']
+    picks = []
+    if interest.any():
+        scores = model.similarity @ interest
+        scores[~eligible] = 0.0
+        for column in np.argsort(-scores, kind='stable')[:limit]:
+            if scores[column] <= 0:
+                break
+            # The user's topic that contributes most to this score
+            because = int(np.argmax(model.similarity[column] * interest))
+            picks.append((
+                model.names[column],
+                f"Learners who study {model.names[because]} often study this too",
+            ))
+
+    if len(picks) < limit:  # cold start: popular topics they haven't tried
+        chosen = {name for name, _ in picks}
+        for column in np.argsort(-np.where(eligible, model.learners, 0), kind='stable'):
+            if len(picks) == limit or not eligible[column]:
+                break
+            if model.names[column] not in chosen:
+                picks.append((model.names[column], f"Popular with other learners ({model.learners[column]} studying it)"))
+    return picks
+
+
+def recommend(user, rows=None, options=None):
+    """Personalised suggestions, gaps and nextSteps for `user` (same shape as GENERIC)."""
+    options = options or recommender_settings()
+    rows = list(TopicMastery.objects.filter(user=user)) if rows is None else rows
+    model = get_model(options)
+
+    started = time.perf_counter()
+    now = timezone.now()
+    limits = options['LIMITS']
+    recent_first = sorted(
+        rows, key=lambda row: (_last_active(row) is not None, _last_active(row) or now), reverse=True
+    )
+
+    gaps = []
+    for row in sorted((row for row in rows if row.attempts and row.recent_score < WEAK_BELOW),
+                      key=lambda row: row.recent_score):
+        gaps.append(_item(
+            f"Strengthen {row.topic_name}",
+            f"Go back over {row.topic_name}, then retake a short quiz to check it has stuck.",
+            f"Your recent quiz score here is {row.recent_score:.0%}",
+            'high' if row.recent_score < WEAK_BELOW * 2 / 3 else 'medium',
+            row.topic_name,
+        ))
+    for row in recent_first:
+        if row.study_sessions and not row.attempts:
+            gaps.append(_item(
+                f"Quiz yourself on {row.topic_name}",
+                f"You've studied {row.topic_name} but haven't tested it yet. A quick quiz shows what needs review.",
+                "Retrieval practice reveals gaps that re-reading hides",
+                'medium',
+                row.topic_name,
+            ))
+
+    suggestions = []
+    idle_rows = [
+        row for row in rows
+        if (_days_since(_last_active(row), now) or 0) >= options['REVIEW_AFTER_DAYS']
+    ]
+    for row in sorted(idle_rows, key=_strength, reverse=True)[:2]:
+        days = int(_days_since(_last_active(row), now))
+        suggestions.append(_item(
+            f"Revisit {row.topic_name}",
+            f"Spend a short session reviewing {row.topic_name} before it fades.",
+            f"Last studied {days} days ago",
+            'high' if row.attempts and row.recent_score < STRONG_FROM else 'medium',
+            row.topic_name,
+        ))
+    for row in recent_first:
+        if row in idle_rows:
+            continue
+        if row.attempts and row.recent_score >= STRONG_FROM:
+            suggestions.append(_item(
+                f"Go deeper in {row.topic_name}",
+                f"You're scoring well on {row.topic_name}; try harder problems or an advanced subtopic.",
+                f"Recent quiz score {row.recent_score:.0%}",
+                'low',
+                row.topic_name,
+            ))
+        else:
+            suggestions.append(_item(
+                f"Keep going with {row.topic_name}",
+                f"Continue your current work on {row.topic_name} while it's fresh.",
+                "Consistent focus leads to mastery",
+                'high' if not suggestions else 'medium',
+                row.topic_name,
+            ))
+
+    next_steps = [
+        _item(f"Explore {name}", f"Start a study plan for {name}.", reason, 'high' if i == 0 else 'medium', name)
+        for i, (name, reason) in enumerate(_next_topics(rows, model, options, now))
+    ]
+
+    recommendations = {}
+    fallback = generic()
+    for kind, items in (('suggestions', suggestions), ('gaps', gaps), ('nextSteps', next_steps)):
+        picked = []
+        for item in items:  # one item per topic per list
+            if item.get('topic') not in {other.get('topic') for other in picked}:
+                picked.append(item)
+        recommendations[kind] = (picked or fallback[kind])[:limits[kind]]
+    registry.observe('study_recommender_seconds', time.perf_counter() - started, {'stage': 'score'})
+    return recommendations
+
+
+def merge_phrasing(local, phrased):
+    """Take reworded title/description/reason from `phrased`, keeping local items, order and priorities."""
+    merged = copy.deepcopy(local)
+    if not isinstance(phrased, dict):
+        return merged
+    for kind, items in merged.items():
+        rewritten = phrased.get(kind)
+        if not isinstance(rewritten, list):
+            continue
+        for item, new in zip(items, rewritten):
+            if isinstance(new, dict):
+                for field in ('title', 'description', 'reason'):
+                    if isinstance(new.get(field), str) and new[field].strip():
+                        item[field] = new[field].strip()
+    return merged
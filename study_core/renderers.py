@@ -0,0 +1,60 @@
+# study_core/renderers.py
+"""
+orjson-backed JSON renderer and parser for DRF.
+
+Output matches rest_framework's JSONRenderer for everything the API
+returns: aware datetimes end in 'Z', Decimals/lazy strings/querysets
+fall back to DRF's own JSONEncoder.default, and an Accept header with
+"indent=N" still pretty-prints (orjson only supports 2 spaces).
+"""
+import orjson
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+
+from .instrumentation import phase
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+_fallback = JSONEncoder()
+
+
+def _default(obj):
+    return _fallback.default(obj)
+
+
+def dumps(data, indent=False):
+    options = ORJSON_OPTIONS | orjson.OPT_INDENT_2 if indent else ORJSON_OPTIONS
+    return orjson.dumps(data, default=_default, option=options)
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = 'application/json'
+    format = 'json'
+    charset = None  # orjson always emits UTF-8
+
+    def get_indent(self, accepted_media_type, renderer_context):
+        for param in (accepted_media_type or '').split(';')[1:]:
+            key, _, value = param.strip().partition('=')
+            if key == 'indent' and value.isdigit():
+                return int(value) > 0
+        return bool(renderer_context.get('indent'))
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        with phase('render'):
+            return dumps(data, indent=self.get_indent(accepted_media_type, renderer_context))
+
+
+class ORJSONParser(BaseParser):
+    media_type = 'application/json'
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
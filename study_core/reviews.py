@@ -0,0 +1,216 @@
+# study_core/reviews.py
+"""
+Spaced-repetition review scheduling (SM-2).
+
+Every answered quiz question, and the quiz's topic as a whole, becomes a
+ReviewItem for the user. Each result is a review graded 0-5 (a correct
+answer is 4, a wrong one 1; a topic is graded from the quiz score), and
+grading moves the item's SM-2 state on:
+
+- grade < 3: the item lapses; repetitions restart and it comes back after
+  FIRST_INTERVAL_DAYS.
+- otherwise: the interval goes FIRST_INTERVAL_DAYS, SECOND_INTERVAL_DAYS,
+  then previous * ease, up to MAX_INTERVAL_DAYS.
+- ease moves with the grade and never drops below MIN_EASE.
+
+interval_days keeps the SM-2 interval. The due date applies the
+configured INTERVAL_MODIFIER, MAX_INTERVAL_DAYS and a small fixed
+per-item fuzz (so items learned together don't all come due on the same
+day). Changing those settings and running `manage.py reschedule_reviews`
+recomputes every item's interval, ease and due date from its stored
+state (repetitions, interval, ease), in batches with bulk_update.
+
+due() is one range scan of the (user, due_at) index with a LIMIT, so its
+cost doesn't grow with the number of items a user has.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .instrumentation import registry
+from .models import ReviewItem
+
+DEFAULTS = {
+    'INTERVAL_MODIFIER': 1.0,  # scales every interval; < 1 reviews more often
+    'MAX_INTERVAL_DAYS': 365,
+    'FIRST_INTERVAL_DAYS': 1.0,  # after the first passing review, and after a lapse
+    'SECOND_INTERVAL_DAYS': 6.0,
+    'MIN_EASE': 1.3,
+    'FUZZ': 0.05,  # +/- fraction of the interval, fixed per item
+    'DUE_LIMIT': 50,  # default page size of the due queue
+    'MAX_DUE_LIMIT': 200,
+    'CORRECT_GRADE': 4,
+    'WRONG_GRADE': 1,
+}
+
+PASSING_GRADE = 3
+MAX_GRADE = 5
+UPDATE_BATCH = 500  # rows per bulk_update statement in reschedule()
+
+registry.describe('study_reviews_total', 'Spaced-repetition reviews recorded, by item kind and outcome.')
+
+
+def review_settings():
+    return {**DEFAULTS, **getattr(settings, 'REVIEWS', {})}
+
+
+def item_key(kind, topic_key, prompt=''):
+    normalised = ' '.join(str(prompt).split()).casefold()
+    return hashlib.sha256(f'{kind}\x1f{topic_key}\x1f{normalised}'.encode('utf-8')).hexdigest()
+
+
+# --- SCHEDULING ---
+
+def _fuzz(item, options):
+    """A fixed factor in [1 - FUZZ, 1 + FUZZ] derived from the item key."""
+    unit = int(item.item_key[:8], 16) / 0xFFFFFFFF
+    return 1 + options['FUZZ'] * (2 * unit - 1)
+
+
+def bounded_interval(item, options):
+    """The SM-2 interval for `item`'s repetitions under the current settings."""
+    if item.repetitions <= 1:  # first pass, or lapsed
+        return options['FIRST_INTERVAL_DAYS']
+    if item.repetitions == 2:
+        return options['SECOND_INTERVAL_DAYS']
+    return min(max(item.interval_days, options['SECOND_INTERVAL_DAYS']), options['MAX_INTERVAL_DAYS'])
+
+
+def due_at_for(item, options):
+    """When `item` is next due, from its stored state and the current settings."""
+    days = item.interval_days * options['INTERVAL_MODIFIER']
+    if item.repetitions:  # lapsed items come back after the plain one-day interval
+        days = min(days * _fuzz(item, options), options['MAX_INTERVAL_DAYS'])
+    return item.last_reviewed_at + timedelta(days=days)
+
+
+def apply_grade(item, grade, now, options):
+    """Move `item`'s SM-2 state on by one review graded 0-5 (no save)."""
+    grade = max(0, min(MAX_GRADE, int(grade)))
+    if grade < PASSING_GRADE:
+        item.repetitions = 0
+        item.lapses += 1
+    else:
+        item.repetitions += 1
+        if item.repetitions > 2:
+            item.interval_days = round(item.interval_days * item.ease, 2)
+    item.interval_days = bounded_interval(item, options)
+    miss = MAX_GRADE - grade
+    item.ease = max(options['MIN_EASE'], item.ease + 0.1 - miss * (0.08 + miss * 0.02))
+    item.last_grade = grade
+    item.last_reviewed_at = now
+    item.due_at = due_at_for(item, options)
+    registry.increment('study_reviews_total', {'kind': item.kind, 'outcome': 'pass' if grade >= PASSING_GRADE else 'lapse'})
+    return item
+
+
+def grade(item, value):
+    """Record a review of one item from the review queue."""
+    apply_grade(item, value, timezone.now(), review_settings())
+    item.save(update_fields=[
+        'repetitions', 'interval_days', 'ease', 'lapses', 'last_grade', 'last_reviewed_at', 'due_at',
+    ])
+    return item
+
+
+@transaction.atomic
+def record_results(user, topic_name, topic_key, results, score, now=None):
+    """
+    Grade the review items behind a quiz attempt: one per question plus
+    one for the topic. Existing items are loaded in one query and written
+    back with bulk_update; new ones go in with bulk_create.
+    """
+    options = review_settings()
+    now = now or timezone.now()
+    graded = {
+        item_key(ReviewItem.TOPIC, topic_key): (
+            ReviewItem.TOPIC, topic_name[:255], '', round(score * MAX_GRADE),
+        ),
+    }
+    for result in results:
+        graded[item_key(ReviewItem.QUESTION, topic_key, result['question'])] = (
+            ReviewItem.QUESTION, result['question'], result.get('correct_answer', '')[:500],
+            options['CORRECT_GRADE'] if result['is_correct'] else options['WRONG_GRADE'],
+        )
+
+    existing = {
+        item.item_key: item
+        for item in ReviewItem.objects.filter(user=user, item_key__in=list(graded))
+    }
+    created, updated = [], []
+    for key, (kind, prompt, answer, value) in graded.items():
+        item = existing.get(key)
+        if item is None:
+            item = ReviewItem(
+                user=user, kind=kind, item_key=key, topic_key=topic_key,
+                topic_name=topic_name[:255], prompt=prompt, answer=answer,
+            )
+            created.append(item)
+        else:
+            item.topic_name = topic_name[:255]
+            if answer:
+                item.answer = answer
+            updated.append(item)
+        apply_grade(item, value, now, options)
+
+    ReviewItem.objects.bulk_create(created, ignore_conflicts=True)
+    ReviewItem.objects.bulk_update(updated, [
+        'topic_name', 'answer', 'repetitions', 'interval_days', 'ease', 'lapses',
+        'last_grade', 'last_reviewed_at', 'due_at',
+    ])
+    return len(created), len(updated)
+
+
+# --- QUEUE ---
+
+def due(user, limit=None, now=None):
+    """
+    Up to `limit` items due at or before `now`, most overdue first, and
+    whether more are waiting. One query on the (user, due_at) index.
+    """
+    options = review_settings()
+    limit = max(1, min(limit or options['DUE_LIMIT'], options['MAX_DUE_LIMIT']))
+    items = list(
+        ReviewItem.objects
+        .filter(user=user, due_at__lte=now or timezone.now())
+        .order_by('due_at')[:limit + 1]
+    )
+    return items[:limit], len(items) > limit
+
+
+def reschedule(batch_size=2000, user=None, dry_run=False):
+    """
+    Recompute every item's interval, ease and due date from its review
+    state under the current settings, walking the table in primary-key
+    order and writing only the rows that changed with bulk_update.
+    Returns (scanned, changed).
+    """
+    options = review_settings()
+    items = ReviewItem.objects.filter(last_reviewed_at__isnull=False)
+    if user is not None:
+        items = items.filter(user=user)
+    fields = ('id', 'item_key', 'repetitions', 'interval_days', 'ease', 'last_reviewed_at', 'due_at')
+
+    scanned = changed = 0
+    last_pk = 0
+    while True:
+        batch = list(items.filter(pk__gt=last_pk).order_by('pk').only(*fields)[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        scanned += len(batch)
+        stale = []
+        for item in batch:
+            before = (item.interval_days, item.ease, item.due_at)
+            item.interval_days = bounded_interval(item, options)
+            item.ease = max(options['MIN_EASE'], item.ease)
+            item.due_at = due_at_for(item, options)
+            if (item.interval_days, item.ease, item.due_at) != before:
+                stale.append(item)
+        changed += len(stale)
+        if stale and not dry_run:
+            ReviewItem.objects.bulk_update(stale, ['interval_days', 'ease', 'due_at'], batch_size=UPDATE_BATCH)
+    return scanned, changed
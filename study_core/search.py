@@ -0,0 +1,225 @@
+# study_core/search.py
+"""
+Full-text search over Topics, Courses and saved StudySessions.
+
+Searchable text lives in SearchDocument rows (kept in sync by
+study_core.signals). Each database gets its own backend:
+
+- SQLite: FTS5 external-content table with bm25() ranking and snippet().
+- PostgreSQL: GIN expression index over a weighted tsvector, ranked with
+  ts_rank_cd() and highlighted with ts_headline().
+- Anything else: icontains fallback so the endpoint still works.
+"""
+import re
+
+from django.db import connections, router
+from django.db.models import Q
+from django.utils import timezone
+
+from .instrumentation import phase
+from .models import Course, SearchDocument, StudySession, Topic
+
+FTS_TABLE = 'study_core_searchdocument_fts'
+
+# Must match the expression indexed in migration 0005
+POSTGRES_DOCUMENT_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(d.title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(d.body, '')), 'B')"
+)
+
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_STOP = '</mark>'
+
+MODEL_KINDS = {
+    Topic: SearchDocument.KIND_TOPIC,
+    Course: SearchDocument.KIND_COURSE,
+    StudySession: SearchDocument.KIND_SESSION,
+}
+
+
+# --- DOCUMENT BUILDING / INDEX MAINTENANCE ---
+
+def build_document(instance):
+    """Return an unsaved SearchDocument for a Topic, Course or StudySession."""
+    kind = MODEL_KINDS[type(instance)]
+    if kind == SearchDocument.KIND_TOPIC:
+        return SearchDocument(
+            kind=kind, object_id=instance.pk, title=instance.name,
+            body=instance.description, is_public=instance.is_active,
+        )
+    if kind == SearchDocument.KIND_COURSE:
+        topic_names = ', '.join(topic.name for topic in instance.topics.all())
+        return SearchDocument(
+            kind=kind, object_id=instance.pk, title=instance.name,
+            body=f'{instance.description}\n{topic_names}'.strip(),
+            is_public=instance.is_published,
+        )
+    return SearchDocument(
+        kind=kind, object_id=instance.pk, title=instance.topic_name,
+        body=instance.generated_content, owner_id=instance.user_id, is_public=False,
+    )
+
+
+def index_objects(instances):
+    """Insert or refresh search documents for the given instances in one query."""
+    documents = [build_document(instance) for instance in instances]
+    if not documents:
+        return
+    now = timezone.now()
+    for document in documents:
+        document.updated_at = now
+    SearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=['kind', 'object_id'],
+        update_fields=['title', 'body', 'owner', 'is_public', 'updated_at'],
+    )
+
+
+def remove_objects(model, pks):
+    SearchDocument.objects.filter(kind=MODEL_KINDS[model], object_id__in=list(pks)).delete()
+
+
+# --- QUERY BACKENDS ---
+
+class SearchBackend:
+    """Base backend: subclasses implement search() for one database vendor."""
+
+    def __init__(self, using='default'):
+        self.using = using
+
+    def search(self, query, user=None, kinds=None, limit=20):
+        raise NotImplementedError
+
+    @staticmethod
+    def _visibility(user):
+        user_id = user.pk if user is not None and user.is_authenticated else None
+        is_staff = bool(user is not None and user.is_staff)
+        return user_id, is_staff
+
+    def _run(self, sql, params):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    @staticmethod
+    def _rows(rows):
+        return [
+            {'kind': kind, 'id': object_id, 'title': title, 'snippet': snippet, 'score': round(score, 4)}
+            for kind, object_id, title, snippet, score in rows
+        ]
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """FTS5 MATCH with bm25 ranking (title weighted 10x body)."""
+
+    @staticmethod
+    def match_expression(query):
+        terms = re.findall(r'\w+', query)
+        if not terms:
+            return None
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += '*'  # prefix-match the word being typed
+        return ' '.join(quoted)
+
+    def search(self, query, user=None, kinds=None, limit=20):
+        expression = self.match_expression(query)
+        if expression is None:
+            return []
+        user_id, is_staff = self._visibility(user)
+        sql = f"""
+            SELECT d.kind, d.object_id, d.title,
+                   snippet({FTS_TABLE}, 1, %s, %s, '…', 16),
+                   -bm25({FTS_TABLE}, 10.0, 1.0) AS score
+            FROM {FTS_TABLE}
+            JOIN study_core_searchdocument d ON d.id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH %s
+              AND (d.is_public OR d.owner_id = %s OR (d.owner_id IS NULL AND %s))
+        """
+        params = [HIGHLIGHT_START, HIGHLIGHT_STOP, expression, user_id, is_staff]
+        if kinds:
+            sql += f" AND d.kind IN ({', '.join(['%s'] * len(kinds))})"
+            params += list(kinds)
+        sql += " ORDER BY score DESC LIMIT %s"
+        params.append(limit)
+        return self._rows(self._run(sql, params))
+
+
+class PostgresSearchBackend(SearchBackend):
+    """tsvector/tsquery search served by the GIN expression index."""
+
+    def search(self, query, user=None, kinds=None, limit=20):
+        if not query.strip():
+            return []
+        user_id, is_staff = self._visibility(user)
+        sql = f"""
+            SELECT d.kind, d.object_id, d.title,
+                   ts_headline('english', d.body, q,
+                               'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxFragments=1, MaxWords=24, MinWords=8'),
+                   ts_rank_cd({POSTGRES_DOCUMENT_VECTOR}, q) AS score
+            FROM study_core_searchdocument d, websearch_to_tsquery('english', %s) q
+            WHERE {POSTGRES_DOCUMENT_VECTOR} @@ q
+              AND (d.is_public OR d.owner_id = %s OR (d.owner_id IS NULL AND %s))
+        """
+        params = [query, user_id, is_staff]
+        if kinds:
+            sql += f" AND d.kind IN ({', '.join(['%s'] * len(kinds))})"
+            params += list(kinds)
+        sql += " ORDER BY score DESC LIMIT %s"
+        params.append(limit)
+        return self._rows(self._run(sql, params))
+
+
+class BasicSearchBackend(SearchBackend):
+    """icontains scan; only used on databases without a full-text backend."""
+
+    def search(self, query, user=None, kinds=None, limit=20):
+        terms = query.split()
+        if not terms:
+            return []
+        user_id, is_staff = self._visibility(user)
+        visible = Q(is_public=True)
+        if user_id is not None:
+            visible |= Q(owner_id=user_id)
+        if is_staff:
+            visible |= Q(owner__isnull=True)
+        documents = SearchDocument.objects.using(self.using).filter(visible)
+        for term in terms:
+            documents = documents.filter(Q(title__icontains=term) | Q(body__icontains=term))
+        if kinds:
+            documents = documents.filter(kind__in=kinds)
+        rows = documents.values_list('kind', 'object_id', 'title', 'body')[:limit]
+        return [
+            {'kind': kind, 'id': object_id, 'title': title, 'snippet': body[:160], 'score': 0.0}
+            for kind, object_id, title, body in rows
+        ]
+
+
+_backends = {}
+
+
+def _fts_table_exists(connection):
+    with connection.cursor() as cursor:
+        return FTS_TABLE in connection.introspection.table_names(cursor)
+
+
+def get_backend(using='default'):
+    """Pick (and memoize) the search backend for a database alias."""
+    backend = _backends.get(using)
+    if backend is None:
+        connection = connections[using]
+        if connection.vendor == 'postgresql':
+            backend = PostgresSearchBackend(using)
+        elif connection.vendor == 'sqlite' and _fts_table_exists(connection):
+            backend = SQLiteFTSBackend(using)
+        else:
+            backend = BasicSearchBackend(using)
+        _backends[using] = backend
+    return backend
+
+
+def search(query, user=None, kinds=None, limit=20, using=None):
+    # Raw SQL bypasses the routers, so ask them where SearchDocument reads go
+    using = using or router.db_for_read(SearchDocument)
+    with phase('search'):
+        return get_backend(using).search(query, user=user, kinds=kinds, limit=limit)
@@ -1,7 +1,21 @@
 # study_core/serializers.py - FULLY UPDATED
 from rest_framework import serializers
-from .models import StudySession, StudyTopic, Topic, Course
+from .models import ReviewItem, StudySession, StudyTopic, Topic, Course
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+from . import search
+from .instrumentation import phase
+
+
+class TimedListSerializer(serializers.ListSerializer):
+    """Attributes list serialization time to the request's 'serialize' phase."""
+
+    def to_representation(self, data):
+        with phase('serialize'):
+            return super().to_representation(data)
+
 
 class StudyTopicSerializer(serializers.ModelSerializer):
     class Meta:
@@ -32,6 +46,7 @@ class TopicSerializer(serializers.ModelSerializer):
         model = Topic
         fields = ('id', 'name', 'description', 'is_active', 'created_at', 'updated_at')
         read_only_fields = ('created_at', 'updated_at')
+        list_serializer_class = TimedListSerializer
 
 
 class CourseSerializer(serializers.ModelSerializer):
@@ -54,6 +69,7 @@ class CourseSerializer(serializers.ModelSerializer):
             'duration_hours', 'is_published', 'created_at', 'updated_at'
         ]
         read_only_fields = ['slug', 'created_at', 'updated_at']
+        list_serializer_class = TimedListSerializer
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -65,4 +81,286 @@ class UserSerializer(serializers.ModelSerializer):
             'id', 'username', 'email', 'first_name', 'last_name',
             'is_staff', 'is_active', 'is_superuser', 'date_joined', 'last_login'
         ]
-        read_only_fields = ['id', 'date_joined', 'last_login']
\ No newline at end of file
+        read_only_fields = ['id', 'date_joined', 'last_login']
+        list_serializer_class = TimedListSerializer
+
+# --- READ-ONLY FAST PATH (LIST ENDPOINTS) ---
+
+class ValuesListSerializer:
+    """
+    Read-only list serialization straight from values_list() tuples.
+
+    Produces the same dicts as the matching ModelSerializer without
+    building model instances or per-row serializer fields. Datetimes are
+    left as aware UTC datetimes for the renderer, which formats them the
+    way DRF's DateTimeField does with TIME_ZONE = 'UTC'.
+    """
+    fields = ()
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    def rows(self, queryset):
+        fields = self.fields
+        return [dict(zip(fields, values)) for values in queryset.values_list(*fields)]
+
+    @property
+    def data(self):
+        with phase('serialize'):
+            return self.rows(self.queryset.prefetch_related(None))
+
+
+class TopicValuesSerializer(ValuesListSerializer):
+    fields = TopicSerializer.Meta.fields
+
+
+class CourseValuesSerializer(ValuesListSerializer):
+    """Courses plus nested topics, fetched with one extra query over the through table."""
+    fields = tuple(name for name in CourseSerializer.Meta.fields if name != 'topic_ids')
+
+    def rows(self, queryset):
+        split = self.fields.index('topics')
+        columns = self.fields[:split] + self.fields[split + 1:]
+        courses = {}
+        for values in queryset.values_list(*columns):
+            courses[values[0]] = dict(zip(self.fields, (*values[:split], [], *values[split:])))
+        if not courses:
+            return []
+
+        topic_fields = TopicValuesSerializer.fields
+        links = (
+            Course.topics.through.objects
+            .filter(course_id__in=list(courses))
+            .order_by(*[f'topic__{name}' for name in Topic._meta.ordering])
+            .values_list('course_id', *[f'topic__{name}' for name in topic_fields])
+        )
+        for course_id, *values in links:
+            courses[course_id]['topics'].append(dict(zip(topic_fields, values)))
+        return list(courses.values())
+
+
+class UserValuesSerializer(ValuesListSerializer):
+    fields = tuple(UserSerializer.Meta.fields)
+
+
+# --- BULK SERIALIZERS (ADMIN IMPORT) ---
+
+BULK_MAX_ITEMS = 1000
+BULK_BATCH_SIZE = 500
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    Validates a whole array in one pass and persists it with
+    bulk_create / bulk_update inside one transaction.
+
+    For updates `instance` is an {id: object} map (from in_bulk) and
+    every item must carry an id. Cross-item and database checks (unique
+    names, referenced ids) run once per request with IN queries instead
+    of once per item.
+    """
+
+    def to_internal_value(self, data):
+        # Cross-item checks run here rather than in validate() so errors keep
+        # the same per-item list shape as field errors
+        items = super().to_internal_value(data)
+        errors = [{} for _ in items]
+        if self.instance is not None:
+            for index, item in enumerate(items):
+                if item.get('id') not in self.instance:
+                    errors[index]['id'] = ['Object not found.']
+        self.validate_items(items, errors)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return items
+
+    def validate_items(self, items, errors):
+        self.check_unique(items, errors, 'name')
+
+    def check_unique(self, items, errors, field, values=None):
+        """Flag duplicates within the request and clashes with other rows, in one query."""
+        model = self.child.Meta.model
+        values = values or {index: item[field] for index, item in enumerate(items) if field in item}
+        first_seen = {}
+        for index, value in values.items():
+            if value in first_seen:
+                errors[index][field] = [f'Duplicate {field} in this request.']
+            else:
+                first_seen[value] = index
+        existing = model.objects.filter(**{f'{field}__in': list(first_seen)}).values_list(field, 'pk')
+        for value, pk in existing:
+            index = first_seen[value]
+            if items[index].get('id') != pk:
+                errors[index][field] = [f'{model._meta.verbose_name} with this {field} already exists.']
+
+    # --- persistence ---
+
+    def build(self, item):
+        return self.child.Meta.model(**{k: v for k, v in item.items() if k in self.model_fields()})
+
+    def model_fields(self):
+        model = self.child.Meta.model
+        return {f.name for f in model._meta.concrete_fields if not f.primary_key}
+
+    def after_save(self, objects, items, created):
+        """Hook for M2M rows; returns the objects to hand back to the view."""
+        return objects
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        objects = [self.build(item) for item in validated_data]
+        with transaction.atomic():
+            objects = model.objects.bulk_create(objects, batch_size=BULK_BATCH_SIZE)
+            objects = self.after_save(objects, validated_data, created=True)
+        search.index_objects(objects)
+        return objects
+
+    def update(self, instance, validated_data):
+        model = self.child.Meta.model
+        now = timezone.now()
+        fields = {'updated_at'}
+        objects = []
+        for item in validated_data:
+            obj = instance[item['id']]
+            for attr, value in item.items():
+                if attr in self.model_fields():
+                    setattr(obj, attr, value)
+                    fields.add(attr)
+            obj.updated_at = now  # bulk_update skips auto_now
+            objects.append(obj)
+        with transaction.atomic():
+            model.objects.bulk_update(objects, sorted(fields), batch_size=BULK_BATCH_SIZE)
+            objects = self.after_save(objects, validated_data, created=False)
+        search.index_objects(objects)
+        return objects
+
+
+class TopicBulkListSerializer(BulkListSerializer):
+
+    def after_save(self, objects, items, created):
+        if not created:
+            from . import sync  # sync imports the values serializers below
+
+            # Courses embed topic names (search) and topic rows (delta sync)
+            topic_ids = [topic.pk for topic in objects]
+            sync.touch_courses(topic_ids=topic_ids)
+            courses = Course.objects.filter(topics__in=topic_ids).distinct().prefetch_related('topics')
+            search.index_objects(courses)
+        return objects
+
+
+class TopicBulkSerializer(serializers.ModelSerializer):
+    """One item of a bulk topic request; uniqueness is checked by the list serializer."""
+    id = serializers.IntegerField(required=False)
+
+    class Meta:
+        model = Topic
+        fields = ('id', 'name', 'description', 'is_active')
+        extra_kwargs = {'name': {'validators': []}}
+        list_serializer_class = TopicBulkListSerializer
+
+
+class CourseBulkListSerializer(BulkListSerializer):
+
+    def validate_items(self, items, errors):
+        super().validate_items(items, errors)
+
+        # Slugs are derived from names on create, so they must be unique too
+        if self.instance is None:
+            slugs = {index: slugify(item['name']) for index, item in enumerate(items) if 'name' in item}
+            self.check_unique(items, errors, 'slug', values=slugs)
+
+        # Every referenced topic id, checked with a single IN query
+        referenced = {pk for item in items for pk in item.get('topic_ids', [])}
+        found = set(Topic.objects.filter(pk__in=referenced).values_list('pk', flat=True))
+        for index, item in enumerate(items):
+            missing = sorted(set(item.get('topic_ids', [])) - found)
+            if missing:
+                errors[index]['topic_ids'] = [f'Invalid topic ids: {missing}']
+
+    def build(self, item):
+        course = super().build(item)
+        course.slug = slugify(course.name)  # Course.save() isn't called by bulk_create
+        return course
+
+    def after_save(self, objects, items, created):
+        Through = Course.topics.through
+        pairs = []
+        replaced = []
+        for course, item in zip(objects, items):
+            if 'topic_ids' not in item:
+                continue
+            replaced.append(course.pk)
+            pairs += [Through(course_id=course.pk, topic_id=pk) for pk in dict.fromkeys(item['topic_ids'])]
+        if replaced and not created:
+            Through.objects.filter(course_id__in=replaced).delete()
+        Through.objects.bulk_create(pairs, batch_size=BULK_BATCH_SIZE)
+        # Re-read with topics prefetched for the search index and the response
+        order = {course.pk: position for position, course in enumerate(objects)}
+        courses = Course.objects.filter(pk__in=order).prefetch_related('topics')
+        return sorted(courses, key=lambda course: order[course.pk])
+
+
+class CourseBulkSerializer(serializers.ModelSerializer):
+    """One item of a bulk course request; topic ids are validated by the list serializer."""
+    id = serializers.IntegerField(required=False)
+    topic_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+
+    class Meta:
+        model = Course
+        fields = ('id', 'name', 'description', 'topic_ids', 'duration_hours', 'is_published')
+        extra_kwargs = {'name': {'validators': []}}
+        list_serializer_class = CourseBulkListSerializer
+
+
+# --- LEARNER PROGRESS ---
+
+MAX_QUIZ_QUESTIONS = 100
+
+
+class QuestionResultSerializer(serializers.Serializer):
+    question = serializers.CharField()
+    chosen_answer = serializers.CharField(max_length=500, allow_blank=True, required=False, default='')
+    correct_answer = serializers.CharField(max_length=500, allow_blank=True, required=False, default='')
+    # Omit to have it worked out from chosen_answer vs correct_answer
+    is_correct = serializers.BooleanField(required=False, allow_null=True, default=None)
+
+    def validate(self, attrs):
+        if attrs['is_correct'] is None:
+            if not attrs['correct_answer']:
+                raise serializers.ValidationError("Provide is_correct or correct_answer.")
+            attrs['is_correct'] = attrs['chosen_answer'].strip().casefold() == attrs['correct_answer'].strip().casefold()
+        return attrs
+
+
+class QuizAttemptSerializer(serializers.Serializer):
+    """Input for recording a quiz attempt (see study_core/progress.py)."""
+    topic = serializers.CharField(max_length=255)
+    session_id = serializers.IntegerField(required=False, allow_null=True, default=None)
+    questions = QuestionResultSerializer(many=True, allow_empty=False, max_length=MAX_QUIZ_QUESTIONS)
+
+    def validate_session_id(self, value):
+        if value is None:
+            return None
+        session = StudySession.objects.filter(pk=value, user=self.context['request'].user).first()
+        if session is None:
+            raise serializers.ValidationError("Unknown study session.")
+        return session
+
+
+# --- REVIEWS ---
+
+class ReviewItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ReviewItem
+        fields = (
+            'id', 'kind', 'topic_name', 'prompt', 'answer', 'due_at', 'last_reviewed_at',
+            'interval_days', 'repetitions', 'ease', 'lapses',
+        )
+        read_only_fields = fields
+        list_serializer_class = TimedListSerializer
+
+
+class ReviewGradeSerializer(serializers.Serializer):
+    # SM-2 grade: 0-2 forgotten, 3 hard, 4 good, 5 easy
+    grade = serializers.IntegerField(min_value=0, max_value=5)
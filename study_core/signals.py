@@ -0,0 +1,131 @@
+# study_core/signals.py
+import threading
+from contextlib import contextmanager
+
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import progress, search, sync
+from .models import Course, StudySession, Topic
+
+_state = threading.local()
+
+
+@contextmanager
+def bookkeeping_suspended():
+    """
+    Skip the per-object search index and delta sync updates below while a
+    bulk operation maintains both itself.
+    """
+    previous = getattr(_state, 'suspended', False)
+    _state.suspended = True
+    try:
+        yield
+    finally:
+        _state.suspended = previous
+
+
+def _suspended():
+    return getattr(_state, 'suspended', False)
+
+
+@receiver(post_save, sender=Topic)
+def index_topic(sender, instance, created, **kwargs):
+    if _suspended():
+        return
+    search.index_objects([instance])
+    if not created:
+        # Course documents include their topic names
+        search.index_objects(instance.courses.all())
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=StudySession)
+def index_saved_object(sender, instance, **kwargs):
+    if _suspended():
+        return
+    search.index_objects([instance])
+
+
+@receiver(m2m_changed, sender=Course.topics.through)
+def course_topics_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Reindex and bump updated_at on every course whose topic list changed."""
+    if _suspended():
+        return
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            search.index_objects([instance])
+            sync.touch_courses(course_ids=[instance.pk])
+        return
+    # topic.courses.add/remove/clear(): the affected courses are on the other side
+    if action == 'pre_clear':
+        instance._cleared_courses = list(instance.courses.values_list('pk', flat=True))
+        return
+    if action == 'post_clear':
+        course_ids = getattr(instance, '_cleared_courses', [])
+    elif action in ('post_add', 'post_remove'):
+        course_ids = list(pk_set)
+    else:
+        return
+    search.index_objects(Course.objects.filter(pk__in=course_ids))
+    sync.touch_courses(course_ids=course_ids)
+
+
+@receiver(pre_delete, sender=Topic)
+def remember_courses_of_topic(sender, instance, **kwargs):
+    # The cascade removes the through rows before post_delete runs
+    if _suspended():
+        return
+    instance._indexed_course_ids = list(instance.courses.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Topic)
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=StudySession)
+def remove_deleted_object(sender, instance, **kwargs):
+    if _suspended():
+        return
+    search.remove_objects(sender, [instance.pk])
+
+
+@receiver(post_delete, sender=Topic)
+def reindex_courses_of_deleted_topic(sender, instance, **kwargs):
+    # Course documents list their topic names; drop the deleted one
+    course_ids = getattr(instance, '_indexed_course_ids', None)
+    if _suspended() or not course_ids:
+        return
+    search.index_objects(Course.objects.filter(pk__in=course_ids).prefetch_related('topics'))
+
+
+# --- DELTA SYNC ---
+
+@receiver(post_save, sender=Topic)
+def touch_courses_of_topic(sender, instance, created, **kwargs):
+    # Courses embed their topics, so a topic edit changes their payload too
+    if _suspended() or created:
+        return
+    sync.touch_courses(topic_ids=[instance.pk])
+
+
+@receiver(pre_delete, sender=Topic)
+def touch_courses_before_topic_delete(sender, instance, **kwargs):
+    # Must run before the cascade removes the through rows
+    if _suspended():
+        return
+    sync.touch_courses(topic_ids=[instance.pk])
+
+
+@receiver(post_delete, sender=Topic)
+@receiver(post_delete, sender=Course)
+def record_tombstone(sender, instance, **kwargs):
+    if _suspended():
+        return
+    sync.record_deletions(sender, [instance.pk])
+
+
+# --- LEARNER PROGRESS ---
+
+@receiver(post_save, sender=StudySession)
+def count_study_session(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        progress.record_study_session(instance.user, instance.topic_name, instance.created_at)
@@ -0,0 +1,119 @@
+# study_core/sync.py
+"""
+Delta sync for the topic and course catalogues.
+
+Clients keep a local copy and call GET /api/sync/?since=<cursor>. They
+get back the rows changed since the cursor (served by the updated_at
+indexes), the ids deleted since then (Tombstone rows, or rows the user
+can no longer see) and a new cursor.
+
+Cursors are a timestamp a few seconds behind "now". A transaction that
+commits slightly after it stamped updated_at is therefore picked up by
+the next call instead of being skipped. The cost is that a row may be
+sent twice, and clients upsert by id anyway. A missing cursor, or one
+older than the tombstone retention window, gets a full snapshot with
+"reset": true.
+"""
+import base64
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Course, Tombstone, Topic
+from .serializers import CourseValuesSerializer, TopicValuesSerializer
+
+CURSOR_VERSION = 'v1'
+CURSOR_LAG = timedelta(seconds=5)
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# (response key, tombstone kind, model, serializer, learner visibility flag)
+SYNCED = (
+    ('topics', Tombstone.KIND_TOPIC, Topic, TopicValuesSerializer, 'is_active'),
+    ('courses', Tombstone.KIND_COURSE, Course, CourseValuesSerializer, 'is_published'),
+)
+
+MODEL_KINDS = {model: kind for _, kind, model, _, _ in SYNCED}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def retention():
+    return timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+
+
+# --- CURSORS ---
+
+def encode_cursor(moment):
+    micros = (moment - EPOCH) // timedelta(microseconds=1)
+    return base64.urlsafe_b64encode(f'{CURSOR_VERSION}:{micros}'.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        version, micros = raw.split(':')
+        if version != CURSOR_VERSION:
+            raise ValueError(version)
+        return EPOCH + timedelta(microseconds=int(micros))
+    except (ValueError, UnicodeDecodeError, OverflowError) as e:
+        raise InvalidCursor(f"Invalid sync cursor: {cursor!r}") from e
+
+
+# --- BOOKKEEPING ---
+
+def record_deletions(model, pks):
+    """Write one tombstone per deleted Topic/Course id."""
+    kind = MODEL_KINDS[model]
+    Tombstone.objects.bulk_create([Tombstone(kind=kind, object_id=pk) for pk in pks], batch_size=500)
+
+
+def touch_courses(course_ids=None, topic_ids=None):
+    """
+    Bump updated_at on courses whose nested topic list changed, so they
+    show up in the next delta. Uses update(), so no signals fire.
+    """
+    courses = Course.objects.all()
+    if topic_ids is not None:
+        links = Course.topics.through.objects.filter(topic_id__in=list(topic_ids))
+        courses = courses.filter(pk__in=links.values('course_id'))
+    if course_ids is not None:
+        courses = courses.filter(pk__in=list(course_ids))
+    return courses.update(updated_at=timezone.now())
+
+
+def prune_tombstones(now=None):
+    cutoff = (now or timezone.now()) - retention()
+    return Tombstone.objects.filter(deleted_at__lt=cutoff).delete()[0]
+
+
+# --- CHANGES ---
+
+def changes_since(since, user):
+    """Build the /api/sync/ payload for `user` from the cursor time `since` (or None)."""
+    now = timezone.now()
+    reset = since is None or since < now - retention()
+    is_staff = bool(user is not None and user.is_staff)
+    payload = {'cursor': encode_cursor(now - CURSOR_LAG), 'reset': reset}
+
+    for key, kind, model, serializer_class, flag in SYNCED:
+        queryset = model.objects.order_by('pk')
+        if reset:
+            if not is_staff:
+                queryset = queryset.filter(**{flag: True})
+            payload[key] = {'updated': serializer_class(queryset).data, 'deleted': []}
+            continue
+
+        rows = serializer_class(queryset.filter(updated_at__gte=since)).data
+        deleted = list(
+            Tombstone.objects.filter(kind=kind, deleted_at__gte=since)
+            .values_list('object_id', flat=True).distinct()
+        )
+        if not is_staff:
+            # Rows hidden from learners since the cursor look like deletions to them
+            deleted += [row['id'] for row in rows if not row[flag]]
+            rows = [row for row in rows if row[flag]]
+        payload[key] = {'updated': rows, 'deleted': deleted}
+    return payload
@@ -1,3 +1,1223 @@
-from django.test import TestCase
+import io
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import orjson
+from PIL import ExifTags, Image
+
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.cache.backends import locmem
+from django.db import OperationalError, connection, transaction
+from django.db.models import QuerySet
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from . import activity, admission, ai_cache, compression, dashboard, db_routing, idempotency, images, prefetch, profiling, progress, recommender, reviews, search, sync
+from .ai_client import override_client
+from .fake_genai import FakeGenaiClient, LatencyModel
+from .models import ActivityEvent, Course, ReviewItem, SearchDocument, StudySession, Tombstone, Topic, TopicMastery
+from .prompt_budget import ELLIPSIS, count_tokens, fit_document, fit_history, truncate
+from .prompts import _history_line
+from .renderers import ORJSONRenderer
+from .serializers import (
+    CourseSerializer, CourseValuesSerializer, TopicSerializer, TopicValuesSerializer, UserSerializer,
+    UserValuesSerializer,
+)
+from .signals import bookkeeping_suspended
+
+
+def admission_options(**overrides):
+    options = admission.admission_settings()
+    options.update(overrides)
+    return options
+
+
+class AdmissionTests(SimpleTestCase):
+
+    def run_bulk(self, calls, threads, work):
+        def call(_):
+            try:
+                with admission.slot(admission.BULK):
+                    time.sleep(work)
+                return 'ok'
+            except admission.Rejected as e:
+                return e.reason
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            return Counter(pool.map(call, range(calls)))
+
+    def test_callers_within_capacity_are_never_shed(self):
+        # 4 callers can't exceed 3 bulk slots plus a queue of 2
+        with override_settings(ADMISSION={'MAX_CONCURRENT': 4, 'RESERVED_INTERACTIVE': 1}):
+            results = self.run_bulk(calls=50, threads=4, work=0.005)
+        self.assertEqual(results, Counter(ok=50))
+        self.assertEqual(admission.controller._in_flight, 0)
+        self.assertEqual(sum(admission.controller._queued.values()), 0)
+
+    def test_queue_full_counts_only_blocked_waiters(self):
+        controller = admission.AdmissionController()
+        options = admission_options(MAX_CONCURRENT=1, RESERVED_INTERACTIVE=0, MAX_QUEUE={**admission.DEFAULTS['MAX_QUEUE'], admission.BULK: 1})
+        started = controller.acquire(admission.BULK, options)
+
+        waiter = ThreadPoolExecutor(max_workers=1)
+        queued = waiter.submit(controller.acquire, admission.BULK, options)
+        while controller._queued[admission.BULK] == 0:
+            time.sleep(0.001)
+        with self.assertRaises(admission.Rejected) as rejected:
+            controller.acquire(admission.BULK, options)
+        self.assertEqual(rejected.exception.reason, 'queue_full')
+
+        # The freed slot goes to the waiter at once; the queue is empty again
+        controller.release(admission.BULK, started, options)
+        self.assertEqual(controller._queued[admission.BULK], 0)
+        controller.release(admission.BULK, queued.result(timeout=1), options)
+        waiter.shutdown()
+        self.assertEqual(controller._in_flight, 0)
+
+    def test_freed_slot_goes_to_highest_priority_waiter(self):
+        controller = admission.AdmissionController()
+        options = admission_options(MAX_CONCURRENT=1, RESERVED_INTERACTIVE=0)
+        started = controller.acquire(admission.BACKGROUND, options)
+        order = []
+        lock = threading.Lock()
+
+        def wait(klass):
+            slot_started = controller.acquire(klass, options)
+            with lock:
+                order.append(klass)
+            controller.release(klass, slot_started, options)
+
+        threads = [threading.Thread(target=wait, args=(klass,)) for klass in (admission.BULK, admission.INTERACTIVE, admission.STANDARD)]
+        for thread in threads:
+            thread.start()
+            while sum(controller._queued.values()) < threads.index(thread) + 1:
+                time.sleep(0.001)
+        controller.release(admission.BACKGROUND, started, options)
+        for thread in threads:
+            thread.join(timeout=1)
+        self.assertEqual(order, [admission.INTERACTIVE, admission.STANDARD, admission.BULK])
+
+    def test_reserved_slot_admits_interactive_past_blocked_waiters(self):
+        controller = admission.AdmissionController()
+        options = admission_options(MAX_CONCURRENT=2, RESERVED_INTERACTIVE=1)
+        started = controller.acquire(admission.STANDARD, options)
+        waiter = ThreadPoolExecutor(max_workers=1)
+        queued = waiter.submit(controller.acquire, admission.BULK, options)
+        while controller._queued[admission.BULK] == 0:
+            time.sleep(0.001)
+
+        interactive = controller.acquire(admission.INTERACTIVE, options)
+        self.assertEqual(controller._in_flight, 2)
+        controller.release(admission.INTERACTIVE, interactive, options)
+        # Only the non-reserved slot frees the bulk waiter
+        self.assertEqual(controller._queued[admission.BULK], 1)
+        controller.release(admission.STANDARD, started, options)
+        controller.release(admission.BULK, queued.result(timeout=1), options)
+        waiter.shutdown()
+
+    def test_waiter_times_out(self):
+        controller = admission.AdmissionController()
+        options = admission_options(MAX_CONCURRENT=1, RESERVED_INTERACTIVE=0, MAX_WAIT={**admission.DEFAULTS['MAX_WAIT'], admission.BULK: 0.05})
+        started = controller.acquire(admission.BULK, options)
+        with self.assertRaises(admission.Rejected) as rejected:
+            controller.acquire(admission.BULK, options)
+        self.assertEqual(rejected.exception.reason, 'timeout')
+        self.assertEqual(controller._waiting, [])
+        controller.release(admission.BULK, started, options)
+
+
+class PromptBudgetTests(SimpleTestCase):
+
+    def test_truncate_stays_within_budget_including_the_ellipsis(self):
+        text = ' '.join(['photosynthesis converts light, water and CO2'] * 50)
+        for max_tokens in range(0, 60):
+            cut = truncate(text, max_tokens)
+            self.assertLessEqual(count_tokens(cut), max_tokens)
+            if cut:
+                self.assertTrue(cut.endswith(ELLIPSIS))
+
+    def test_truncate_leaves_short_text_alone(self):
+        self.assertEqual(truncate('short text', 10), 'short text')
+
+    def test_fit_history_keeps_newest_turns_and_recaps_the_rest(self):
+        history = []
+        for i in range(40):
+            history.append({'role': 'user', 'content': f'question {i} ' + 'about cells ' * 10})
+            history.append({'role': 'assistant', 'content': 'an answer ' * 30})
+        lines, dropped = fit_history(history, 500, _history_line)
+        self.assertGreater(dropped, 0)
+        self.assertLessEqual(sum(count_tokens(line) for line in lines), 500)
+        self.assertTrue(lines[0].startswith('(Earlier, the student asked about: question 0'))
+        self.assertEqual(lines[-1], _history_line(history[-1]))
+
+    def test_fit_history_truncates_an_oversized_newest_turn(self):
+        history = [
+            {'role': 'user', 'content': 'what is osmosis?'},
+            {'role': 'assistant', 'content': 'water moves across a membrane ' * 200},
+        ]
+        lines, dropped = fit_history(history, 200, _history_line)
+        self.assertEqual(dropped, 1)
+        self.assertTrue(lines[-1].startswith('Tutor: water moves'))
+        self.assertIn(ELLIPSIS, lines[-1])
+        self.assertLessEqual(sum(count_tokens(line) for line in lines), 200)
+
+    def test_fit_document_keeps_opening_and_closing(self):
+        paragraphs = [f'Paragraph {i}. ' + 'filler words here ' * 20 for i in range(30)]
+        text = '\n\n'.join(paragraphs)
+        for max_tokens in (10, 50, 300, 1000):
+            fitted = fit_document(text, max_tokens)
+            self.assertLessEqual(count_tokens(fitted), max_tokens)
+        fitted = fit_document(text, 1000)
+        self.assertTrue(fitted.startswith('Paragraph 0.'))
+        self.assertTrue(fitted.endswith(paragraphs[-1].strip()))
+        self.assertIn(ELLIPSIS, fitted)
+
+
+class SearchIndexTests(TestCase):
+
+    def setUp(self):
+        self.topic = Topic.objects.create(name='Genetics', description='Genes and inheritance')
+        self.course = Course.objects.create(name='Biology 101', is_published=True)
+        self.course.topics.add(self.topic)
+        self.learner = User.objects.create_user('learner', 'learner@example.com', 'pw')
+        self.staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+
+    def course_document(self):
+        return SearchDocument.objects.get(kind=SearchDocument.KIND_COURSE, object_id=self.course.pk)
+
+    def found(self, query, user=None):
+        return {(result['kind'], result['id']) for result in search.search(query, user=user)}
+
+    def test_course_document_follows_its_topic_names(self):
+        self.assertIn('Genetics', self.course_document().body)
+        self.topic.name = 'Heredity'
+        self.topic.save()
+        self.assertIn('Heredity', self.course_document().body)
+        self.assertNotIn('Genetics', self.course_document().body)
+
+    def test_deleting_a_topic_reindexes_its_courses(self):
+        topic_pk = self.topic.pk
+        self.topic.delete()
+        self.assertNotIn('Genetics', self.course_document().body)
+        self.assertFalse(SearchDocument.objects.filter(kind=SearchDocument.KIND_TOPIC, object_id=topic_pk).exists())
+
+    def test_removing_a_topic_from_the_other_side_reindexes_the_course(self):
+        self.topic.courses.remove(self.course)
+        self.assertNotIn('Genetics', self.course_document().body)
+
+    def test_deleting_a_course_removes_its_document(self):
+        course_pk = self.course.pk
+        self.course.delete()
+        self.assertFalse(SearchDocument.objects.filter(kind=SearchDocument.KIND_COURSE, object_id=course_pk).exists())
+
+    def test_suspended_bookkeeping_skips_the_index(self):
+        with bookkeeping_suspended():
+            Topic.objects.create(name='Ecology')
+        self.assertFalse(SearchDocument.objects.filter(kind=SearchDocument.KIND_TOPIC, title='Ecology').exists())
+
+    def test_ranked_search_finds_topics_and_courses(self):
+        found = self.found('genetics')
+        self.assertIn((SearchDocument.KIND_TOPIC, self.topic.pk), found)
+        self.assertIn((SearchDocument.KIND_COURSE, self.course.pk), found)
+        self.assertIn((SearchDocument.KIND_TOPIC, self.topic.pk), self.found('inherit'))  # prefix match
+
+    def test_unpublished_courses_are_staff_only(self):
+        self.course.is_published = False
+        self.course.save()
+        course = (SearchDocument.KIND_COURSE, self.course.pk)
+        self.assertNotIn(course, self.found('genetics', self.learner))
+        self.assertIn(course, self.found('genetics', self.staff))
+
+    def test_study_sessions_are_private_to_their_owner(self):
+        session = StudySession.objects.create(
+            user=self.learner, topic_name='Mitosis', duration_input='1 day',
+            generated_content='Day 1: chromosomes condense during prophase.',
+        )
+        mine = (SearchDocument.KIND_SESSION, session.pk)
+        self.assertIn(mine, self.found('prophase', self.learner))
+        self.assertNotIn(mine, self.found('prophase', self.staff))
+        self.assertNotIn(mine, self.found('prophase'))
+
+
+class BulkEndpointTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', 'admin@example.com', 'pw', is_staff=True))
+
+    def bulk(self, method, path, body):
+        return getattr(self.client, method)(f'/api/admin/{path}/bulk/', body, format='json')
+
+    def test_create_topics(self):
+        response = self.bulk('post', 'topics', [{'name': 'Algebra'}, {'name': 'Geometry', 'is_active': False}])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(set(Topic.objects.values_list('name', flat=True)), {'Algebra', 'Geometry'})
+        self.assertEqual(SearchDocument.objects.filter(kind=SearchDocument.KIND_TOPIC).count(), 2)
+
+    def test_duplicate_names_are_rejected_per_item(self):
+        Topic.objects.create(name='Algebra')
+        response = self.bulk('post', 'topics', [{'name': 'Algebra'}, {'name': 'Calculus'}, {'name': 'Calculus'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('already exists', str(response.data[0]['name'][0]))
+        self.assertEqual(response.data[1], {})
+        self.assertEqual(str(response.data[2]['name'][0]), 'Duplicate name in this request.')
+        self.assertEqual(Topic.objects.count(), 1)
+
+    def test_create_courses_with_topics(self):
+        topic = Topic.objects.create(name='Algebra')
+        response = self.bulk('post', 'courses', [{'name': 'Maths I', 'topic_ids': [topic.pk]}])
+        self.assertEqual(response.status_code, 201)
+        course = Course.objects.get(name='Maths I')
+        self.assertEqual(course.slug, 'maths-i')
+        self.assertEqual(list(course.topics.all()), [topic])
+
+        response = self.bulk('post', 'courses', [{'name': 'Maths II', 'topic_ids': [topic.pk, 9999]}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(str(response.data[0]['topic_ids'][0]), 'Invalid topic ids: [9999]')
+
+    def test_patch_updates_and_reindexes_courses(self):
+        topic = Topic.objects.create(name='Algebra')
+        course = Course.objects.create(name='Maths I')
+        course.topics.add(topic)
+        response = self.bulk('patch', 'topics', [{'id': topic.pk, 'name': 'Linear Algebra'}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Topic.objects.get(pk=topic.pk).name, 'Linear Algebra')
+        document = SearchDocument.objects.get(kind=SearchDocument.KIND_COURSE, object_id=course.pk)
+        self.assertIn('Linear Algebra', document.body)
+
+    def test_patch_unknown_id_is_not_found(self):
+        topic = Topic.objects.create(name='Algebra')
+        response = self.bulk('patch', 'topics', [{'id': topic.pk, 'name': 'Algebra I'}, {'id': 9999, 'name': 'Ghost'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(str(response.data[1]['id'][0]), 'Object not found.')
+        self.assertEqual(Topic.objects.get(pk=topic.pk).name, 'Algebra')
+
+    def test_delete_skips_missing_ids(self):
+        topics = [Topic.objects.create(name=name) for name in ('Algebra', 'Geometry')]
+        course = Course.objects.create(name='Maths I')
+        course.topics.add(*topics)
+        response = self.bulk('delete', 'topics', {'ids': [topics[0].pk, 9999]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['deleted'], 1)
+        self.assertEqual(list(Topic.objects.values_list('name', flat=True)), ['Geometry'])
+        self.assertTrue(Tombstone.objects.filter(kind=Tombstone.KIND_TOPIC, object_id=topics[0].pk).exists())
+        document = SearchDocument.objects.get(kind=SearchDocument.KIND_COURSE, object_id=course.pk)
+        self.assertNotIn('Algebra', document.body)
+
+    def test_delete_needs_integer_ids(self):
+        response = self.bulk('delete', 'topics', {'ids': ['1']})
+        self.assertEqual(response.status_code, 400)
+
+
+class ValuesSerializerTests(TestCase):
+
+    def setUp(self):
+        topics = [
+            Topic.objects.create(name='Algebra', description='Équations'),
+            Topic.objects.create(name='Geometry', is_active=False),
+        ]
+        Course.objects.create(name='Empty course')
+        course = Course.objects.create(name='Maths I', description='First year', duration_hours=30, is_published=True)
+        course.topics.add(*topics)
+        User.objects.create_user('ada', 'ada@example.com', 'pw', first_name='Ada')
+
+    def assertSameOutput(self, model_serializer, values_serializer):
+        expected = JSONRenderer().render(model_serializer.data)
+        self.assertEqual(orjson.loads(ORJSONRenderer().render(values_serializer.data)), orjson.loads(expected))
+
+    def test_topics(self):
+        topics = Topic.objects.order_by('name')
+        self.assertSameOutput(TopicSerializer(topics, many=True), TopicValuesSerializer(topics))
+
+    def test_courses_with_nested_topics(self):
+        courses = Course.objects.order_by('name').prefetch_related('topics')
+        self.assertSameOutput(CourseSerializer(courses, many=True), CourseValuesSerializer(courses))
+
+    def test_users(self):
+        users = User.objects.order_by('date_joined')
+        self.assertSameOutput(UserSerializer(users, many=True), UserValuesSerializer(users))
+
+    def test_empty_queryset(self):
+        self.assertEqual(CourseValuesSerializer(Course.objects.none()).data, [])
+
+    def test_list_endpoint_uses_the_values_path(self):
+        response = APIClient().get('/api/admin/courses/')
+        self.assertEqual(response.status_code, 200)
+        expected = CourseSerializer(Course.objects.order_by('name').prefetch_related('topics'), many=True)
+        self.assertEqual(orjson.loads(response.content), orjson.loads(JSONRenderer().render(expected.data)))
+
+
+class CompressedTextFieldTests(TestCase):
+
+    def setUp(self):
+        self.reset_dictionaries()
+        self.addCleanup(self.reset_dictionaries)
+        self.user = User.objects.create_user('learner', 'learner@example.com', 'pw')
+        self.plan = '\n'.join(
+            f'## Day {day}\n- Review the key concepts of cell biology.\n- Practice questions on mitosis.' for day in range(1, 8)
+        )
+
+    @staticmethod
+    def reset_dictionaries():
+        compression._dictionaries.clear()  # ids are reused between test databases
+        compression.clear_cache()
+
+    def stored_bytes(self, session):
+        with connection.cursor() as cursor:  # the raw column, before from_db_value()
+            cursor.execute(f'SELECT generated_content FROM {StudySession._meta.db_table} WHERE id = %s', [session.pk])
+            return bytes(cursor.fetchone()[0])
+
+    def create_session(self, content):
+        return StudySession.objects.create(user=self.user, topic_name='Cells', duration_input='1 week', generated_content=content)
+
+    def test_round_trip_with_a_dictionary(self):
+        dict_id = compression.save_dictionary(compression.train_dictionary([self.plan, self.plan.replace('cell', 'plant')]))
+        session = self.create_session(self.plan)
+        raw = self.stored_bytes(session)
+        self.assertEqual(compression.HEADER.unpack_from(raw), (compression.CODEC_DEFLATE, dict_id))
+        self.assertLess(len(raw), len(self.plan) // 4)
+        self.assertEqual(StudySession.objects.get(pk=session.pk).generated_content, self.plan)
+
+    def test_rows_stay_readable_after_a_newer_dictionary(self):
+        compression.save_dictionary(compression.train_dictionary([self.plan]))
+        old = self.create_session(self.plan)
+        newer = compression.save_dictionary(b'unrelated words')
+        new = self.create_session(self.plan)
+        self.assertEqual(compression.HEADER.unpack_from(self.stored_bytes(new))[1], newer)
+        self.reset_dictionaries()
+        self.assertEqual(StudySession.objects.get(pk=old.pk).generated_content, self.plan)
+
+    def test_short_values_are_stored_plain(self):
+        session = self.create_session('Short plan')
+        self.assertEqual(self.stored_bytes(session), compression.HEADER.pack(compression.CODEC_STORED, 0) + b'Short plan')
+        self.assertEqual(StudySession.objects.get(pk=session.pk).generated_content, 'Short plan')
+
+    def test_missing_dictionary_is_an_error(self):
+        data = compression.HEADER.pack(compression.CODEC_DEFLATE, 42) + compression.deflate(self.plan.encode(), b'x')
+        with self.assertRaises(compression.CompressionError):
+            compression.decompress_text(data)
+
+    def test_search_document_keeps_the_full_text(self):
+        session = self.create_session(self.plan)
+        document = SearchDocument.objects.get(kind=SearchDocument.KIND_SESSION, object_id=session.pk)
+        self.assertEqual(document.body, self.plan)
+
+
+class DeltaSyncTests(TestCase):
+
+    def setUp(self):
+        self.topic = Topic.objects.create(name='Genetics')
+        self.course = Course.objects.create(name='Biology 101', is_published=True)
+        self.course.topics.add(self.topic)
+        self.learner = User.objects.create_user('learner', 'learner@example.com', 'pw')
+        self.staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        self.since = timezone.now()
+
+    def ids(self, payload, key, part):
+        return [row['id'] if isinstance(row, dict) else row for row in payload[key][part]]
+
+    def test_cursor_round_trip(self):
+        moment = timezone.now()
+        self.assertEqual(sync.decode_cursor(sync.encode_cursor(moment)), moment)
+        for cursor in ('nonsense', '!' + sync.encode_cursor(moment)):
+            with self.assertRaises(sync.InvalidCursor):
+                sync.decode_cursor(cursor)
+
+    def test_endpoint_returns_a_snapshot_then_deltas(self):
+        client = APIClient()
+        first = client.get('/api/sync/').json()
+        self.assertTrue(first['reset'])
+        self.assertEqual([row['id'] for row in first['topics']['updated']], [self.topic.pk])
+        self.assertEqual(client.get('/api/sync/', {'since': 'nonsense'}).status_code, 400)
+
+        second = client.get('/api/sync/', {'since': first['cursor']}).json()
+        self.assertFalse(second['reset'])
+        # The cursor lags a few seconds, so rows from just before it come again
+        self.assertEqual([row['id'] for row in second['topics']['updated']], [self.topic.pk])
+
+    def test_deleted_topic_is_a_tombstone_and_touches_its_course(self):
+        topic_pk = self.topic.pk
+        self.topic.delete()
+        payload = sync.changes_since(self.since, self.learner)
+        self.assertEqual(self.ids(payload, 'topics', 'deleted'), [topic_pk])
+        self.assertEqual(self.ids(payload, 'courses', 'updated'), [self.course.pk])
+        self.assertEqual(payload['courses']['updated'][0]['topics'], [])
+
+    def test_topic_rename_touches_its_courses(self):
+        self.topic.name = 'Heredity'
+        self.topic.save()
+        payload = sync.changes_since(self.since, self.learner)
+        self.assertEqual(payload['courses']['updated'][0]['topics'][0]['name'], 'Heredity')
+
+    def test_unpublished_course_looks_deleted_to_learners(self):
+        self.course.is_published = False
+        self.course.save()
+        learner = sync.changes_since(self.since, self.learner)
+        self.assertEqual(self.ids(learner, 'courses', 'deleted'), [self.course.pk])
+        self.assertEqual(learner['courses']['updated'], [])
+        staff = sync.changes_since(self.since, self.staff)
+        self.assertEqual(self.ids(staff, 'courses', 'updated'), [self.course.pk])
+        self.assertEqual(staff['courses']['deleted'], [])
+
+    def test_cursor_older_than_retention_gets_a_full_resync(self):
+        payload = sync.changes_since(self.since - sync.retention() - timedelta(days=1), self.learner)
+        self.assertTrue(payload['reset'])
+
+    def test_prune_drops_expired_tombstones(self):
+        Tombstone.objects.create(kind=Tombstone.KIND_TOPIC, object_id=1)
+        Tombstone.objects.create(kind=Tombstone.KIND_TOPIC, object_id=2)
+        Tombstone.objects.filter(object_id=1).update(deleted_at=self.since - sync.retention() - timedelta(days=1))
+        self.assertEqual(sync.prune_tombstones(), 1)
+        self.assertEqual(list(Tombstone.objects.values_list('object_id', flat=True)), [2])
+
+
+@override_settings(AI_CACHE={'SOFT_TTL': 10, 'HARD_TTL': 100, 'JITTER': 0})
+class AICacheTests(SimpleTestCase):
+
+    def setUp(self):
+        caches['ai'].clear()
+        self.calls = []
+        self.now = 1_000_000.0
+        clock = mock.patch.object(ai_cache.time, 'time', lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def generate(self, prompt):
+        self.calls.append(prompt)
+        return f'answer {len(self.calls)}'
+
+    def get(self):
+        return ai_cache.get_or_generate('notes', 'cells', self.generate, lambda text: text.startswith('AI service'))
+
+    def wait_for_refresh(self):
+        lock_key = ai_cache.cache_key('notes', 'cells', '') + ':refresh'
+        deadline = time.monotonic() + 2
+        while caches['ai'].get(lock_key) is not None and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def test_fresh_entry_is_a_hit(self):
+        self.assertEqual(self.get(), ('answer 1', ai_cache.MISS))
+        self.now += 5
+        self.assertEqual(self.get(), ('answer 1', ai_cache.HIT))
+        self.assertEqual(len(self.calls), 1)
+
+    def test_stale_entry_is_served_while_one_refresh_runs(self):
+        self.get()
+        self.now += 50  # past soft, before hard expiry
+        self.assertEqual(self.get(), ('answer 1', ai_cache.STALE))
+        self.wait_for_refresh()
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(self.get(), ('answer 2', ai_cache.HIT))
+
+    def test_failed_refresh_keeps_serving_the_stale_entry(self):
+        self.get()
+        self.now += 50
+        self.generate = lambda prompt: 'AI service error: boom'
+        self.assertEqual(self.get(), ('answer 1', ai_cache.STALE))
+        self.wait_for_refresh()
+        self.assertEqual(self.get()[0], 'answer 1')
+
+    def test_hard_expired_entry_is_regenerated_inline(self):
+        self.get()
+        self.now += 150
+        self.assertEqual(self.get(), ('answer 2', ai_cache.MISS))
+        self.assertEqual(len(self.calls), 2)
+
+
+@override_settings(AI_PREFETCH={'BUDGET_PER_USER': 3, 'BUDGET_WINDOW': 3600})
+class PrefetchBudgetTests(SimpleTestCase):
+
+    def setUp(self):
+        caches['prefetch'].clear()
+
+    def test_budget_is_shared_out_until_spent(self):
+        options = prefetch.prefetch_settings()
+        self.assertEqual(prefetch._take_budget(1, 2, options), 2)
+        self.assertEqual(prefetch._take_budget(1, 2, options), 1)
+        self.assertEqual(prefetch._take_budget(1, 2, options), 0)
+        self.assertEqual(prefetch._take_budget(2, 2, options), 2)  # per user
+
+    def test_budgets_live_in_their_own_cache(self):
+        prefetch._take_budget(1, 1, prefetch.prefetch_settings())
+        caches['default'].clear()
+        self.assertEqual(prefetch._take_budget(1, 3, prefetch.prefetch_settings()), 2)
+
+
+@override_settings(AI_CACHE={'ENABLED': False})
+class PrefetchOptInTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('learner', 'learner@example.com', 'pw'))
+        self.genai = FakeGenaiClient(latency=LatencyModel(median_ms=0, distribution='constant'), seed=1)
+        schedule = mock.patch.object(prefetch, 'schedule', return_value='job-1')
+        self.schedule = schedule.start()
+        self.addCleanup(schedule.stop)
+
+    def plan(self, **extra):
+        with override_client(self.genai):
+            return self.client.post('/api/sessions/', {'topic_name': 'Cells', 'duration_input': '1 week', **extra}, format='json')
+
+    def test_prefetch_is_off_by_default(self):
+        self.assertFalse(prefetch.DEFAULTS['ENABLED'])
+
+    def test_plan_without_opt_in_schedules_nothing(self):
+        response = self.plan()
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data['prefetch_id'])
+        self.schedule.assert_not_called()
+        self.assertEqual(self.genai.calls, 1)
+
+    def test_plan_that_opts_in_schedules_notes_and_quiz(self):
+        response = self.plan(prefetch=True)
+        self.assertEqual(response.data['prefetch_id'], 'job-1')
+        kinds = [kind for kind, _ in self.schedule.call_args.args[1]]
+        self.assertEqual(kinds, ['notes', 'quiz'])
+
+
+@override_settings(AI_CACHE={'ENABLED': False})
+class IdempotencyTests(TestCase):
+
+    def setUp(self):
+        self.cache = idempotency._cache()
+        self.cache.clear()
+        self.user = User.objects.create_user('learner', 'learner@example.com', 'pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.genai = FakeGenaiClient(latency=LatencyModel(median_ms=0, distribution='constant'), seed=1)
+
+    def post(self, body, key='key-1'):
+        with override_client(self.genai):
+            return self.client.post('/api/study-tools/', body, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def cache_key(self, key='key-1'):
+        request = SimpleNamespace(user=self.user, META={})
+        return idempotency._cache_key(request, 'study_tools_view', key)
+
+    def test_retry_replays_the_stored_response(self):
+        first = self.post({'topic': 'Cells'})
+        second = self.post({'topic': 'Cells'})
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second[idempotency.REPLAYED_HEADER], 'true')
+        self.assertFalse(first.has_header(idempotency.REPLAYED_HEADER))
+        self.assertEqual(self.genai.calls, 1)
+
+    def test_key_reused_for_a_different_body_is_422(self):
+        self.post({'topic': 'Cells'})
+        response = self.post({'topic': 'Atoms'})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.genai.calls, 1)
+
+    @override_settings(IDEMPOTENCY={'WAIT': 0.05, 'POLL_INTERVAL': 0.01})
+    def test_duplicate_of_a_request_still_running_elsewhere_is_409(self):
+        self.post({'topic': 'Cells'})
+        # Pretend another worker is still generating under this key
+        entry = self.cache.get(self.cache_key())
+        self.cache.set(self.cache_key(), {'state': idempotency.IN_PROGRESS, 'fingerprint': entry['fingerprint']})
+        response = self.post({'topic': 'Cells'})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '5')
+
+    def test_failed_generation_is_not_replayed(self):
+        self.genai.error_rate = 1.0
+        self.post({'topic': 'Cells'})
+        self.assertIsNone(self.cache.get(self.cache_key()))
+        self.genai.error_rate = 0.0
+        retry = self.post({'topic': 'Cells'})
+        self.assertFalse(retry.has_header(idempotency.REPLAYED_HEADER))
+        self.assertEqual(self.genai.calls, 2)
+
+
+
+    def test_keys_live_in_their_own_cache_alias(self):
+        self.post({'topic': 'Cells'})
+        self.assertIsNotNone(caches['idempotency'].get(self.cache_key()))
+        self.assertIsNone(cache.get(self.cache_key()))
+
+
+def encoded_image(size, format='JPEG', color='red', orientation=None):
+    image = Image.new('RGB', size, color)
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[ExifTags.Base.Orientation] = orientation
+    out = io.BytesIO()
+    image.save(out, format, exif=exif)
+    return out.getvalue()
+
+
+class ImagePreparationTests(SimpleTestCase):
+
+    def prepare(self, data, **overrides):
+        return images.prepare_image(data, {**images.DEFAULTS, **overrides})
+
+    def test_exif_orientation_is_applied(self):
+        data, mime_type, info = self.prepare(encoded_image((300, 200), orientation=6))
+        self.assertEqual(mime_type, 'image/jpeg')
+        self.assertEqual(info['original_size'], [300, 200])
+        self.assertEqual(info['size'], [200, 300])
+        with Image.open(io.BytesIO(data)) as image:
+            self.assertEqual(image.size, (200, 300))
+            self.assertNotIn(ExifTags.Base.Orientation, image.getexif())
+
+    def test_large_images_are_downscaled_to_max_side(self):
+        data, _, info = self.prepare(encoded_image((3200, 1200)), MAX_SIDE=800)
+        self.assertEqual(info['size'], [800, 300])
+        self.assertLess(info['bytes'], info['original_bytes'])
+        with Image.open(io.BytesIO(data)) as image:
+            self.assertEqual((image.format, image.size), ('JPEG', (800, 300)))
+
+    def test_small_images_keep_their_size(self):
+        _, _, info = self.prepare(encoded_image((640, 480), format='PNG'))
+        self.assertEqual(info['size'], [640, 480])
+
+    def test_transparency_is_kept_for_webp_only(self):
+        out = io.BytesIO()
+        Image.new('RGBA', (40, 40), (0, 0, 0, 0)).save(out, 'PNG')
+        jpeg, _, _ = self.prepare(out.getvalue())
+        webp, mime_type, _ = self.prepare(out.getvalue(), FORMAT='WEBP')
+        self.assertEqual(mime_type, 'image/webp')
+        with Image.open(io.BytesIO(jpeg)) as image:
+            self.assertEqual(image.mode, 'RGB')
+            self.assertGreater(min(image.getpixel((20, 20))), 240)  # put on white
+        with Image.open(io.BytesIO(webp)) as image:
+            self.assertEqual(image.mode, 'RGBA')
+
+    def test_images_over_max_pixels_are_rejected_before_decoding(self):
+        data = encoded_image((400, 300))
+        with mock.patch.object(images.ImageOps, 'exif_transpose') as transpose:
+            with self.assertRaisesMessage(images.ImageError, 'too large (400x300)'):
+                self.prepare(data, MAX_PIXELS=100_000)
+        transpose.assert_not_called()
+
+    def test_corrupt_input_is_an_image_error(self):
+        truncated = encoded_image((400, 300), color='blue')[:300]
+        for data in (b'', b'not an image', truncated):
+            with self.subTest(data=data[:12]):
+                with self.assertRaisesMessage(images.ImageError, 'Unsupported or corrupt image'):
+                    self.prepare(data)
+
+
+def quiz_results(correct, total):
+    return [
+        {'question': f'Q{i}', 'chosen_answer': 'a', 'correct_answer': 'a' if i < correct else 'b', 'is_correct': i < correct}
+        for i in range(total)
+    ]
+
+
+class TopicMasteryTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('learner', 'learner@example.com', 'pw')
+
+    def mastery(self, name='Cells'):
+        return TopicMastery.objects.get(user=self.user, topic_key=progress.topic_key(name))
+
+    def test_attempts_accumulate_in_one_row(self):
+        progress.record_attempt(self.user, 'Cells', quiz_results(2, 4))
+        progress.record_attempt(self.user, '  CELLS ', quiz_results(4, 4))
+        row = self.mastery()
+        self.assertEqual(TopicMastery.objects.filter(user=self.user).count(), 1)
+        self.assertEqual((row.attempts, row.questions, row.correct), (2, 8, 6))
+        self.assertEqual(row.topic_name, '  CELLS ')
+        self.assertAlmostEqual(row.recent_score, 0.5 * (1 - progress.RECENT_WEIGHT) + 1.0 * progress.RECENT_WEIGHT)
+        self.assertEqual(row.best_score, 1.0)
+        self.assertEqual(row.accuracy, 0.75)
+
+    def test_best_score_keeps_the_maximum(self):
+        progress.record_attempt(self.user, 'Cells', quiz_results(3, 4))
+        progress.record_attempt(self.user, 'Cells', quiz_results(1, 4))
+        self.assertEqual(self.mastery().best_score, 0.75)
+
+    def test_increments_apply_to_the_stored_row(self):
+        progress.record_attempt(self.user, 'Cells', quiz_results(1, 2))
+        # Another worker's attempts land in between; the UPDATE adds to them rather than overwriting
+        TopicMastery.objects.filter(user=self.user).update(attempts=5, questions=10, correct=7)
+        with self.assertNumQueries(1):
+            progress.record_study_session(self.user, 'Cells')
+        progress.record_attempt(self.user, 'Cells', quiz_results(2, 2))
+        row = self.mastery()
+        self.assertEqual((row.attempts, row.questions, row.correct, row.study_sessions), (6, 12, 9, 1))
+
+    def test_first_attempt_after_study_plans_takes_its_score_as_is(self):
+        StudySession.objects.create(user=self.user, topic_name='Cells', duration_input='1 week', generated_content='plan')
+        StudySession.objects.create(user=self.user, topic_name='cells', duration_input='1 week', generated_content='plan')
+        row = self.mastery()
+        self.assertEqual((row.study_sessions, row.attempts, row.recent_score), (2, 0, 0.0))
+        self.assertIsNotNone(row.last_studied_at)
+
+        progress.record_attempt(self.user, 'Cells', quiz_results(3, 4))
+        row = self.mastery()
+        self.assertEqual((row.study_sessions, row.attempts), (2, 1))
+        self.assertEqual(row.recent_score, 0.75)
+
+    def test_row_created_concurrently_still_gets_the_increment(self):
+        TopicMastery.objects.create(user=self.user, topic_key='cells', topic_name='Cells', study_sessions=3)
+        update = QuerySet.update
+        calls = []
+
+        def racing_update(queryset, **kwargs):
+            calls.append(kwargs)
+            return 0 if len(calls) == 1 else update(queryset, **kwargs)  # first UPDATE ran before the insert
+
+        with mock.patch.object(QuerySet, 'update', racing_update):
+            progress.record_study_session(self.user, 'Cells')
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.mastery().study_sessions, 4)
+
+    def test_progress_endpoint_reads_the_aggregates(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/api/progress/attempts/', {'topic': 'Cells', 'questions': quiz_results(1, 4)}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['total'], response.data['correct']), (4, 1))
+
+        response = client.get('/api/progress/')
+        self.assertEqual(response.status_code, 200)
+        topic, = response.data['topics']
+        self.assertEqual((topic['topic'], topic['level'], topic['attempts']), ('Cells', 'weak', 1))
+        self.assertEqual(response.data['weak_topics'], ['Cells'])
+
+
+class InlineThread:
+    """Stands in for threading.Thread: runs the target when started, in this thread."""
+
+    started = []
+
+    def __init__(self, target, args=(), name=None, daemon=None):
+        self.target, self.args = target, args
+
+    def start(self):
+        self.started.append(self)
+        self.target(*self.args)
+
+
+class RecommenderModelTests(TestCase):
+
+    def setUp(self):
+        recommender.invalidate()
+        self.addCleanup(recommender.invalidate)
+        self.addCleanup(self.release_build_lock)
+        InlineThread.started = []
+        self.user = User.objects.create_user('learner', 'learner@example.com', 'pw')
+        for i, topics in enumerate((['Cells', 'Genetics'], ['Cells', 'Genetics'], ['Genetics', 'Atoms'])):
+            other = User.objects.create_user(f'other{i}', f'other{i}@example.com', 'pw')
+            for name in topics:
+                progress.record_study_session(other, name)
+        progress.record_study_session(self.user, 'Cells')
+
+    def release_build_lock(self):
+        if recommender._model_lock.locked():  # a mocked Thread never ran the build
+            recommender._model_lock.release()
+
+    def test_requests_never_build_the_model(self):
+        with mock.patch.object(recommender.threading, 'Thread') as thread, \
+                mock.patch.object(recommender, 'build_model') as build:
+            with self.assertNumQueries(1):  # the user's own rows
+                recommendations = recommender.recommend(self.user)
+            self.assertIsNone(recommender.get_model())
+        build.assert_not_called()
+        thread.return_value.start.assert_called_once_with()
+        # Cold start: generic next steps until a model exists
+        self.assertEqual(recommendations['nextSteps'], recommender.generic()['nextSteps'])
+        self.assertEqual(recommendations['suggestions'][0]['topic'], 'Cells')
+
+    def test_only_one_background_build_at_a_time(self):
+        with mock.patch.object(recommender.threading, 'Thread') as thread:
+            recommender.get_model()
+            recommender.get_model()
+        self.assertEqual(thread.return_value.start.call_count, 1)
+
+    def test_background_build_serves_later_requests(self):
+        with mock.patch.object(recommender.threading, 'Thread', InlineThread):
+            self.assertIsNone(recommender.get_model())
+            model = recommender.get_model()
+        self.assertEqual(len(InlineThread.started), 1)
+        self.assertEqual(model.keys, ['atoms', 'cells', 'genetics'])
+        self.assertFalse(recommender._model_lock.locked())
+
+        next_steps = recommender.recommend(self.user)['nextSteps']
+        self.assertEqual(next_steps[0]['topic'], 'Genetics')
+        self.assertIn('Learners who study Cells', next_steps[0]['reason'])
+
+    def test_stale_model_is_served_while_it_rebuilds(self):
+        stale = recommender.rebuild()
+        stale.built_at -= recommender.recommender_settings()['MODEL_TTL'] + 1
+        with mock.patch.object(recommender.threading, 'Thread', InlineThread), \
+                mock.patch.object(recommender, 'build_model', side_effect=RuntimeError('database is locked')):
+            self.assertIs(recommender.get_model(), stale)
+        self.assertEqual(len(InlineThread.started), 1)
+        self.assertIs(recommender._model, stale)  # a failed build keeps the old one
+        self.assertFalse(recommender._model_lock.locked())
+
+
+class ReviewSchedulingTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('learner', 'learner@example.com', 'pw')
+        self.options = reviews.review_settings()
+        self.options['FUZZ'] = 0
+        self.now = timezone.now()
+
+    def item(self, prompt='What is ATP?', **fields):
+        return ReviewItem(
+            user=self.user, kind=ReviewItem.QUESTION, topic_key='biology', topic_name='Biology', prompt=prompt,
+            item_key=reviews.item_key(ReviewItem.QUESTION, 'biology', prompt), due_at=self.now, **fields,
+        )
+
+    def test_passing_grades_grow_the_interval(self):
+        item = self.item()
+        intervals = []
+        for _ in range(4):
+            reviews.apply_grade(item, 4, self.now, self.options)
+            intervals.append(item.interval_days)
+        self.assertEqual(intervals, [1.0, 6.0, 15.0, 37.5])
+        self.assertEqual(item.ease, 2.5)
+        self.assertEqual(item.due_at, self.now + timedelta(days=37.5))
+
+    def test_failing_grade_lapses_the_item(self):
+        item = self.item(repetitions=3, interval_days=15.0)
+        reviews.apply_grade(item, 1, self.now, self.options)
+        self.assertEqual((item.repetitions, item.interval_days, item.lapses), (0, 1.0, 1))
+        self.assertAlmostEqual(item.ease, 1.96)
+        self.assertEqual(item.due_at, self.now + timedelta(days=1))
+
+    def test_ease_never_drops_below_the_minimum(self):
+        item = self.item()
+        for _ in range(10):
+            reviews.apply_grade(item, 0, self.now, self.options)
+        self.assertEqual(item.ease, self.options['MIN_EASE'])
+
+    def test_interval_is_capped(self):
+        self.options['MAX_INTERVAL_DAYS'] = 30
+        item = self.item(repetitions=5, interval_days=100.0)
+        reviews.apply_grade(item, 5, self.now, self.options)
+        self.assertEqual(item.due_at, self.now + timedelta(days=30))
+
+    def test_due_returns_the_most_overdue_first(self):
+        for days in (3, 1, 2, -1):
+            item = self.item(prompt=f'question {days}')
+            item.due_at = self.now - timedelta(days=days)
+            item.save()
+        items, more = reviews.due(self.user, limit=2, now=self.now)
+        self.assertEqual([item.prompt for item in items], ['question 3', 'question 2'])
+        self.assertTrue(more)
+        items, more = reviews.due(self.user, limit=10, now=self.now)
+        self.assertEqual(len(items), 3)
+        self.assertFalse(more)
+
+    def reviewed(self, prompt, repetitions, interval_days, ease=2.5):
+        item = self.item(prompt=prompt, repetitions=repetitions, interval_days=interval_days, ease=ease,
+                         last_reviewed_at=self.now)
+        item.due_at = reviews.due_at_for(item, self.options)
+        item.save()
+        return item
+
+    def test_reschedule_recomputes_interval_and_ease_from_state(self):
+        learning = self.reviewed('learning', repetitions=2, interval_days=6.0)
+        mature = self.reviewed('mature', repetitions=6, interval_days=400.0, ease=1.3)
+        lapsed = self.reviewed('lapsed', repetitions=0, interval_days=1.0, ease=1.8)
+
+        with override_settings(REVIEWS={'FUZZ': 0, 'SECOND_INTERVAL_DAYS': 4.0, 'MAX_INTERVAL_DAYS': 200,
+                                         'MIN_EASE': 1.5}):
+            self.assertEqual(reviews.reschedule(), (3, 2))
+            self.assertEqual(reviews.reschedule(), (3, 0))  # nothing left to move
+
+        learning.refresh_from_db()
+        self.assertEqual((learning.interval_days, learning.ease), (4.0, 2.5))
+        self.assertEqual(learning.due_at, self.now + timedelta(days=4))
+        mature.refresh_from_db()
+        self.assertEqual((mature.interval_days, mature.ease), (200.0, 1.5))
+        self.assertEqual(mature.due_at, self.now + timedelta(days=200))
+        lapsed.refresh_from_db()
+        self.assertEqual((lapsed.interval_days, lapsed.ease), (1.0, 1.8))
+
+    def test_reschedule_writes_changed_rows_in_batches(self):
+        for i in range(5):
+            self.reviewed(f'question {i}', repetitions=3, interval_days=20.0)
+        self.reviewed('unchanged', repetitions=1, interval_days=1.0)
+        with override_settings(REVIEWS={'FUZZ': 0, 'MAX_INTERVAL_DAYS': 10}), \
+                mock.patch.object(reviews, 'UPDATE_BATCH', 2), \
+                mock.patch.object(QuerySet, 'bulk_update', autospec=True, side_effect=QuerySet.bulk_update) as bulk_update:
+            self.assertEqual(reviews.reschedule(batch_size=4), (6, 5))
+        self.assertEqual([len(call.args[1]) for call in bulk_update.call_args_list], [4, 1])
+        for call in bulk_update.call_args_list:
+            self.assertEqual(call.args[2], ['interval_days', 'ease', 'due_at'])
+            self.assertEqual(call.kwargs['batch_size'], 2)
+        self.assertEqual(set(ReviewItem.objects.filter(repetitions=3).values_list('interval_days', flat=True)), {10.0})
+
+    def test_reschedule_dry_run_writes_nothing(self):
+        item = self.reviewed('question', repetitions=3, interval_days=20.0)
+        with override_settings(REVIEWS={'MAX_INTERVAL_DAYS': 10}):
+            self.assertEqual(reviews.reschedule(dry_run=True), (1, 1))
+        item.refresh_from_db()
+        self.assertEqual(item.interval_days, 20.0)
+
+
+
+@override_settings(REPLICA_ROUTING={'REPLICAS': ['replica_test'], 'STICKY_SECONDS': 10}, ACTIVITY={'BUFFERED': False})
+class ReplicaRoutingTests(TransactionTestCase):
+    # Not TestCase: reads inside a transaction on the primary never go to a replica
+    databases = {'default', 'replica_test'}
+
+    def setUp(self):
+        cache.clear()
+        self.client = self.client_for('learner')
+        Topic.objects.create(name='On the primary')
+        Topic.objects.using('replica_test').create(name='On the replica')  # the replica lags behind
+
+    def client_for(self, username):
+        user = User.objects.create_user(username, f'{username}@example.com', 'pw')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+        return client
+
+    def topic_names(self, client=None):
+        response = (client or self.client).get('/api/topics/')
+        self.assertEqual(response.status_code, 200)
+        return [topic['name'] for topic in response.data['topics']]
+
+    def test_read_only_views_read_from_the_replica(self):
+        self.assertEqual(self.topic_names(), ['On the replica'])
+        response = self.client.get('/api/admin/topics/')
+        self.assertEqual([topic['name'] for topic in response.data], ['On the replica'])
+
+    @override_settings(REPLICA_ROUTING={'REPLICAS': []})
+    def test_reads_stay_on_the_primary_without_replicas(self):
+        self.assertEqual(self.topic_names(), ['On the primary'])
+
+    def test_writes_go_to_the_primary(self):
+        response = self.client.post('/api/admin/topics/', {'name': 'New topic'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Topic.objects.using('default').filter(name='New topic').exists())
+        self.assertFalse(Topic.objects.using('replica_test').filter(name='New topic').exists())
+
+    def test_client_reads_its_own_writes_until_the_sticky_mark_expires(self):
+        self.client.post('/api/admin/topics/', {'name': 'New topic'}, format='json')
+        self.assertEqual(self.topic_names(), ['New topic', 'On the primary'])
+        self.assertEqual(self.topic_names(self.client_for('other')), ['On the replica'])
+
+        later = time.time() + 11
+        with mock.patch.object(locmem.time, 'time', return_value=later):
+            self.assertEqual(self.topic_names(), ['On the replica'])
+
+    def test_reads_after_a_write_in_the_same_request_use_the_primary(self):
+        router = db_routing.ReplicaRouter()
+        token = db_routing._state.set(db_routing.RoutingState('replica_test', db_routing.DEFAULTS['PRIMARY_MODELS']))
+        try:
+            self.assertEqual(router.db_for_read(Topic), 'replica_test')
+            self.assertEqual(router.db_for_read(Token), db_routing.PRIMARY)  # primary-only model
+            self.assertEqual(router.db_for_write(Topic), db_routing.PRIMARY)
+            self.assertEqual(router.db_for_read(Topic), db_routing.PRIMARY)
+        finally:
+            db_routing._state.reset(token)
+        self.assertEqual(router.db_for_read(Topic), db_routing.PRIMARY)  # outside a request
+
+
+@override_settings(PROFILING={'SLOW_QUERY_MS': 0})
+class SlowQueryLogTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        profiling.clear_slow_queries()
+        self.addCleanup(profiling.clear_slow_queries)
+
+    def test_parameter_values_are_not_logged(self):
+        user = User.objects.create_user('admin', 'admin@example.com', 'pw', is_staff=True)
+        token = Token.objects.create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        for _ in range(2):  # the second request checks the cached token against the password hash
+            response = client.get('/api/admin/slow-queries/')
+            self.assertEqual(response.status_code, 200)
+
+        logged = orjson.dumps(profiling.slow_queries(), default=str).decode()
+        self.assertNotIn(token.key, logged)
+        self.assertNotIn(user.password, logged)
+        lookups = [entry['params'] for entry in profiling.slow_queries() if 'authtoken_token' in entry['sql']]
+        self.assertEqual(len(lookups), 2)
+        for params in lookups:
+            self.assertLessEqual(set(params), {'str', 'int', 'bool'})
+
+    def test_parameters_are_recorded_by_type(self):
+        for params, many, expected in (
+            (['secret', 3, None], False, ['str', 'int', 'NoneType']),
+            ({'key': 'secret'}, False, {'key': 'str'}),
+            (None, False, []),
+            ([('secret',), ('other',)], True, '<2 parameter sets>'),
+        ):
+            profiling.check_slow_query(connection, 'UPDATE t SET key = %s', params, many, 1.0)
+            self.assertEqual(profiling.slow_queries()[0]['params'], expected)
+
+    def test_literals_in_plans_are_masked(self):
+        fake = mock.MagicMock(alias='fake')
+        fake.ops.explain_query_prefix.return_value = 'EXPLAIN'
+        cursor = fake.cursor.return_value.__enter__.return_value
+        cursor.fetchall.return_value = [("Index Scan on authtoken_token (key = 'secret-key'::text)",)]
+        plan = profiling._explain(fake, 'SELECT * FROM authtoken_token WHERE key = %s', ['secret-key'])
+        self.assertEqual(plan, "Index Scan on authtoken_token (key = '?'::text)")
+
+
+@override_settings(ACTIVITY={'BUFFERED': True, 'BATCH_SIZE': 3, 'MAX_BUFFER': 5})
+class ActivityBufferTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('learner', 'learner@example.com', 'pw')
+        activity._buffer.clear()
+        activity._wake.clear()
+        self.addCleanup(activity._buffer.clear)
+        writer = mock.patch.object(activity, '_ensure_writer')  # flushes happen when the test says so
+        writer.start()
+        self.addCleanup(writer.stop)
+
+    def record(self, *messages):
+        with self.captureOnCommitCallbacks(execute=True):
+            for message in messages:
+                activity.record(ActivityEvent.TOPIC_CREATED, self.user, message)
+
+    def stored(self):
+        return list(ActivityEvent.objects.order_by('created_at', 'pk').values_list('message', flat=True))
+
+    def test_record_queues_and_flush_writes_in_order(self):
+        with self.assertNumQueries(0):
+            self.record('one', 'two')
+        self.assertEqual(self.stored(), [])
+        self.assertFalse(activity._wake.is_set())
+
+        self.assertEqual(activity.flush(), 2)
+        self.assertEqual(self.stored(), ['one', 'two'])
+        self.assertEqual(len(activity._buffer), 0)
+        self.assertEqual(activity.flush(), 0)
+
+    def test_a_full_batch_wakes_the_writer(self):
+        self.record('one', 'two', 'three')
+        self.assertTrue(activity._wake.is_set())
+
+    def test_rolled_back_events_are_never_queued(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                activity.record(ActivityEvent.TOPIC_CREATED, self.user, 'rolled back')
+                raise RuntimeError
+        self.assertEqual(len(activity._buffer), 0)
+
+    def test_failed_flush_keeps_events_queued_in_order(self):
+        self.record('one', 'two')
+        with mock.patch.object(ActivityEvent.objects, 'bulk_create', side_effect=OperationalError('database is locked')):
+            with self.assertRaises(OperationalError):
+                activity.flush()
+        self.record('three')
+        self.assertEqual([event.message for event in activity._buffer], ['one', 'two', 'three'])
+
+        self.assertEqual(activity.flush(), 3)
+        self.assertEqual(self.stored(), ['one', 'two', 'three'])
+
+    def test_queue_drops_the_oldest_events_past_max_buffer(self):
+        self.record('one', 'two', 'three')
+
+        def fail_while_more_arrive(events, **kwargs):
+            self.record('four', 'five', 'six')
+            raise OperationalError('database is locked')
+
+        with mock.patch.object(ActivityEvent.objects, 'bulk_create', side_effect=fail_while_more_arrive):
+            with self.assertRaises(OperationalError):
+                activity.flush()
+        self.assertEqual([event.message for event in activity._buffer], ['two', 'three', 'four', 'five', 'six'])
+
+    def test_recent_flushes_this_process_first(self):
+        self.record('one', 'two')
+        self.assertEqual({event.message for event in activity.recent(limit=5)}, {'one', 'two'})
+        self.assertEqual(len(activity._buffer), 0)
+
+    @override_settings(ACTIVITY={'BUFFERED': False})
+    def test_unbuffered_events_are_written_on_commit(self):
+        self.record('one')
+        self.assertEqual(self.stored(), ['one'])
+        self.assertEqual(len(activity._buffer), 0)
+
+
+def failing_panel():
+    raise OperationalError('no such table: study_core_topic')
+
+
+@override_settings(ADMIN_DASHBOARD={'PARALLEL': False}, ACTIVITY={'BUFFERED': False})
+class DashboardPanelTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'pw', is_staff=True)
+        Topic.objects.create(name='Cells')
+
+    def cached(self, result):
+        return {name for name, meta in result['meta'].items() if meta['cached']}
+
+    def test_second_load_is_served_from_the_cache(self):
+        first = dashboard.load()
+        self.assertEqual(set(first['panels']), set(dashboard.PANELS))
+        self.assertEqual(self.cached(first), set())
+        with self.assertNumQueries(0):
+            second = dashboard.load()
+        self.assertEqual(self.cached(second), set(dashboard.PANELS))
+        self.assertEqual(second['panels'], first['panels'])
+
+    def test_each_panel_expires_on_its_own_ttl(self):
+        dashboard.load()
+        ttls = dashboard.dashboard_settings()['PANEL_TTLS']
+        later = time.time() + ttls['activities'] + 1  # past the activity feed's TTL only
+        with mock.patch.object(locmem.time, 'time', return_value=later):
+            result = dashboard.load()
+        self.assertEqual(self.cached(result), set(dashboard.PANELS) - {'activities'})
+        self.assertEqual(result['meta']['activities']['ttl'], ttls['activities'])
+
+    @override_settings(ADMIN_DASHBOARD={'PARALLEL': False, 'PANEL_TTLS': {'users': 0}})
+    def test_zero_ttl_panels_are_never_cached(self):
+        dashboard.load()
+        result = dashboard.load()
+        self.assertEqual(self.cached(result), set(dashboard.PANELS) - {'users'})
+
+    def test_refresh_rebuilds_every_panel(self):
+        dashboard.load()
+        self.assertEqual(self.cached(dashboard.load(refresh=True)), set())
+
+    def test_a_failing_panel_does_not_take_down_the_others(self):
+        with mock.patch.dict(dashboard.PANELS, topics=failing_panel):
+            result = dashboard.load()
+        self.assertEqual(set(result['errors']), {'topics'})
+        self.assertIn('no such table', result['errors']['topics'])
+        self.assertEqual(set(result['panels']), set(dashboard.PANELS) - {'topics'})
+
+        # The failure wasn't cached: the next load builds the panel
+        result = dashboard.load()
+        self.assertEqual(result['errors'], {})
+        self.assertEqual([topic['name'] for topic in result['panels']['topics']], ['Cells'])
+        self.assertEqual(self.cached(result), set(dashboard.PANELS) - {'topics'})
+
+    @override_settings(ADMIN_DASHBOARD={'PARALLEL': True, 'WORKERS': 2})
+    def test_a_failing_panel_is_isolated_on_the_pool(self):
+        panels = {'analytics': lambda: {'totalUsers': 1}, 'topics': failing_panel, 'courses': lambda: []}
+        with mock.patch.dict(dashboard.PANELS, panels, clear=True):
+            result = dashboard.load()
+        self.assertEqual(result['panels'], {'analytics': {'totalUsers': 1}, 'courses': []})
+        self.assertEqual(set(result['errors']), {'topics'})
+
+    def test_admin_changes_invalidate_the_affected_panels(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        dashboard.load()
+        response = client.post('/api/admin/topics/', {'name': 'Atoms'}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        response = client.get('/api/admin/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cached(response.data), {'analytics', 'users'})
+        self.assertEqual([topic['name'] for topic in response.data['panels']['topics']], ['Atoms', 'Cells'])
@@ -0,0 +1,228 @@
+# study_core/tutor_ws.py
+"""
+WebSocket transport for the AI tutor (ws[s]://<host>/ws/tutor/).
+
+A plain ASGI application, routed from study_config/asgi.py. The client
+authenticates once per connection and then sends any number of
+questions over it. Each answer streams back as chunks as soon as Gemini
+produces them.
+
+Protocol (JSON text frames):
+
+    -> {"type": "auth", "token": "<DRF token>"}
+    <- {"type": "ready", "user": "<username>"}
+    -> {"type": "ask", "id": "<client id>", "message": "...",
+        "subject": "...", "difficulty": "...", "context": {...}}
+    <- {"type": "chunk", "id": ..., "text": "..."}     (repeated)
+    <- {"type": "done", "id": ..., "response": "<full answer>"}
+    -> {"type": "cancel", "id": ...}
+    <- {"type": "cancelled", "id": ...}
+    <- {"type": "error", "id": ..., "error": "...", "retry_after": n}
+
+One answer runs at a time per connection. Cancelling, or closing the
+socket, cancels the generation task, which closes the provider stream so
+an abandoned answer stops using tokens. Generations go through
+admission.async_slot() in the interactive class, like the HTTP tutor view.
+"""
+import asyncio
+import time
+from contextlib import aclosing
+
+import orjson
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework import exceptions
+
+from users.authentication import CachedTokenAuthentication
+
+from . import admission
+from .ai_client import get_client
+from .instrumentation import record_llm_outcome, registry
+from .prompts import build_tutor_prompt
+from .views import GEMINI_MODEL, is_overload_error
+
+DEFAULTS = {
+    'AUTH_TIMEOUT': 10,  # seconds to send the auth frame after connecting
+    'IDLE_TIMEOUT': 15 * 60,  # seconds without a frame before the server closes
+    'MAX_MESSAGE_BYTES': 64 * 1024,
+    'MAX_RETRIES': 3,  # attempts before the first chunk arrives
+}
+
+# Application close codes (4000-4999 are free for applications)
+CLOSE_BAD_REQUEST = 4400
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_TIMEOUT = 4408
+
+registry.describe('study_tutor_ws_total', 'WebSocket tutor connections and answers, by result.')
+
+
+def ws_settings():
+    return {**DEFAULTS, **getattr(settings, 'TUTOR_WS', {})}
+
+
+class Closed(Exception):
+    pass
+
+
+class TutorSession:
+    """One WebSocket connection: authentication, the receive loop and the running answer."""
+
+    def __init__(self, send, options):
+        self._send = send
+        self._send_lock = asyncio.Lock()
+        self.options = options
+        self.user = None
+        self.task = None
+        self.task_id = None
+        self.closed = False
+
+    async def send_json(self, payload):
+        if self.closed:
+            return
+        async with self._send_lock:
+            await self._send({'type': 'websocket.send', 'text': orjson.dumps(payload).decode()})
+
+    async def close(self, code=1000):
+        if not self.closed:
+            self.closed = True
+            await self._send({'type': 'websocket.close', 'code': code})
+
+    async def receive_json(self, receive, timeout):
+        event = await asyncio.wait_for(receive(), timeout)
+        if event['type'] == 'websocket.disconnect':
+            self.closed = True
+            raise Closed()
+        raw = event.get('text') or event.get('bytes') or b''
+        if len(raw) > self.options['MAX_MESSAGE_BYTES']:
+            raise ValueError("Message too large.")
+        message = orjson.loads(raw)
+        if not isinstance(message, dict):
+            raise ValueError("Expected a JSON object.")
+        return message
+
+    # --- CONNECTION ---
+
+    async def run(self, receive):
+        event = await receive()
+        if event['type'] != 'websocket.connect':
+            return
+        await self._send({'type': 'websocket.accept'})
+        try:
+            if not await self.authenticate(receive):
+                return
+            while True:
+                try:
+                    message = await self.receive_json(receive, self.options['IDLE_TIMEOUT'])
+                except ValueError as e:
+                    await self.send_json({'type': 'error', 'id': None, 'error': str(e)})
+                    continue
+                await self.dispatch(message)
+        except asyncio.TimeoutError:
+            await self.close(CLOSE_TIMEOUT)
+        except Closed:
+            pass
+        finally:
+            if self.task is not None and not self.task.done():
+                self.task.cancel()
+                await asyncio.gather(self.task, return_exceptions=True)
+
+    async def authenticate(self, receive):
+        try:
+            message = await self.receive_json(receive, self.options['AUTH_TIMEOUT'])
+        except ValueError:
+            await self.close(CLOSE_BAD_REQUEST)
+            return False
+        token = message.get('token') if message.get('type') == 'auth' else None
+        try:
+            if not isinstance(token, str) or not token:
+                raise exceptions.AuthenticationFailed("Missing token.")
+            self.user, _ = await sync_to_async(CachedTokenAuthentication().authenticate_credentials)(token)
+        except exceptions.AuthenticationFailed:
+            registry.increment('study_tutor_ws_total', {'result': 'unauthorized'})
+            await self.close(CLOSE_UNAUTHORIZED)
+            return False
+        registry.increment('study_tutor_ws_total', {'result': 'connected'})
+        await self.send_json({'type': 'ready', 'user': self.user.username})
+        return True
+
+    async def dispatch(self, message):
+        kind = message.get('type')
+        request_id = message.get('id')
+        if kind == 'ask':
+            if self.task is not None and not self.task.done():
+                await self.send_json({'type': 'error', 'id': request_id,
+                                      'error': "An answer is already in progress; cancel it first."})
+                return
+            self.task_id = request_id
+            self.task = asyncio.create_task(self.answer(request_id, message))
+        elif kind == 'cancel':
+            if self.task is not None and not self.task.done() and request_id == self.task_id:
+                self.task.cancel()
+        elif kind == 'ping':
+            await self.send_json({'type': 'pong'})
+        else:
+            await self.send_json({'type': 'error', 'id': request_id, 'error': f"Unknown message type: {kind}"})
+
+    # --- ANSWERS ---
+
+    async def answer(self, request_id, message):
+        user_message = message.get('message')
+        if not user_message or not isinstance(user_message, str):
+            await self.send_json({'type': 'error', 'id': request_id, 'error': "Message is required"})
+            return
+        context = message.get('context') or {}
+        prompt = build_tutor_prompt(
+            user_message,
+            message.get('subject', 'general'),
+            message.get('difficulty', 'beginner'),
+            context.get('conversation_history') if isinstance(context, dict) else None,
+        )
+
+        started = time.perf_counter()
+        parts = []
+        try:
+            async with admission.async_slot(admission.INTERACTIVE):
+                async with aclosing(self.stream(prompt)) as chunks:
+                    async for text in chunks:
+                        parts.append(text)
+                        await self.send_json({'type': 'chunk', 'id': request_id, 'text': text})
+            registry.increment('study_tutor_ws_total', {'result': 'answered'})
+            await self.send_json({'type': 'done', 'id': request_id, 'response': ''.join(parts)})
+        except asyncio.CancelledError:
+            registry.increment('study_tutor_ws_total', {'result': 'cancelled'})
+            await self.send_json({'type': 'cancelled', 'id': request_id})
+        except admission.Rejected as e:
+            await self.send_json({'type': 'error', 'id': request_id, 'retry_after': e.retry_after,
+                                  'error': "The AI service is busy. Please try again shortly."})
+        except Exception as e:
+            print(f"AI Tutor (WebSocket) error: {e}")
+            registry.increment('study_tutor_ws_total', {'result': 'failed'})
+            await self.send_json({'type': 'error', 'id': request_id, 'error': "Tutor is unavailable. Please try again."})
+        finally:
+            registry.observe('study_llm_generation_seconds', time.perf_counter() - started, {'view': 'tutor_ws'})
+
+    async def stream(self, prompt):
+        """Yield answer text as it arrives; overloads are retried until the first chunk."""
+        client = await sync_to_async(get_client, thread_sensitive=False)()
+        for attempt in range(self.options['MAX_RETRIES']):
+            received = False
+            try:
+                stream = await client.aio.models.generate_content_stream(model=GEMINI_MODEL, contents=prompt)
+                async with aclosing(stream):  # closes the provider stream on cancel
+                    async for chunk in stream:
+                        received = True
+                        if chunk.text:
+                            yield chunk.text
+                record_llm_outcome('success')
+                return
+            except Exception as e:
+                if received or not is_overload_error(e) or attempt == self.options['MAX_RETRIES'] - 1:
+                    record_llm_outcome('overloaded' if is_overload_error(e) else 'error')
+                    raise
+                record_llm_outcome('overloaded')
+                await asyncio.sleep(2 ** (attempt + 1))
+
+
+async def application(scope, receive, send):
+    """ASGI entry point for /ws/tutor/."""
+    await TutorSession(send, ws_settings()).run(receive)
@@ -14,11 +14,18 @@ urlpatterns = [
     
     # Existing endpoints
     path('topics/', views.topics_view, name='topics'),
+    path('search/', views.search_view, name='search'),
+    path('sync/', views.sync_view, name='sync'),
     path('user-data/', views.user_data_view, name='user-data'),
     path('sessions/', views.session_generation_view, name='session-generation'),
+    path('prefetch/<str:prefetch_id>/cancel/', views.prefetch_cancel_view, name='prefetch-cancel'),
     path('study-tools/', views.study_tools_view, name='study-tools'),
     path('quiz-generate/', views.quiz_generate_view, name='quiz-generate'),
     path('study-history/', views.study_history_view, name='study-history'),
+    path('progress/', views.progress_view, name='progress'),
+    path('progress/attempts/', views.quiz_attempt_view, name='quiz-attempts'),
+    path('reviews/due/', views.reviews_due_view, name='reviews-due'),
+    path('reviews/<int:item_id>/grade/', views.review_grade_view, name='review-grade'),
     
     # NEW: Document upload endpoint
     path('upload-summarize/', views.upload_summarize_view, name='upload-summarize'),
@@ -1,54 +1,215 @@
 # study_core/views.py - FIXED topics_view
 import time
 import json
-from rest_framework.decorators import api_view, action
+import re
+from rest_framework.decorators import api_view, action, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework import viewsets
 from rest_framework import permissions
-from google import genai
 from django.conf import settings 
 from django.contrib.auth.models import User
-from .models import Course, Topic, StudySession, StudyTopic
+from django.db import transaction
+from .models import ActivityEvent, Course, ReviewItem, Topic, SearchDocument, StudySession, StudyTopic, TopicMastery
 from .serializers import CourseSerializer, TopicSerializer, UserSerializer, StudySessionSerializer, StudyTopicSerializer
+from .serializers import BULK_MAX_ITEMS, CourseBulkSerializer, TopicBulkSerializer
+from .serializers import CourseValuesSerializer, TopicValuesSerializer, UserValuesSerializer
+from .serializers import QuizAttemptSerializer, ReviewGradeSerializer, ReviewItemSerializer
+from . import activity, admission, ai_cache, dashboard, db_routing, idempotency, images, prefetch, progress, recommender, reviews, search, sync
+from .ai_client import get_client, image_part
+from .signals import bookkeeping_suspended
+from .instrumentation import instrument_generation, phase, record_llm_outcome
+from .prompts import (
+    build_image_summary_prompt,
+    build_notes_prompt,
+    build_progress_recommendations_prompt,
+    build_quiz_prompt,
+    build_recommendations_prompt,
+    build_study_plan_prompt,
+    build_summary_prompt,
+    build_tutor_prompt,
+)
 
 # --- SETUP ---
-client = genai.Client(api_key=settings.GEMINI_API_KEY)
+# The Gemini client is created lazily by ai_client.get_client() on first use
 GEMINI_MODEL = 'gemini-2.5-flash'
 
 # --- HELPER FUNCTION WITH RETRY LOGIC ---
+def is_overload_error(error):
+    """True for provider errors worth retrying with backoff (503 / overloaded)."""
+    error_str = str(error).lower()
+    return 'overload' in error_str or '503' in error_str or 'unavailable' in error_str
+
+
+# Every call waits for an admission slot first (raises admission.Rejected when shed)
+@admission.admitted
+@instrument_generation
 def generate_with_retry(prompt, max_retries=3):
     for attempt in range(max_retries):
         try:
-            response = client.models.generate_content(
-                model=GEMINI_MODEL,
-                contents=prompt
-            )
+            with phase('llm'):
+                response = get_client().models.generate_content(
+                    model=GEMINI_MODEL,
+                    contents=prompt
+                )
+            record_llm_outcome('success')
             return response.text
         except Exception as e:
-            error_str = str(e).lower()
-            if 'overload' in error_str or '503' in error_str or 'unavailable' in error_str:
+            if is_overload_error(e):
+                record_llm_outcome('overloaded')
                 if attempt < max_retries - 1:
                     wait_time = 2 ** (attempt + 1)
                     print(f"API overloaded. Retrying in {wait_time} seconds... (Attempt {attempt + 1})")
-                    time.sleep(wait_time)
+                    with phase('retry_sleep'):
+                        time.sleep(wait_time)
                     continue
                 else:
                     return "AI service is temporarily overloaded. Please try again in a few minutes."
             else:
+                record_llm_outcome('error')
                 return f"AI service error: {str(e)}"
     return "Failed to generate content after multiple attempts."
 
 
+# Messages generate_with_retry returns instead of raising
+GENERATION_FAILURE_PREFIXES = (
+    "AI service is temporarily overloaded",
+    "AI service error:",
+    "Failed to generate content after multiple attempts",
+)
+
+
+def generation_failed(text):
+    """True if generate_with_retry returned one of its failure messages."""
+    return not text or text.startswith(GENERATION_FAILURE_PREFIXES)
+
+
+def cached_generation(kind, prompt):
+    """generate_with_retry behind the stale-while-revalidate cache; returns (text, cache_status)."""
+    return ai_cache.get_or_generate(kind, prompt, generate_with_retry, generation_failed, model=GEMINI_MODEL)
+
+
+def record_generation(request, kind, topic, cache_status=None):
+    """Activity log entry for a successful study plan / notes / quiz generation."""
+    activity.record(
+        ActivityEvent.CONTENT_GENERATED, request.user, f'Generated {kind}: {topic}'[:255],
+        kind=kind, cache=cache_status,
+    )
+
+
 # --- VIEWSETS FOR ADMIN DASHBOARD (CRUD) ---
 
-class TopicViewSet(viewsets.ModelViewSet):
+class ActivityLogMixin:
+    """
+    Records creates, updates and deletes in the activity log as
+    `<activity_name>_created`, `_updated` and `_deleted` events, and drops
+    the cached admin dashboard panels that show the changed objects.
+    """
+    activity_name = None
+    dashboard_panels = ()
+
+    def log_activity(self, action, message, **data):
+        activity.record(f'{self.activity_name}_{action}', self.request.user, message[:255], **data)
+        dashboard.invalidate('activities', *self.dashboard_panels)
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        self.log_activity('created', f'Created {self.activity_name}: {serializer.instance}', id=serializer.instance.pk)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self.log_activity('updated', f'Updated {self.activity_name}: {serializer.instance}', id=serializer.instance.pk)
+
+    def perform_destroy(self, instance):
+        pk, name = instance.pk, str(instance)
+        super().perform_destroy(instance)
+        self.log_activity('deleted', f'Deleted {self.activity_name}: {name}', id=pk)
+
+
+class BulkActionsMixin(ActivityLogMixin):
+    """
+    Adds /bulk/ to a ModelViewSet for syllabus imports:
+    POST [objects] creates, PATCH [objects with id] updates,
+    DELETE {"ids": [...]} deletes - each as one request and one transaction.
+    """
+    bulk_serializer_class = None
+
+    def _bulk_response(self, objects, status_code):
+        serializer = self.get_serializer_class()(objects, many=True, context=self.get_serializer_context())
+        return Response({"count": len(objects), "results": serializer.data}, status=status_code)
+
+    @action(detail=False, methods=['post', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request):
+        model = self.bulk_serializer_class.Meta.model
+        context = self.get_serializer_context()
+
+        if request.method == 'DELETE':
+            ids = request.data.get('ids') if isinstance(request.data, dict) else None
+            if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+                return Response({"error": "Provide a list of integer 'ids'."}, status=status.HTTP_400_BAD_REQUEST)
+            with transaction.atomic(), bookkeeping_suspended():
+                # Course documents list their topic names, so refresh the affected ones
+                affected = []
+                if model is Topic:
+                    affected = list(Course.objects.filter(topics__in=ids).values_list('pk', flat=True).distinct())
+                existing = list(model.objects.filter(pk__in=ids).values_list('pk', flat=True))
+                deleted = model.objects.filter(pk__in=existing).delete()[1].get(model._meta.label, 0)
+                search.remove_objects(model, existing)
+                search.index_objects(Course.objects.filter(pk__in=affected).prefetch_related('topics'))
+                sync.record_deletions(model, existing)
+                sync.touch_courses(course_ids=affected)
+                self.log_activity('deleted', f'Deleted {deleted} {self.activity_name}s in bulk', ids=existing)
+            return Response({"count": len(ids), "deleted": deleted}, status=status.HTTP_200_OK)
+
+        if not isinstance(request.data, list):
+            return Response({"error": "Expected a list of objects."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.method == 'POST':
+            serializer = self.bulk_serializer_class(
+                data=request.data, many=True, max_length=BULK_MAX_ITEMS, context=context
+            )
+            serializer.is_valid(raise_exception=True)
+            created = serializer.save()
+            self.log_activity('created', f'Created {len(created)} {self.activity_name}s in bulk', ids=[obj.pk for obj in created])
+            return self._bulk_response(created, status.HTTP_201_CREATED)
+
+        ids = [item.get('id') for item in request.data if isinstance(item, dict)]
+        instances = model.objects.in_bulk([pk for pk in ids if isinstance(pk, int)])
+        serializer = self.bulk_serializer_class(
+            instances, data=request.data, many=True, partial=True,
+            max_length=BULK_MAX_ITEMS, context=context
+        )
+        serializer.is_valid(raise_exception=True)
+        updated = serializer.save()
+        self.log_activity('updated', f'Updated {len(updated)} {self.activity_name}s in bulk', ids=[obj.pk for obj in updated])
+        return self._bulk_response(updated, status.HTTP_200_OK)
+
+
+class ValuesListMixin:
+    """
+    Serves list() through a ValuesListSerializer instead of the
+    ModelSerializer. Falls back to the normal path when paginated.
+    """
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        if self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(self.values_serializer_class(queryset).data)
+
+
+class TopicViewSet(ValuesListMixin, BulkActionsMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows topics to be viewed, created, edited, or deleted.
     Accessed via /api/admin/topics/
     """
     queryset = Topic.objects.all().order_by('name')
     serializer_class = TopicSerializer
+    bulk_serializer_class = TopicBulkSerializer
+    values_serializer_class = TopicValuesSerializer
+    activity_name = 'topic'
+    dashboard_panels = ('topics', 'courses')  # courses embed their topics
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get_queryset(self):
@@ -61,18 +222,23 @@ class TopicViewSet(viewsets.ModelViewSet):
         return queryset
 
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(ValuesListMixin, BulkActionsMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows courses to be viewed, created, edited, or deleted.
     Accessed via /api/admin/courses/
     """
     queryset = Course.objects.all().order_by('name')
     serializer_class = CourseSerializer
+    bulk_serializer_class = CourseBulkSerializer
+    values_serializer_class = CourseValuesSerializer
+    activity_name = 'course'
+    dashboard_panels = ('courses',)
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get_queryset(self):
         """Optionally filter by published status"""
-        queryset = Course.objects.all().order_by('name')
+        # Prefetch nested topics: one extra query instead of one per course
+        queryset = Course.objects.all().order_by('name').prefetch_related('topics')
         is_published = self.request.query_params.get('is_published', None)
         if is_published is not None:
             is_published = is_published.lower() == 'true'
@@ -80,13 +246,16 @@ class CourseViewSet(viewsets.ModelViewSet):
         return queryset
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ValuesListMixin, ActivityLogMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows users to be viewed and edited.
     Accessed via /api/admin/users/
     """
     queryset = User.objects.all().order_by('date_joined')
     serializer_class = UserSerializer
+    values_serializer_class = UserValuesSerializer
+    activity_name = 'user'
+    dashboard_panels = ('users', 'analytics')
     permission_classes = [permissions.IsAdminUser]
     
     # Restrict methods if needed
@@ -95,6 +264,7 @@ class UserViewSet(viewsets.ModelViewSet):
 
 # --- VIEWS FOR LEARNER DASHBOARD (READ-ONLY/FUNCTIONAL) ---
 
+@db_routing.replica_reads
 @api_view(['GET'])
 def topics_view(request):
     """
@@ -104,13 +274,11 @@ def topics_view(request):
     try:
         # Use the database model to fetch ONLY ACTIVE topics for learners
         active_topics = Topic.objects.filter(is_active=True).order_by('name')
-        serializer = TopicSerializer(active_topics, many=True)
-        
-        print(f"📚 Returning {len(active_topics)} active topics for learner dashboard")
+        topics = TopicValuesSerializer(active_topics).data
         
         return Response({
-            "topics": serializer.data,
-            "count": len(active_topics)
+            "topics": topics,
+            "count": len(topics)
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -121,6 +289,65 @@ def topics_view(request):
         )
 
 
+@db_routing.replica_reads
+@api_view(['GET'])
+def search_view(request):
+    """
+    Ranked full-text search across topics, courses and the caller's
+    saved study sessions. ?q=<text>&kinds=topic,course,session&limit=20
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response(
+            {"error": "Query parameter 'q' is required."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    valid_kinds = {kind for kind, _ in SearchDocument.KIND_CHOICES}
+    kinds = [k for k in request.query_params.get('kinds', '').split(',') if k in valid_kinds]
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+    except ValueError:
+        limit = 20
+
+    try:
+        started = time.perf_counter()
+        results = search.search(query, user=request.user, kinds=kinds or None, limit=limit)
+        return Response({
+            "query": query,
+            "results": results,
+            "count": len(results),
+            "took_ms": round((time.perf_counter() - started) * 1000, 2)
+        }, status=status.HTTP_200_OK)
+    except Exception as e:
+        print(f"Search error: {e}")
+        return Response(
+            {"error": "Search failed", "details": str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+def sync_view(request):
+    """
+    Delta sync of topics and courses: GET /api/sync/?since=<cursor>
+    Returns rows changed and ids deleted since the cursor, plus the next cursor.
+    """
+    since = request.query_params.get('since')
+    try:
+        since = sync.decode_cursor(since) if since else None
+    except sync.InvalidCursor as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        return Response(sync.changes_since(since, request.user), status=status.HTTP_200_OK)
+    except Exception as e:
+        print(f"Sync error: {e}")
+        return Response(
+            {"error": "Failed to sync topics and courses", "details": str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
 @api_view(['GET'])
 def user_data_view(request):
     """Returns placeholder user data."""
@@ -133,6 +360,8 @@ def user_data_view(request):
 
 
 @api_view(['POST'])
+@admission.priority(admission.STANDARD)
+@idempotency.idempotent
 def session_generation_view(request):
     """Generates a study plan with subtopic support."""
     try:
@@ -149,38 +378,48 @@ def session_generation_view(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Build a more detailed prompt with subtopics
-        if subtopics:
-            prompt = f"""
-            Create a detailed study plan for: {topic_name}
-            Focus specifically on: {', '.join(subtopics)}
-            Duration: {duration}
-            
-            Format the plan with:
-            1. Clear daily objectives
-            2. Specific learning activities
-            3. Time allocation for each subtopic
-            4. Review sessions
-            
-            Make it practical and achievable.
-            """
-        else:
-            prompt = f"""
-            Create a detailed study plan for: {topic_name}
-            Duration: {duration}
-            
-            Format with clear daily tasks, learning objectives, and time allocation.
-            """
-
-        # Use retry logic for generation
-        generated_content = generate_with_retry(prompt)
+        prompt = build_study_plan_prompt(topic_name, duration, subtopics)
+
+        # Use retry logic for generation (served from the AI cache when possible)
+        generated_content, cache_status = cached_generation('plan', prompt)
+
+        # Keep signed-in learners' plans so they show up in search
+        session_id = None
+        if request.user.is_authenticated and not generation_failed(generated_content):
+            session_id = StudySession.objects.create(
+                user=request.user,
+                topic_name=topic_name,
+                duration_input=str(duration)[:50],
+                generated_content=generated_content,
+            ).id
+
+        # Notes and a quiz are usually requested next: clients that will ask for them can
+        # opt in ("prefetch": true) to have them generated in the background.
+        # prefetch_subtopics lets the client match what it will send to those endpoints.
+        prefetch_id = None
+        if data.get("prefetch", False) and not generation_failed(generated_content):
+            prefetch_subtopics = data.get("prefetch_subtopics", subtopics)
+            prefetch_id = prefetch.schedule(request.user, [
+                ('notes', build_notes_prompt(topic_name, prefetch_subtopics)),
+                ('quiz', build_quiz_prompt(topic_name, prefetch_subtopics)),
+            ], generate_with_retry, generation_failed, model=GEMINI_MODEL)
         
-        return Response({
+        response = Response({
             "topic_name": topic_name, 
             "generated_content": generated_content,
-            "subtopics": subtopics
+            "subtopics": subtopics,
+            "session_id": session_id,
+            "prefetch_id": prefetch_id
         }, status=status.HTTP_200_OK)
+        response['X-AI-Cache'] = cache_status
+        if generation_failed(generated_content):
+            idempotency.mark_transient(response)
+        else:
+            record_generation(request, 'study plan', topic_name, cache_status)
+        return response
 
+    except admission.Rejected as e:
+        return admission.rejected_response(e)
     except Exception as e:
         print(f"Study plan generation error: {e}")
         return Response(
@@ -190,6 +429,17 @@ def session_generation_view(request):
 
 
 @api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def prefetch_cancel_view(request, prefetch_id):
+    """Stops a speculative notes/quiz prefetch (e.g. the learner left the page)."""
+    if not prefetch.cancel(prefetch_id, request.user.pk):
+        return Response({"error": "Prefetch not found."}, status=status.HTTP_404_NOT_FOUND)
+    return Response({"cancelled": True}, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@admission.priority(admission.STANDARD)
+@idempotency.idempotent
 def study_tools_view(request):
     """Generates comprehensive study notes using Gemini with retry logic."""
     try:
@@ -203,29 +453,20 @@ def study_tools_view(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Build enhanced prompt with subtopics
-        if subtopics:
-            prompt = (
-                f"Generate comprehensive, well-structured study notes "
-                f"for the topic: '{topic}' focusing specifically on: {', '.join(subtopics)}.\n\n"
-                f"Format the notes with:\n"
-                f"- Clear headings and subheadings\n"
-                f"- Key concepts and definitions\n" 
-                f"- Examples and practical applications\n"
-                f"- Summary points for review\n"
-                f"- Use markdown formatting for better readability"
-            )
-        else:
-            prompt = (
-                f"Generate concise, comprehensive, and well-structured study notes "
-                f"for the topic: '{topic}'. The notes should be formatted clearly "
-                f"using markdown for headings, bullet points, and key concepts."
-            )
+        prompt = build_notes_prompt(topic, subtopics)
 
-        generated_notes = generate_with_retry(prompt)
+        generated_notes, cache_status = cached_generation('notes', prompt)
         
-        return Response({"notes": generated_notes}, status=status.HTTP_200_OK)
+        response = Response({"notes": generated_notes}, status=status.HTTP_200_OK)
+        response['X-AI-Cache'] = cache_status
+        if generation_failed(generated_notes):
+            idempotency.mark_transient(response)
+        else:
+            record_generation(request, 'notes', topic, cache_status)
+        return response
 
+    except admission.Rejected as e:
+        return admission.rejected_response(e)
     except Exception as e:
         print(f"Gemini Error in notes generation: {e}")
         return Response(
@@ -235,6 +476,8 @@ def study_tools_view(request):
 
 
 @api_view(['POST'])
+@admission.priority(admission.STANDARD)
+@idempotency.idempotent
 def quiz_generate_view(request):
     """Generates a multiple-choice quiz using Gemini with retry logic."""
     try:
@@ -248,29 +491,20 @@ def quiz_generate_view(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Build enhanced prompt with subtopics
-        if subtopics:
-            prompt = (
-                f"Create a multiple-choice quiz with 5 questions "
-                f"about: '{topic}' focusing specifically on: {', '.join(subtopics)}.\n\n"
-                f"Format requirements:\n"
-                f"- Each question should have 4 options (A, B, C, D)\n"
-                f"- Clearly indicate the correct answer on a new line after each question\n"
-                f"- Include a mix of conceptual and application questions\n"
-                f"- Make the questions challenging but fair\n"
-                f"- End with an answer key that explains why each answer is correct"
-            )
-        else:
-            prompt = (
-                f"Create a short, multiple-choice quiz with 5 questions "
-                f"about the topic: '{topic}'. For each question, provide 4 options "
-                f"and clearly indicate the correct answer on a new line after the question."
-            )
+        prompt = build_quiz_prompt(topic, subtopics)
 
-        generated_quiz = generate_with_retry(prompt)
+        generated_quiz, cache_status = cached_generation('quiz', prompt)
         
-        return Response({"quiz": generated_quiz}, status=status.HTTP_200_OK)
+        response = Response({"quiz": generated_quiz}, status=status.HTTP_200_OK)
+        response['X-AI-Cache'] = cache_status
+        if generation_failed(generated_quiz):
+            idempotency.mark_transient(response)
+        else:
+            record_generation(request, 'quiz', topic, cache_status)
+        return response
 
+    except admission.Rejected as e:
+        return admission.rejected_response(e)
     except Exception as e:
         print(f"Gemini Error in quiz generation: {e}")
         return Response(
@@ -279,6 +513,7 @@ def quiz_generate_view(request):
         )
 
 
+@db_routing.replica_reads
 @api_view(['GET'])
 def study_history_view(request):
     """Returns study history - FIXED to prevent infinite loops"""
@@ -294,10 +529,81 @@ def study_history_view(request):
     except Exception as e:
         print(f"Study history error: {e}")
         return Response({"history": []}, status=status.HTTP_200_OK)
+
+
+# --- LEARNER PROGRESS ---
+
+@db_routing.replica_reads
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def progress_view(request):
+    """Per-topic mastery for the current user, read from the TopicMastery aggregates."""
+    with phase('db'):
+        return Response(progress.analysis(request.user), status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def quiz_attempt_view(request):
+    """Records a finished quiz and folds it into the user's mastery for that topic."""
+    serializer = QuizAttemptSerializer(data=request.data, context={'request': request})
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+    with phase('db'):
+        attempt = progress.record_attempt(request.user, data['topic'], data['questions'], data['session_id'])
+    return Response({
+        "id": attempt.id,
+        "topic": attempt.topic_name,
+        "total": attempt.total,
+        "correct": attempt.correct,
+        "score": attempt.score,
+    }, status=status.HTTP_201_CREATED)
+
+
+# --- REVIEWS ---
+
+@db_routing.replica_reads
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def reviews_due_view(request):
+    """The user's review items due now, most overdue first (?limit=, default REVIEWS['DUE_LIMIT'])."""
+    try:
+        limit = int(request.query_params.get('limit', 0)) or None
+    except ValueError:
+        return Response({"error": "limit must be a number."}, status=status.HTTP_400_BAD_REQUEST)
+    with phase('db'):
+        items, has_more = reviews.due(request.user, limit)
+    return Response({
+        "items": ReviewItemSerializer(items, many=True).data,
+        "has_more": has_more,
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def review_grade_view(request, item_id):
+    """Records a review of one item (grade 0-5) and returns its new schedule."""
+    serializer = ReviewGradeSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    with phase('db'):
+        item = ReviewItem.objects.filter(pk=item_id, user=request.user).first()
+        if item is None:
+            return Response({"error": "Review item not found."}, status=status.HTTP_404_NOT_FOUND)
+        reviews.grade(item, serializer.validated_data['grade'])
+    return Response(ReviewItemSerializer(item).data, status=status.HTTP_200_OK)
     
 # Add this new view function to your study_core/views.py
 
+def record_upload(request, file, upload_type):
+    activity.record(
+        ActivityEvent.FILE_UPLOADED, request.user, f'Summarized upload: {file.name}'[:255],
+        upload_type=upload_type, size=file.size,
+    )
+
+
 @api_view(['POST'])
+@admission.priority(admission.BULK)
+@idempotency.idempotent
 def upload_summarize_view(request):
     """Handles file upload and AI summarization"""
     try:
@@ -320,20 +626,33 @@ def upload_summarize_view(request):
         text_content = ""
         
         if upload_type == 'image':
-            # For images, we would use OCR
-            # Note: You'll need to install: pip install pytesseract pillow
+            # Send the image itself to Gemini, downscaled and re-encoded first
             try:
-                # This is a placeholder - implement OCR logic here
-                # For now, return a message about OCR
-                text_content = f"[OCR would process this image: {file.name}]\n\n"
-                text_content += "Image OCR processing would extract text here. "
-                text_content += "Install pytesseract and pillow for OCR functionality."
-                
-            except Exception as e:
+                image_bytes, mime_type, image_info = images.preprocess(file.read())
+            except images.ImageError as e:
                 return Response(
                     {"error": f"Failed to process image: {str(e)}"}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
+
+            generated_summary = generate_with_retry([
+                image_part(image_bytes, mime_type),
+                build_image_summary_prompt(),
+            ])
+
+            response = Response({
+                'summary': generated_summary,
+                'filename': file.name,
+                'file_type': upload_type,
+                'original_length': file.size,
+                'summary_length': len(generated_summary),
+                'image': image_info
+            })
+            if generation_failed(generated_summary):
+                idempotency.mark_transient(response)
+            else:
+                record_upload(request, file, upload_type)
+            return response
                 
         else:
             # For text-based documents
@@ -362,26 +681,25 @@ def upload_summarize_view(request):
                 )
         
         # Generate AI summary
-        prompt = f"""
-        Please provide a comprehensive summary of the following content. 
-        Focus on the key points, main ideas, and important details.
-        
-        Content to summarize:
-        {text_content[:3000]}  # Limit content length for API
-        
-        Provide a well-structured summary that captures the essence of the material.
-        """
+        prompt = build_summary_prompt(text_content)
         
         generated_summary = generate_with_retry(prompt)
         
-        return Response({
+        response = Response({
             'summary': generated_summary,
             'filename': file.name,
             'file_type': upload_type,
             'original_length': len(text_content),
             'summary_length': len(generated_summary)
         })
+        if generation_failed(generated_summary):
+            idempotency.mark_transient(response)
+        else:
+            record_upload(request, file, upload_type)
+        return response
         
+    except admission.Rejected as e:
+        return admission.rejected_response(e)
     except Exception as e:
         print(f"Upload summarization error: {e}")
         return Response(
@@ -392,6 +710,8 @@ def upload_summarize_view(request):
 # Add this to your study_core/views.py
 
 @api_view(['POST'])
+@admission.priority(admission.INTERACTIVE)
+@idempotency.idempotent
 def ai_tutor_chat_view(request):
     """AI Tutor chat endpoint with context awareness"""
     try:
@@ -407,53 +727,26 @@ def ai_tutor_chat_view(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Build intelligent prompt based on subject and difficulty
-        subject_prompts = {
-            'math': "You are a mathematics tutor. Explain concepts clearly with examples.",
-            'science': "You are a science tutor. Focus on scientific principles and real-world applications.",
-            'physics': "You are a physics tutor. Explain physical concepts with practical examples.",
-            'chemistry': "You are a chemistry tutor. Focus on chemical reactions and properties.",
-            'biology': "You are a biology tutor. Explain biological concepts with diagrams in mind.",
-            'programming': "You are a programming tutor. Provide code examples and best practices.",
-            'general': "You are a general learning tutor. Adapt to the student's needs."
-        }
-
-        difficulty_levels = {
-            'beginner': "Explain like I'm a beginner. Use simple language and basic examples.",
-            'intermediate': "Explain for an intermediate learner. Include some technical details.",
-            'advanced': "Explain for an advanced learner. Include technical details and advanced concepts."
-        }
-
-        prompt = f"""
-        {subject_prompts.get(subject, subject_prompts['general'])}
-        {difficulty_levels.get(difficulty, difficulty_levels['beginner'])}
-        
-        Student's question: {user_message}
-        
-        Please provide:
-        1. A clear, step-by-step explanation
-        2. Relevant examples if applicable
-        3. Key takeaways
-        4. Follow-up questions to check understanding
-        
-        Keep the response engaging and educational.
-        """
-
-        # Add conversation context if available
-        if context.get('conversation_history'):
-            prompt += "\n\nPrevious conversation context:\n"
-            for msg in context['conversation_history']:
-                role = "Student" if msg['role'] == 'user' else "Tutor"
-                prompt += f"{role}: {msg['content']}\n"
+        prompt = build_tutor_prompt(
+            user_message,
+            subject,
+            difficulty,
+            context.get('conversation_history'),
+        )
 
         generated_response = generate_with_retry(prompt)
         
-        return Response({
+        response = Response({
             "response": generated_response,
             "subject": subject,
             "difficulty": difficulty
         }, status=status.HTTP_200_OK)
+        if generation_failed(generated_response):
+            idempotency.mark_transient(response)
+        return response
 
+    except admission.Rejected as e:
+        return admission.rejected_response(e)
     except Exception as e:
         print(f"AI Tutor error: {e}")
         return Response(
@@ -464,12 +757,16 @@ def ai_tutor_chat_view(request):
 # Add this to your study_core/views.py
 
 @api_view(['POST'])
+@admission.priority(admission.STANDARD)
+@idempotency.idempotent
 def ai_recommendations_view(request):
     """Generate AI-powered study recommendations based on user's learning history"""
     try:
         data = request.data
+        if request.user.is_authenticated and not data.get('prompt'):
+            return local_recommendations(request.user, data)
         analysis = data.get('analysis', {})
-        prompt = data.get('prompt', '')
+        prompt = build_recommendations_prompt(str(data.get('prompt', '')))
 
         # Use the existing generate_with_retry function
         ai_response = generate_with_retry(prompt)
@@ -513,51 +810,67 @@ def ai_recommendations_view(request):
                 }
         except:
             # If parsing fails, use fallback
-            recommendations = get_fallback_recommendations()
+            recommendations = get_fallback_recommendations(request.user)
 
-        return Response({
+        response = Response({
             "recommendations": recommendations,
             "analysis": analysis
         }, status=status.HTTP_200_OK)
+        if generation_failed(ai_response):
+            idempotency.mark_transient(response)
+        return response
 
+    except admission.Rejected as e:
+        return admission.rejected_response(e)
     except Exception as e:
         print(f"AI recommendations error: {e}")
-        return Response(
-            {"error": "Failed to generate recommendations", "recommendations": get_fallback_recommendations()},
+        return idempotency.mark_transient(Response(
+            {"error": "Failed to generate recommendations", "recommendations": get_fallback_recommendations(request.user)},
             status=status.HTTP_200_OK  # Still return fallback recommendations
-        )
+        ))
 
-def get_fallback_recommendations():
-    """Fallback recommendations when AI is unavailable"""
-    return {
-        "suggestions": [
-            {
-                "title": "Review Recent Topics",
-                "description": "Spend time reviewing what you've studied recently to reinforce your learning.",
-                "reason": "Regular review improves retention",
-                "priority": "high"
-            },
-            {
-                "title": "Practice Problems",
-                "description": "Solve practical exercises related to your subjects.",
-                "reason": "Practice builds skill and confidence",
-                "priority": "medium"
-            }
-        ],
-        "gaps": [
-            {
-                "title": "Identify Weak Areas",
-                "description": "Take time to identify topics you find challenging and focus on them.",
-                "reason": "Addressing weaknesses creates balanced knowledge",
-                "priority": "medium"
-            }
-        ],
-        "nextSteps": [
-            {
-                "title": "Set Learning Goals",
-                "description": "Define clear goals for what you want to achieve in your studies.",
-                "reason": "Goals provide direction and motivation",
-                "priority": "high"
-            }
-        ]
-    }
\ No newline at end of file
+
+def local_recommendations(user, data):
+    """
+    Recommendations from the local recommender (study_core/recommender.py).
+    Gemini is only asked to reword them, when the client sends "phrase": true
+    or RECOMMENDER['PHRASE_WITH_LLM'] is on; if that fails the local wording stands.
+    """
+    with phase('db'):
+        rows = list(TopicMastery.objects.filter(user=user))
+    analysis = progress.analysis(user, rows)
+    recommendations = recommender.recommend(user, rows)
+    source = 'local'
+    failed = False
+
+    if data.get('phrase', recommender.recommender_settings()['PHRASE_WITH_LLM']):
+        try:
+            ai_response = generate_with_retry(build_progress_recommendations_prompt(analysis, recommendations))
+            failed = generation_failed(ai_response)
+            json_match = re.search(r'\{.*\}', ai_response, re.DOTALL)
+            if json_match and not failed:
+                recommendations = recommender.merge_phrasing(recommendations, json.loads(json_match.group()))
+                source = 'ai'
+        except admission.Rejected:
+            failed = True  # busy: the local wording is good enough
+        except ValueError as e:
+            print(f"Recommendation phrasing was not valid JSON: {e}")
+
+    response = Response({
+        "recommendations": recommendations,
+        "analysis": analysis,
+        "source": source,
+    }, status=status.HTTP_200_OK)
+    if failed:
+        idempotency.mark_transient(response)
+    return response
+
+
+def get_fallback_recommendations(user=None):
+    """Fallback recommendations when AI is unavailable: personalised when we know the user."""
+    if user is not None and user.is_authenticated:
+        try:
+            return recommender.recommend(user)
+        except Exception as e:
+            print(f"Local recommender error: {e}")
+    return recommender.generic()
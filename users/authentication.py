@@ -0,0 +1,64 @@
+# users/authentication.py
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+TOKEN_CACHE_PREFIX = 'auth-token:'
+
+
+def token_cache_key(key):
+    return f'{TOKEN_CACHE_PREFIX}{key}'
+
+
+def invalidate_token(key):
+    """Drop a token from the auth cache (logout, password change, deactivation)."""
+    cache.delete(token_cache_key(key))
+
+
+def verify_cached_tokens():
+    """
+    Whether a cached token must be checked against the database before use.
+    Invalidation only reaches this process's cache when it is local (LocMem),
+    so by default cache hits are verified unless the cache is shared.
+    """
+    verify = getattr(settings, 'AUTH_TOKEN_CACHE_VERIFY', None)
+    if verify is None:
+        return isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+    return verify
+
+
+def _still_valid(token):
+    """One indexed lookup: the token row exists and its user is as cached."""
+    user = token.user
+    return Token.objects.filter(
+        key=token.key, user_id=user.pk, user__is_active=True, user__password=user.password,
+        user__is_staff=user.is_staff, user__is_superuser=user.is_superuser,
+    ).exists()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that caches the token (with its user) for a short TTL.
+
+    Entries are dropped when the token is deleted or its user is saved (see
+    users.signals). With a shared cache that reaches every worker, a
+    hit authenticates without touching the database. With a per-process
+    cache, another worker's logout or user edit can't clear this worker's
+    entry, so a hit costs one existence query (token row, active user,
+    unchanged password and role) instead of loading the user; a miss falls
+    back to the full lookup. AUTH_TOKEN_CACHE_VERIFY overrides the choice.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        token = cache.get(cache_key)
+        if token is not None:
+            if not verify_cached_tokens() or _still_valid(token):
+                return (token.user, token)
+            cache.delete(cache_key)
+
+        user, token = super().authenticate_credentials(key)
+        cache.set(cache_key, token, getattr(settings, 'AUTH_TOKEN_CACHE_TTL', 60))
+        return (user, token)
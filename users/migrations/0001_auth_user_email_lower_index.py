@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Case-insensitive index on auth_user.email for the email login lookup.
+
+    auth.User belongs to django.contrib.auth, so the index is created with
+    raw SQL here instead of Meta.indexes. LOWER(email) expression indexes
+    work on both SQLite and PostgreSQL.
+    """
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS users_auth_user_email_lower_idx ON auth_user (LOWER(email));',
+            reverse_sql='DROP INDEX IF EXISTS users_auth_user_email_lower_idx;',
+        ),
+    ]
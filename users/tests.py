@@ -1,3 +1,67 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .authentication import token_cache_key
+
+
+class AuthTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_register_returns_a_working_token(self):
+        response = self.client.post('/api/auth/register/', {
+            'email': 'ada@example.com', 'password': 'correct-horse-battery',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['user']['username'], 'ada@example.com')
+        self.assertEqual(Token.objects.get(user__email='ada@example.com').key, response.data['token'])
+
+    def test_login_matches_email_case_insensitively(self):
+        user = User.objects.create_user('ada', 'Ada@Example.com', 'correct-horse-battery')
+        response = self.client.post('/api/auth/login/', {
+            'email': ' ada@example.COM', 'password': 'correct-horse-battery',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['user_id'], user.pk)
+
+        response = self.client.post('/api/auth/login/', {'email': 'ada@example.com', 'password': 'wrong'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_logout_revokes_a_cached_token(self):
+        user = User.objects.create_user('ada', 'ada@example.com', 'correct-horse-battery')
+        token = Token.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(self.client.get('/api/progress/').status_code, 200)  # now cached
+
+        self.assertEqual(self.client.post('/api/auth/logout/').status_code, 200)
+        self.assertFalse(Token.objects.filter(key=token.key).exists())
+        self.assertEqual(self.client.get('/api/progress/').status_code, 401)
+
+    def authenticated_token(self):
+        user = User.objects.create_user('ada', 'ada@example.com', 'correct-horse-battery')
+        token = Token.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(self.client.get('/api/progress/').status_code, 200)
+        return cache.get(token_cache_key(token.key))
+
+    def test_logout_in_another_worker_revokes_the_local_cache_entry(self):
+        cached = self.authenticated_token()
+        cached.delete()
+        cache.set(token_cache_key(cached.key), cached)  # this worker's copy was never cleared
+        self.assertEqual(self.client.get('/api/progress/').status_code, 401)
+
+    def test_deactivation_in_another_worker_revokes_the_local_cache_entry(self):
+        cached = self.authenticated_token()
+        User.objects.filter(pk=cached.user_id).update(is_active=False)  # no signals, like another worker
+        self.assertEqual(self.client.get('/api/progress/').status_code, 401)
+
+    @override_settings(AUTH_TOKEN_CACHE_VERIFY=False)
+    def test_shared_cache_hits_skip_the_database(self):
+        self.authenticated_token()
+        with self.assertNumQueries(0):
+            self.client.get('/api/auth/logout/')  # 405 after authenticating
@@ -9,4 +9,6 @@ urlpatterns = [
     
     # Reference the views using 'views.LoginView'
     re_path(r'^login/?$', views.LoginView.as_view(), name='login'),
+
+    re_path(r'^logout/?$', views.LogoutView.as_view(), name='logout'),
 ]
\ No newline at end of file
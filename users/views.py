@@ -5,9 +5,11 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
-from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
-from rest_framework.permissions import AllowAny
+from django.db.models.functions import Lower
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from study_core import activity
+from study_core.models import ActivityEvent
 from .serializers import UserSerializer
 
 class RegisterView(APIView):
@@ -28,6 +30,7 @@ class RegisterView(APIView):
             
             # Create token for the new user
             token, created = Token.objects.get_or_create(user=user)
+            activity.record(ActivityEvent.USER_REGISTERED, user, f'New user registered: {user.username}')
             
             return Response({
                 'user': serializer.data,
@@ -55,20 +58,28 @@ class LoginView(ObtainAuthToken):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Find user by email
-        try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
-            return Response(
-                {'error': 'Invalid credentials'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Authenticate with username and password
-        user = authenticate(username=user.username, password=password)
+        # Find user by email: one query on the LOWER(email) index, token joined in
+        candidates = (
+            User.objects
+            .annotate(email_lower=Lower('email'))
+            .filter(email_lower=email.strip().lower())
+            .select_related('auth_token')
+            .order_by('id')
+        )
+        user = None
+        for candidate in candidates:
+            if candidate.check_password(password) and candidate.is_active:
+                user = candidate
+                break
+        if not candidates:
+            # Run the hasher anyway so response time doesn't reveal unknown emails
+            User().set_password(password)
         
         if user:
-            token, created = Token.objects.get_or_create(user=user)
+            token = getattr(user, 'auth_token', None)
+            if token is None:
+                token = Token.objects.create(user=user)
+            activity.record(ActivityEvent.USER_LOGGED_IN, user, f'{user.username} logged in')
             return Response({
                 'token': token.key,
                 'user_id': user.id,
@@ -81,4 +92,16 @@ class LoginView(ObtainAuthToken):
             return Response(
                 {'error': 'Invalid credentials'}, 
                 status=status.HTTP_400_BAD_REQUEST
-            )
\ No newline at end of file
+            )
+
+
+class LogoutView(APIView):
+    """
+    Deletes the caller's token so it stops working everywhere
+    (and is dropped from the token cache).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, format=None):
+        Token.objects.filter(user=request.user).delete()
+        return Response({'message': 'Logged out'}, status=status.HTTP_200_OK)